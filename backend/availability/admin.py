@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Availability
+from .models import Availability, AvailabilityRule
 
 
 @admin.register(Availability)
@@ -17,3 +17,19 @@ class AvailabilityAdmin(admin.ModelAdmin):
         elif request.user.is_admin_role():
             return qs.filter(admin=request.user)
         return qs.none()
+
+
+@admin.register(AvailabilityRule)
+class AvailabilityRuleAdmin(admin.ModelAdmin):
+    list_display = ['admin', 'weekdays', 'start_time', 'end_time', 'slot_duration', 'valid_from', 'valid_until', 'is_active']
+    list_filter = ['is_active', 'admin']
+    search_fields = ['admin__username', 'admin__email']
+    list_editable = ['is_active']
+    
+    def get_queryset(self, request):
+        qs = super().get_queryset(request)
+        if request.user.is_super_admin():
+            return qs
+        elif request.user.is_admin_role():
+            return qs.filter(admin=request.user)
+        return qs.none()
@@ -0,0 +1,125 @@
+"""
+Versioned cache for slot responses.
+
+Every (admin, date) pair has a version counter that is bumped whenever an
+Availability or Booking row for that day changes, and every admin has one
+bumped when a recurring AvailabilityRule changes. Cached slot lists are keyed
+by (admin, date, version), so a bump makes older entries unreachable and they
+simply age out of the cache.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+
+HITS_KEY = 'slots:stats:hits'
+MISSES_KEY = 'slots:stats:misses'
+
+
+def _version_key(admin_id, date):
+    return f'slots:version:{admin_id}:{date}'
+
+
+def _admin_version_key(admin_id):
+    return f'slots:admin-version:{admin_id}'
+
+
+def _response_key(admin_id, date, version):
+    return f'slots:response:{admin_id}:{date}:{version}'
+
+
+def _incr(key, initial=1):
+    """Increment a counter, creating it when missing or evicted"""
+    try:
+        return cache.incr(key)
+    except ValueError:
+        if cache.add(key, initial, timeout=None):
+            return initial
+        return cache.incr(key)
+
+
+def _get_counter(key):
+    version = cache.get(key)
+    if version is None:
+        # Seed with a clock value rather than 1 so a counter that was evicted
+        # never restarts at a version an old cached entry was stored under
+        cache.add(key, time.time_ns(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def get_slot_version(admin_id, date):
+    """Return the current slot version for an admin and date"""
+    return f'{_get_counter(_admin_version_key(admin_id))}.{_get_counter(_version_key(admin_id, date))}'
+
+
+def _bump(days):
+    for admin_id, date in days:
+        _incr(_version_key(admin_id, date), initial=time.time_ns())
+
+
+def bump_slot_versions(days):
+    """
+    Invalidate cached slots for several (admin_id, date) pairs
+
+    The bump is repeated once the surrounding transaction commits, so a
+    response cached by a concurrent reader before the commit is dropped too.
+
+    Args:
+        days: Iterable of (admin_id, date) tuples
+    """
+    days = {(admin_id, date) for admin_id, date in days
+            if admin_id is not None and date is not None}
+    if not days:
+        return
+    _bump(days)
+    transaction.on_commit(lambda: _bump(days))
+
+
+def bump_admin_slot_version(admin_id):
+    """Invalidate cached slots for every date of an admin"""
+    key = _admin_version_key(admin_id)
+    _incr(key, initial=time.time_ns())
+    transaction.on_commit(lambda: _incr(key, initial=time.time_ns()))
+
+
+def get_cached_slots(admin_id, date):
+    """
+    Look up cached slots for an admin and date
+
+    Returns:
+        Tuple of (slots or None, version); the version should be passed
+        back to set_cached_slots on a miss
+    """
+    version = get_slot_version(admin_id, date)
+    slots = cache.get(_response_key(admin_id, date, version))
+    _incr(HITS_KEY if slots is not None else MISSES_KEY)
+    return slots, version
+
+
+def set_cached_slots(admin_id, date, version, slots):
+    """Store serialized slots under the version they were computed for"""
+    cache.set(
+        _response_key(admin_id, date, version),
+        slots,
+        timeout=settings.SLOT_CACHE_TIMEOUT
+    )
+
+
+def get_slot_cache_stats():
+    """Return hit and miss counters for the slot cache"""
+    hits = cache.get(HITS_KEY) or 0
+    misses = cache.get(MISSES_KEY) or 0
+    total = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_rate': round(hits / total, 4) if total else None,
+    }
+
+
+def reset_slot_cache_stats():
+    """Reset hit and miss counters"""
+    cache.delete_many([HITS_KEY, MISSES_KEY])
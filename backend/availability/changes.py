@@ -0,0 +1,62 @@
+"""
+Propagation of availability and booking writes to derived slot state.
+
+Models call into here after saving, inside their transaction, so the
+materialized slot table, the slot cache versions and the utilization dirty
+marks move together.
+"""
+from .cache import bump_admin_slot_version, bump_slot_versions
+from .materialized import (
+    materialize_new_availabilities, refresh_days, sync_availability_slots
+)
+from .rollups import mark_admin_dirty, mark_days_dirty
+
+
+def availability_changed(availability, previous_day=None):
+    """
+    Regenerate slots for a saved Availability and invalidate its days
+
+    Args:
+        availability: Saved Availability instance
+        previous_day: (admin_id, date) the window occupied before this save
+    """
+    sync_availability_slots(availability)
+
+    days = {(availability.admin_id, availability.date)}
+    if previous_day:
+        days.add(previous_day)
+    bump_slot_versions(days)
+    mark_days_dirty(days)
+
+
+def availabilities_created(availabilities):
+    """Materialize slots for bulk-created windows and invalidate their days"""
+    materialize_new_availabilities(availabilities)
+    days = {(availability.admin_id, availability.date) for availability in availabilities}
+    bump_slot_versions(days)
+    mark_days_dirty(days)
+
+
+def availability_deleted(days):
+    """Invalidate the days of a deleted Availability (its slots cascade)"""
+    bump_slot_versions(days)
+    mark_days_dirty(days)
+
+
+def rule_changed(admin_id):
+    """Invalidate every day of an admin after a recurring rule changed"""
+    bump_admin_slot_version(admin_id)
+    mark_admin_dirty(admin_id)
+
+
+def bookings_changed(days):
+    """
+    Refresh booked/free flags and invalidate cached slots
+
+    Args:
+        days: Iterable of (admin_id, date) tuples touched by booking writes
+    """
+    days = set(days)
+    refresh_days(days)
+    bump_slot_versions(days)
+    mark_days_dirty(days)
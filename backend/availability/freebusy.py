@@ -0,0 +1,106 @@
+"""
+Week-view free/busy matrix for many admins.
+
+Rows are loaded for the whole week in bulk and every admin's week is held
+as two int bitsets (available and booked buckets, day after day), so the
+"availability minus bookings" step is a couple of bitwise operations per
+admin instead of per-slot Python loops.
+"""
+import base64
+from collections import defaultdict
+from datetime import timedelta
+from itertools import groupby
+
+from .slots import collect_windows, to_seconds
+
+
+MINUTES_PER_DAY = 24 * 60
+
+UNAVAILABLE = 0
+FREE = 1
+BOOKED = 2
+
+
+def day_bits(intervals, resolution):
+    """
+    Return the buckets of one day touched by any interval, as an int bitset
+
+    An interval marks every bucket it overlaps, so at coarse resolutions a
+    set bit means "partly covered".
+
+    Args:
+        intervals: Objects with start_time and end_time
+        resolution: Bucket size in minutes
+    """
+    bucket_seconds = resolution * 60
+    bits = 0
+    for interval in intervals:
+        first = to_seconds(interval.start_time) // bucket_seconds
+        last = -(-to_seconds(interval.end_time) // bucket_seconds)  # ceiling division
+        if last > first:
+            bits |= ((1 << (last - first)) - 1) << first
+    return bits
+
+
+def build_week_matrix(admin_ids, start_date, days=7, resolution=15):
+    """
+    Build available/booked bitsets for several admins over consecutive days
+
+    Args:
+        admin_ids: Admin user IDs (matrix rows)
+        start_date: First day of the grid
+        days: Number of days
+        resolution: Bucket size in minutes
+
+    Returns:
+        Dict mapping admin_id -> (available_bits, booked_bits); bucket i of
+        day d is bit d * buckets_per_day + i
+    """
+    from bookings.models import Booking
+
+    end_date = start_date + timedelta(days=days - 1)
+    buckets_per_day = MINUTES_PER_DAY // resolution
+
+    available = defaultdict(int)
+    for (admin_id, date), windows in collect_windows(admin_ids, start_date, end_date).items():
+        shift = (date - start_date).days * buckets_per_day
+        available[admin_id] |= day_bits(windows, resolution) << shift
+
+    bookings_by_day = defaultdict(list)
+    for booking in Booking.objects.filter(
+        admin_id__in=admin_ids,
+        date__range=(start_date, end_date),
+        status__in=['confirmed', 'pending']
+    ).only('admin_id', 'date', 'start_time', 'end_time'):
+        bookings_by_day[(booking.admin_id, booking.date)].append(booking)
+
+    booked = defaultdict(int)
+    for (admin_id, date), bookings in bookings_by_day.items():
+        shift = (date - start_date).days * buckets_per_day
+        booked[admin_id] |= day_bits(bookings, resolution) << shift
+
+    return {admin_id: (available[admin_id], booked[admin_id]) for admin_id in admin_ids}
+
+
+def encode_bitstring(bits, size):
+    """Pack bits little-endian (bucket 0 is the lowest bit of byte 0) as base64"""
+    return base64.b64encode(bits.to_bytes((size + 7) // 8, 'little')).decode('ascii')
+
+
+def encode_runs(available, booked, size):
+    """
+    Run-length encode the bucket states of one row
+
+    Returns:
+        List of [state, length] pairs where state is 0 (unavailable),
+        1 (free) or 2 (booked)
+    """
+    free = available & ~booked
+    # Reversed binary strings put bucket 0 first
+    free_flags = format(free, f'0{size}b')[::-1]
+    booked_flags = format(booked, f'0{size}b')[::-1]
+    states = (
+        BOOKED if is_booked == '1' else FREE if is_free == '1' else UNAVAILABLE
+        for is_free, is_booked in zip(free_flags, booked_flags)
+    )
+    return [[state, sum(1 for _ in run)] for state, run in groupby(states)]
@@ -0,0 +1,209 @@
+"""
+Short-lived holds on slots.
+
+While a user fills in the booking form, a hold keeps the slot they picked
+from being offered to anyone else. Holds are SlotHold rows, so every process
+sees them. A hold is placed under the booking lock of its admin's day and
+is refused if it overlaps another user's live hold; booking writes check
+holds under the same lock, so a booking never lands on time another user
+holds. Expired rows are simply ignored; each user has at most one row,
+which their next hold overwrites.
+
+Slot responses overlay holds with one query per response, so cached slot
+lists stay shared and a hold expiring needs no invalidation.
+"""
+from collections import defaultdict
+from datetime import time, timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from bookings.reservations import lock_admin_day, run_with_lock_retries
+from .models import SlotHold
+
+
+HELD_MESSAGE = 'This slot is held by another user'
+
+
+class HoldUnavailable(Exception):
+    """Raised when a slot is held by another user"""
+
+
+def _as_time(value):
+    return time.fromisoformat(value) if isinstance(value, str) else value
+
+
+def _serialize(hold):
+    return {
+        'user': hold.user_id,
+        'admin': hold.admin_id,
+        'date': hold.date.isoformat(),
+        'start_time': hold.start_time.isoformat(),
+        'end_time': hold.end_time.isoformat(),
+        'expires_at': int(hold.expires_at.timestamp()),
+    }
+
+
+def _live_holds():
+    return SlotHold.objects.filter(expires_at__gt=timezone.now())
+
+
+def _overlapping(admin_id, date, start_time, end_time, user_id):
+    """Live holds of users other than user_id that overlap [start_time, end_time)"""
+    return _live_holds().filter(
+        admin_id=admin_id,
+        date=date,
+        start_time__lt=end_time,
+        end_time__gt=start_time
+    ).exclude(user_id=user_id)
+
+
+def place_hold(user_id, admin_id, date, start_time, end_time, timeout=None):
+    """
+    Hold a slot for a user, releasing any other slot they hold
+
+    Holding a slot the user already holds extends it. Runs under the admin
+    day's booking lock, retrying lock contention as reservations do.
+
+    Returns:
+        Dict describing the hold, with expires_at as a Unix timestamp
+
+    Raises:
+        HoldUnavailable: If another user holds an overlapping slot
+    """
+    timeout = timeout or settings.SLOT_HOLD_SECONDS
+
+    def operation():
+        lock_admin_day(admin_id, date)
+        if _overlapping(admin_id, date, start_time, end_time, user_id).exists():
+            raise HoldUnavailable(HELD_MESSAGE)
+        hold, _ = SlotHold.objects.update_or_create(user_id=user_id, defaults={
+            'admin_id': admin_id,
+            'date': date,
+            'start_time': start_time,
+            'end_time': end_time,
+            'expires_at': timezone.now() + timedelta(seconds=timeout),
+        })
+        return hold
+
+    return _serialize(run_with_lock_retries(operation))
+
+
+def get_user_hold(user_id):
+    """Return the slot a user holds, or None"""
+    hold = _live_holds().filter(user_id=user_id).first()
+    return _serialize(hold) if hold else None
+
+
+def release_user_hold(user_id):
+    """Release the slot a user holds, if any"""
+    SlotHold.objects.filter(user_id=user_id).delete()
+
+
+def check_slot_hold(user_id, admin_id, date, start_time, end_time):
+    """
+    Raise HoldUnavailable if another user holds time in [start_time, end_time)
+
+    Booking writes call this inside their reservation transaction, under the
+    admin day's booking lock; the holder, and anyone booking time nobody
+    holds, pass.
+    """
+    if _overlapping(admin_id, date, start_time, end_time, user_id).exists():
+        raise HoldUnavailable(HELD_MESSAGE)
+
+
+def _days_filter(days):
+    """Q matching any of the given (admin_id, date) pairs, one OR per admin"""
+    dates_by_admin = defaultdict(set)
+    for admin_id, date in days:
+        dates_by_admin[admin_id].add(date)
+    condition = Q()
+    for admin_id, dates in dates_by_admin.items():
+        condition |= Q(admin_id=admin_id, date__in=dates)
+    return condition
+
+
+def check_slot_holds(bookings):
+    """
+    check_slot_hold for many bookings, possibly of different users, in one query
+
+    Returns:
+        List aligned with bookings, holding HELD_MESSAGE for each booking
+        that overlaps another user's hold and None for the others
+    """
+    if not bookings:
+        return []
+
+    holds = defaultdict(list)
+    for hold in _live_holds().filter(_days_filter((b.admin_id, b.date) for b in bookings)):
+        holds[hold.admin_id, hold.date].append(hold)
+
+    return [
+        HELD_MESSAGE if any(
+            hold.user_id != booking.user_id
+            and hold.start_time < booking.end_time and hold.end_time > booking.start_time
+            for hold in holds.get((booking.admin_id, booking.date), ())
+        ) else None
+        for booking in bookings
+    ]
+
+
+def consume_hold(user_id, admin_id, date, start_time):
+    """Release a user's hold on a slot they have just booked"""
+    SlotHold.objects.filter(
+        user_id=user_id, admin_id=admin_id, date=date, start_time=start_time
+    ).delete()
+
+
+def held_slots(slots, user_id=None):
+    """
+    Find which slots overlap holds of users other than user_id, with one query
+
+    Args:
+        slots: Iterable of (admin_id, date, start_time, end_time) tuples;
+            times may be time objects or ISO strings
+
+    Returns:
+        Set of the given tuples that are held
+    """
+    slots = list(slots)
+    if not slots:
+        return set()
+
+    holds = defaultdict(list)
+    days = _days_filter((admin_id, date) for admin_id, date, _, _ in slots)
+    for hold in _live_holds().filter(days).exclude(user_id=user_id):
+        holds[hold.admin_id, hold.date].append((hold.start_time, hold.end_time))
+    if not holds:
+        return set()
+
+    return {
+        slot for slot in slots
+        if any(
+            start < _as_time(slot[3]) and end > _as_time(slot[2])
+            for start, end in holds.get((slot[0], slot[1]), ())
+        )
+    }
+
+
+def mark_held(admin_id, date, slots, user_id=None):
+    """
+    Return serialized slots with those held by other users marked unavailable
+
+    The input list is left untouched, since it may be a cached response.
+    """
+    held = held_slots(
+        (
+            (admin_id, date, slot['start_time'], slot['end_time'])
+            for slot in slots if slot['is_available']
+        ),
+        user_id
+    )
+    if not held:
+        return slots
+    return [
+        dict(slot, is_available=False)
+        if (admin_id, date, slot['start_time'], slot['end_time']) in held else slot
+        for slot in slots
+    ]
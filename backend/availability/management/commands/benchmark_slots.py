@@ -0,0 +1,80 @@
+import random
+import timeit
+from datetime import date, time
+
+from django.core.management.base import BaseCommand
+
+from availability.models import Availability
+from availability.slots import Busy, compute_slots
+
+
+def legacy_slots(availabilities, bookings):
+    """Slot loop previously used by AvailableTimeSlotsView (exact-key matching)"""
+    booked_slots = {}
+    for booking in bookings:
+        booked_slots[(booking.start_time, booking.end_time)] = booking.id
+
+    all_slots = []
+    for availability in availabilities:
+        for start_time, end_time in availability.get_time_slots():
+            slot_key = (start_time, end_time)
+            all_slots.append({
+                'start_time': start_time,
+                'end_time': end_time,
+                'is_available': slot_key not in booked_slots,
+                'booking_id': booked_slots.get(slot_key)
+            })
+
+    all_slots.sort(key=lambda x: x['start_time'])
+    return all_slots
+
+
+class Command(BaseCommand):
+    help = 'Compare the sweep-line slot engine against the legacy per-window loop'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--windows', type=int, default=300, help='Availability windows per day')
+        parser.add_argument('--bookings', type=int, default=300, help='Bookings per day')
+        parser.add_argument('--repeat', type=int, default=20, help='Timed runs per implementation')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        day = date(2030, 1, 1)
+
+        # Unsaved rows are enough: neither implementation touches the database
+        availabilities = []
+        for _ in range(options['windows']):
+            duration = rng.choice([15, 30, 60])
+            start_minute = rng.randrange(0, 20 * 60, 15)
+            end_minute = min(start_minute + duration * rng.randint(1, 8), 23 * 60 + 45)
+            availabilities.append(Availability(
+                date=day,
+                start_time=time(start_minute // 60, start_minute % 60),
+                end_time=time(end_minute // 60, end_minute % 60),
+                slot_duration=duration,
+            ))
+
+        # Bookings never overlap each other (Booking.clean forbids it), so
+        # carve the day into disjoint intervals of random length
+        boundaries = sorted(rng.sample(range(1, 24 * 60), options['bookings'] * 2))
+        bookings = []
+        for booking_id, index in enumerate(range(0, len(boundaries), 2), start=1):
+            start_minute, end_minute = boundaries[index], boundaries[index + 1]
+            bookings.append(Busy(
+                time(start_minute // 60, start_minute % 60),
+                time(end_minute // 60, end_minute % 60),
+                booking_id,
+            ))
+
+        repeat = options['repeat']
+        legacy = timeit.timeit(lambda: legacy_slots(availabilities, bookings), number=repeat) / repeat
+        sweep = timeit.timeit(lambda: compute_slots(availabilities, bookings), number=repeat) / repeat
+
+        slot_count = len(compute_slots(availabilities, bookings))
+        self.stdout.write(
+            f"{options['windows']} windows, {options['bookings']} bookings, {slot_count} slots"
+        )
+        self.stdout.write(f"legacy loop: {legacy * 1000:.2f} ms/day")
+        self.stdout.write(f"sweep line:  {sweep * 1000:.2f} ms/day")
+        self.stdout.write(self.style.SUCCESS(f"speedup: {legacy / sweep:.2f}x"))
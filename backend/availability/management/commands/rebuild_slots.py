@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from availability.materialized import find_slot_drift, rebuild_all_slots
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the materialized availability slot table, or check it for drift'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Only report drift between the slot table and source rows'
+        )
+
+    def handle(self, *args, **options):
+        if options['check']:
+            missing, stale = find_slot_drift()
+            if missing or stale:
+                raise CommandError(
+                    f'Slot table drifted: {len(missing)} missing, {len(stale)} stale rows. '
+                    f'Run "python manage.py rebuild_slots" to repair it.'
+                )
+            self.stdout.write(self.style.SUCCESS('Slot table is in sync'))
+            return
+
+        with transaction.atomic():
+            count = rebuild_all_slots()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {count} slots'))
@@ -0,0 +1,40 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from availability.rollups import DEFAULT_BATCH_SIZE, process_dirty_days, rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = 'Recompute daily utilization rollups for dirty days, or rebuild a date range'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help='Dirty marks processed per batch'
+        )
+        parser.add_argument(
+            '--rebuild',
+            nargs=2,
+            metavar=('START_DATE', 'END_DATE'),
+            help='Recompute every admin over a date range (YYYY-MM-DD) instead'
+        )
+
+    def handle(self, *args, **options):
+        if options['rebuild']:
+            try:
+                start_date, end_date = (
+                    datetime.strptime(value, '%Y-%m-%d').date() for value in options['rebuild']
+                )
+            except ValueError:
+                raise CommandError('Dates must be YYYY-MM-DD')
+            with transaction.atomic():
+                written = rebuild_rollups(start_date, end_date)
+            self.stdout.write(self.style.SUCCESS(f'Rebuilt {written} utilization rows'))
+            return
+
+        refreshed = process_dirty_days(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Recomputed {refreshed} dirty days'))
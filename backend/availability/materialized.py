@@ -0,0 +1,164 @@
+"""
+Maintenance of the materialized AvailabilitySlot table.
+
+Slots are regenerated when an Availability window is saved, and their
+booked/free flags are refreshed for the affected (admin, date) pairs when a
+booking is created, moved, cancelled or deleted.
+"""
+from collections import defaultdict
+
+from bookings.models import Booking
+from .models import Availability, AvailabilitySlot
+from .slots import BusyIndex, compute_slots, to_seconds
+
+
+def _active_bookings(admin_id, date):
+    return Booking.objects.filter(
+        admin_id=admin_id,
+        date=date,
+        status__in=['confirmed', 'pending']
+    ).only('id', 'start_time', 'end_time')
+
+
+def _slot_rows(availability, bookings):
+    return [
+        AvailabilitySlot(
+            availability=availability,
+            admin_id=availability.admin_id,
+            date=availability.date,
+            start_time=slot['start_time'],
+            end_time=slot['end_time'],
+            booking_id=slot['booking_id'],
+            is_free=slot['is_available'],
+        )
+        for slot in compute_slots([availability], bookings)
+    ]
+
+
+def sync_availability_slots(availability):
+    """
+    Regenerate the slots of one Availability window
+
+    Args:
+        availability: Saved Availability instance
+    """
+    AvailabilitySlot.objects.filter(availability=availability).delete()
+
+    if availability.is_active:
+        bookings = list(_active_bookings(availability.admin_id, availability.date))
+        AvailabilitySlot.objects.bulk_create(_slot_rows(availability, bookings))
+
+
+def materialize_new_availabilities(availabilities, batch_size=1000):
+    """
+    Create slots for freshly bulk-created windows
+
+    Bookings for all affected days are loaded in one query per admin.
+
+    Args:
+        availabilities: Saved Availability instances without slots yet
+    """
+    by_admin = defaultdict(list)
+    for availability in availabilities:
+        if availability.is_active:
+            by_admin[availability.admin_id].append(availability)
+
+    rows = []
+    for admin_id, windows in by_admin.items():
+        dates = {window.date for window in windows}
+        bookings_by_date = defaultdict(list)
+        for booking in Booking.objects.filter(
+            admin_id=admin_id,
+            date__in=dates,
+            status__in=['confirmed', 'pending']
+        ).only('id', 'date', 'start_time', 'end_time'):
+            bookings_by_date[booking.date].append(booking)
+
+        for window in windows:
+            rows.extend(_slot_rows(window, bookings_by_date.get(window.date, [])))
+
+    AvailabilitySlot.objects.bulk_create(rows, batch_size=batch_size)
+
+
+def refresh_booked_flags(admin_id, date):
+    """
+    Recompute booked/free flags for every slot of an admin on a date
+
+    Args:
+        admin_id: Admin user ID
+        date: Slot date
+    """
+    slots = list(AvailabilitySlot.objects.filter(admin_id=admin_id, date=date))
+    if not slots:
+        return
+
+    busy = BusyIndex(_active_bookings(admin_id, date))
+    changed = []
+    for slot in slots:
+        blocking = busy.find(to_seconds(slot.start_time), to_seconds(slot.end_time))
+        booking_id = blocking[2] if blocking else None
+        if slot.booking_id != booking_id or slot.is_free != (blocking is None):
+            slot.booking_id = booking_id
+            slot.is_free = blocking is None
+            changed.append(slot)
+
+    if changed:
+        AvailabilitySlot.objects.bulk_update(changed, ['booking', 'is_free'])
+
+
+def refresh_days(days):
+    """
+    Refresh booked/free flags for several (admin_id, date) pairs
+
+    Args:
+        days: Iterable of (admin_id, date) tuples
+    """
+    for admin_id, date in set(days):
+        if admin_id is not None and date is not None:
+            refresh_booked_flags(admin_id, date)
+
+
+def _expected_slots(availabilities):
+    """Build unsaved slot rows for active availabilities, batching bookings per day"""
+    by_day = defaultdict(list)
+    for availability in availabilities:
+        by_day[(availability.admin_id, availability.date)].append(availability)
+
+    rows = []
+    for (admin_id, date), windows in by_day.items():
+        bookings = list(_active_bookings(admin_id, date))
+        for availability in windows:
+            rows.extend(_slot_rows(availability, bookings))
+    return rows
+
+
+def rebuild_all_slots(batch_size=1000):
+    """
+    Rebuild the whole slot table from Availability and Booking rows
+
+    Returns:
+        Number of slot rows written
+    """
+    AvailabilitySlot.objects.all().delete()
+
+    availabilities = Availability.objects.filter(is_active=True).order_by('admin_id', 'date')
+    rows = _expected_slots(availabilities.iterator(chunk_size=batch_size))
+    AvailabilitySlot.objects.bulk_create(rows, batch_size=batch_size)
+    return len(rows)
+
+
+def find_slot_drift():
+    """
+    Compare the slot table against slots regenerated from source rows
+
+    Returns:
+        Tuple of (missing, stale) sets of
+        (availability_id, start_time, end_time, booking_id, is_free) tuples
+    """
+    def key(slot):
+        return (slot.availability_id, slot.start_time, slot.end_time, slot.booking_id, slot.is_free)
+
+    availabilities = Availability.objects.filter(is_active=True).order_by('admin_id', 'date')
+    expected = {key(slot) for slot in _expected_slots(availabilities.iterator())}
+    stored = {key(slot) for slot in AvailabilitySlot.objects.all().iterator()}
+    return expected - stored, stored - expected
@@ -0,0 +1,64 @@
+# Generated by Django 5.0.1 on 2026-10-18 02:29
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def populate_slots(apps, schema_editor):
+    """Materialize slots for availability created before the slot table existed"""
+    from availability.slots import compute_slots
+
+    Availability = apps.get_model('availability', 'Availability')
+    AvailabilitySlot = apps.get_model('availability', 'AvailabilitySlot')
+    Booking = apps.get_model('bookings', 'Booking')
+
+    rows = []
+    for availability in Availability.objects.filter(is_active=True).iterator():
+        bookings = Booking.objects.filter(
+            admin_id=availability.admin_id,
+            date=availability.date,
+            status__in=['confirmed', 'pending']
+        )
+        for slot in compute_slots([availability], bookings):
+            rows.append(AvailabilitySlot(
+                availability_id=availability.id,
+                admin_id=availability.admin_id,
+                date=availability.date,
+                start_time=slot['start_time'],
+                end_time=slot['end_time'],
+                booking_id=slot['booking_id'],
+                is_free=slot['is_available'],
+            ))
+    AvailabilitySlot.objects.bulk_create(rows, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('availability', '0002_initial'),
+        ('bookings', '0002_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AvailabilitySlot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(help_text='Slot date')),
+                ('start_time', models.TimeField(help_text='Slot start time')),
+                ('end_time', models.TimeField(help_text='Slot end time')),
+                ('is_free', models.BooleanField(default=True, help_text='Whether no active booking overlaps this slot')),
+                ('admin', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='availability_slots', to=settings.AUTH_USER_MODEL)),
+                ('availability', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='slots', to='availability.availability')),
+                ('booking', models.ForeignKey(blank=True, help_text='Active booking overlapping this slot', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='bookings.booking')),
+            ],
+            options={
+                'db_table': 'availability_slots',
+                'ordering': ['date', 'start_time'],
+                'indexes': [models.Index(fields=['admin', 'date', 'is_free'], name='slot_admin_date_free_idx')],
+            },
+        ),
+        migrations.RunPython(populate_slots, migrations.RunPython.noop),
+    ]
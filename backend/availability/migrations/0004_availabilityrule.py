@@ -0,0 +1,37 @@
+# Generated by Django 5.0.1 on 2026-10-18 02:31
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('availability', '0003_availabilityslot'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AvailabilityRule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('weekdays', models.JSONField(default=list, help_text='Weekdays the rule applies to (0 = Monday, 6 = Sunday)')),
+                ('start_time', models.TimeField(help_text='Start time for availability')),
+                ('end_time', models.TimeField(help_text='End time for availability')),
+                ('slot_duration', models.IntegerField(default=30, help_text='Duration of each slot in minutes (15, 30, or 60)')),
+                ('valid_from', models.DateField(help_text='First date the rule applies to')),
+                ('valid_until', models.DateField(blank=True, help_text='Last date the rule applies to (open-ended if empty)', null=True)),
+                ('excluded_dates', models.JSONField(blank=True, default=list, help_text='Dates (YYYY-MM-DD) the rule does not apply to')),
+                ('is_active', models.BooleanField(default=True, help_text='Whether this rule is active')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('admin', models.ForeignKey(limit_choices_to={'role__in': ['admin', 'superadmin']}, on_delete=django.db.models.deletion.CASCADE, related_name='availability_rules', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'availability_rules',
+                'ordering': ['valid_from', 'start_time'],
+            },
+        ),
+    ]
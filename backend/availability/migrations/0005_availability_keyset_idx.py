@@ -0,0 +1,19 @@
+# Generated by Django 5.0.1 on 2026-10-18 02:45
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('availability', '0004_availabilityrule'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='availability',
+            index=models.Index(fields=['-date', 'start_time', 'id'], name='availability_keyset_idx'),
+        ),
+    ]
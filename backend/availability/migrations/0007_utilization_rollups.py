@@ -0,0 +1,55 @@
+# Generated by Django 5.0.1 on 2026-10-18 02:53
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('availability', '0006_query_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyUtilization',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('available_minutes', models.PositiveIntegerField(default=0, help_text='Minutes covered by bookable slots')),
+                ('booked_minutes', models.PositiveIntegerField(default=0, help_text='Minutes covered by confirmed and pending bookings')),
+                ('confirmed_count', models.PositiveIntegerField(default=0)),
+                ('pending_count', models.PositiveIntegerField(default=0)),
+                ('cancelled_count', models.PositiveIntegerField(default=0)),
+                ('hourly_bookings', models.JSONField(default=list, help_text='Confirmed and pending bookings starting in each hour (24 counts)')),
+                ('computed_at', models.DateTimeField(auto_now=True)),
+                ('admin', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'daily_utilization',
+                'ordering': ['date'],
+            },
+        ),
+        migrations.CreateModel(
+            name='UtilizationDirtyDay',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(blank=True, null=True)),
+                ('marked_at', models.DateTimeField()),
+                ('admin', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'utilization_dirty_days',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='dailyutilization',
+            constraint=models.UniqueConstraint(fields=('admin', 'date'), name='unique_daily_utilization'),
+        ),
+        migrations.AddConstraint(
+            model_name='utilizationdirtyday',
+            constraint=models.UniqueConstraint(fields=('admin', 'date'), name='unique_utilization_dirty_day'),
+        ),
+    ]
@@ -1,8 +1,18 @@
-from django.db import models
+from datetime import date, timedelta
+from django.db import models, transaction
 from django.core.exceptions import ValidationError
 from users.models import User
 
 
+class AvailabilityQuerySet(models.QuerySet):
+    def with_slot_counts(self):
+        """Annotate booked and free slot counts from the materialized slot table"""
+        return self.annotate(
+            booked_slot_count=models.Count('slots', filter=models.Q(slots__is_free=False)),
+            free_slot_count=models.Count('slots', filter=models.Q(slots__is_free=True)),
+        )
+
+
 class Availability(models.Model):
     """
     Admin availability slots
@@ -27,11 +37,30 @@ class Availability(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = AvailabilityQuerySet.as_manager()
+    
     class Meta:
         db_table = 'availability'
         ordering = ['-date', 'start_time']
         verbose_name_plural = 'Availabilities'
         unique_together = ['admin', 'date', 'start_time']
+        indexes = [
+            # Keyset pagination key of the availability list
+            models.Index(fields=['-date', 'start_time', 'id'], name='availability_keyset_idx'),
+            # The same key within one admin's availability
+            models.Index(fields=['admin', '-date', 'start_time', 'id'], name='availability_admin_keyset_idx'),
+        ]
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the day the window occupied when loaded, so a move also
+        # invalidates the day it left
+        instance._loaded_slot_day = (
+            instance.__dict__.get('admin_id'),
+            instance.__dict__.get('date')
+        )
+        return instance
     
     def __str__(self):
         return f"{self.admin.username} - {self.date} ({self.start_time}-{self.end_time})"
@@ -46,7 +75,29 @@ class Availability(models.Model):
     
     def save(self, *args, **kwargs):
         self.full_clean()
-        super().save(*args, **kwargs)
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            
+            # Keep the materialized slot table and slot cache in step
+            from .changes import availability_changed
+            availability_changed(self, getattr(self, '_loaded_slot_day', None))
+        self._loaded_slot_day = (self.admin_id, self.date)
+    
+    def delete(self, *args, **kwargs):
+        days = {(self.admin_id, self.date)}
+        with transaction.atomic():
+            result = super().delete(*args, **kwargs)
+            
+            from .changes import availability_deleted
+            availability_deleted(days)
+        return result
+    
+    def count_time_slots(self):
+        """Return the number of slots get_time_slots would generate"""
+        from .slots import to_seconds
+        
+        seconds = to_seconds(self.end_time) - to_seconds(self.start_time)
+        return max(0, seconds // (self.slot_duration * 60))
     
     def get_time_slots(self):
         """
@@ -67,3 +118,257 @@ class Availability(models.Model):
             current_time += delta
         
         return slots
+
+
+class AvailabilityRule(models.Model):
+    """
+    Recurring weekly admin availability, expanded lazily into windows
+    
+    Concrete Availability rows override the rule: any Availability row for
+    an admin and date (active or not) replaces the generated window.
+    """
+    WEEKDAY_CHOICES = [
+        (0, 'Monday'),
+        (1, 'Tuesday'),
+        (2, 'Wednesday'),
+        (3, 'Thursday'),
+        (4, 'Friday'),
+        (5, 'Saturday'),
+        (6, 'Sunday'),
+    ]
+    
+    admin = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='availability_rules',
+        limit_choices_to={'role__in': ['admin', 'superadmin']}
+    )
+    weekdays = models.JSONField(
+        default=list,
+        help_text='Weekdays the rule applies to (0 = Monday, 6 = Sunday)'
+    )
+    start_time = models.TimeField(help_text='Start time for availability')
+    end_time = models.TimeField(help_text='End time for availability')
+    slot_duration = models.IntegerField(
+        default=30,
+        help_text='Duration of each slot in minutes (15, 30, or 60)'
+    )
+    valid_from = models.DateField(help_text='First date the rule applies to')
+    valid_until = models.DateField(
+        null=True,
+        blank=True,
+        help_text='Last date the rule applies to (open-ended if empty)'
+    )
+    excluded_dates = models.JSONField(
+        default=list,
+        blank=True,
+        help_text='Dates (YYYY-MM-DD) the rule does not apply to'
+    )
+    is_active = models.BooleanField(
+        default=True,
+        help_text='Whether this rule is active'
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'availability_rules'
+        ordering = ['valid_from', 'start_time']
+    
+    def __str__(self):
+        days = ', '.join(dict(self.WEEKDAY_CHOICES)[day][:3] for day in sorted(self.weekdays))
+        return f"{self.admin.username} - {days} ({self.start_time}-{self.end_time})"
+    
+    def clean(self):
+        """Validate times, slot duration, weekdays and validity range"""
+        if self.start_time >= self.end_time:
+            raise ValidationError('End time must be after start time')
+        
+        if self.slot_duration not in [15, 30, 60]:
+            raise ValidationError('Slot duration must be 15, 30, or 60 minutes')
+        
+        if not self.weekdays or any(day not in range(7) for day in self.weekdays):
+            raise ValidationError('Weekdays must be a non-empty list of numbers from 0 to 6')
+        
+        if self.valid_until and self.valid_until < self.valid_from:
+            raise ValidationError('valid_until must not be before valid_from')
+        
+        try:
+            for excluded in self.excluded_dates:
+                date.fromisoformat(excluded)
+        except (TypeError, ValueError):
+            raise ValidationError('Excluded dates must be YYYY-MM-DD strings')
+    
+    def save(self, *args, **kwargs):
+        self.full_clean()
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            
+            from .changes import rule_changed
+            rule_changed(self.admin_id)
+    
+    def delete(self, *args, **kwargs):
+        admin_id = self.admin_id
+        with transaction.atomic():
+            result = super().delete(*args, **kwargs)
+            
+            from .changes import rule_changed
+            rule_changed(admin_id)
+        return result
+    
+    def dates_between(self, start_date, end_date):
+        """
+        Yield the dates in [start_date, end_date] this rule generates a window for
+        """
+        if not self.is_active:
+            return
+        
+        current = max(start_date, self.valid_from)
+        last = min(end_date, self.valid_until) if self.valid_until else end_date
+        weekdays = set(self.weekdays)
+        excluded = set(self.excluded_dates)
+        
+        while current <= last:
+            if current.weekday() in weekdays and current.isoformat() not in excluded:
+                yield current
+            current += timedelta(days=1)
+
+
+class AvailabilitySlot(models.Model):
+    """
+    Materialized bookable slot generated from an Availability window
+    """
+    availability = models.ForeignKey(
+        Availability,
+        on_delete=models.CASCADE,
+        related_name='slots'
+    )
+    admin = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='availability_slots'
+    )
+    date = models.DateField(help_text='Slot date')
+    start_time = models.TimeField(help_text='Slot start time')
+    end_time = models.TimeField(help_text='Slot end time')
+    booking = models.ForeignKey(
+        'bookings.Booking',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+',
+        help_text='Active booking overlapping this slot'
+    )
+    is_free = models.BooleanField(
+        default=True,
+        help_text='Whether no active booking overlaps this slot'
+    )
+    
+    class Meta:
+        db_table = 'availability_slots'
+        ordering = ['date', 'start_time']
+        indexes = [
+            models.Index(fields=['admin', 'date', 'is_free'], name='slot_admin_date_free_idx'),
+        ]
+    
+    def __str__(self):
+        state = 'free' if self.is_free else 'booked'
+        return f"{self.admin_id} - {self.date} ({self.start_time}-{self.end_time}) {state}"
+
+
+class DailyUtilization(models.Model):
+    """
+    Rollup of one admin's availability and bookings on one date
+    
+    Recomputed by the rollup job for days marked dirty by availability and
+    booking writes; see availability.rollups.
+    """
+    admin = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+    date = models.DateField()
+    available_minutes = models.PositiveIntegerField(
+        default=0,
+        help_text='Minutes covered by bookable slots'
+    )
+    booked_minutes = models.PositiveIntegerField(
+        default=0,
+        help_text='Minutes covered by confirmed and pending bookings'
+    )
+    confirmed_count = models.PositiveIntegerField(default=0)
+    pending_count = models.PositiveIntegerField(default=0)
+    cancelled_count = models.PositiveIntegerField(default=0)
+    hourly_bookings = models.JSONField(
+        default=list,
+        help_text='Confirmed and pending bookings starting in each hour (24 counts)'
+    )
+    computed_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'daily_utilization'
+        ordering = ['date']
+        constraints = [
+            models.UniqueConstraint(fields=['admin', 'date'], name='unique_daily_utilization')
+        ]
+    
+    def __str__(self):
+        return f"Utilization of {self.admin_id} on {self.date}"
+
+
+class UtilizationDirtyDay(models.Model):
+    """
+    Admin day whose DailyUtilization row is out of date
+    
+    A row without a date marks every day of the admin, e.g. after a
+    recurring rule changed.
+    """
+    admin = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+    date = models.DateField(null=True, blank=True)
+    marked_at = models.DateTimeField()
+    
+    class Meta:
+        db_table = 'utilization_dirty_days'
+        constraints = [
+            models.UniqueConstraint(fields=['admin', 'date'], name='unique_utilization_dirty_day')
+        ]
+    
+    def __str__(self):
+        return f"Dirty utilization of {self.admin_id} on {self.date or 'all days'}"
+
+
+class SlotHold(models.Model):
+    """
+    Short-lived hold on a slot by the user filling in its booking form
+    
+    Each user holds at most one slot. Rows are written under the booking
+    lock of the admin's day; see availability.holds.
+    """
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+    admin = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+    date = models.DateField()
+    start_time = models.TimeField()
+    end_time = models.TimeField()
+    expires_at = models.DateTimeField()
+    
+    class Meta:
+        db_table = 'slot_holds'
+        indexes = [
+            models.Index(fields=['admin', 'date', 'start_time'], name='slot_hold_day_idx'),
+        ]
+    
+    def __str__(self):
+        return f"Hold of {self.admin_id} on {self.date} at {self.start_time} by {self.user_id}"
@@ -0,0 +1,317 @@
+"""
+Daily utilization rollups for admin analytics.
+
+Availability and booking writes only mark their (admin, date) dirty, one
+upsert per write. The rollup job (python manage.py rollup_utilization)
+recomputes the dirty days in batches, so reports read one DailyUtilization row
+per day instead of raw availability and booking rows.
+
+A dirty mark is cleared only if it was not marked again while the job was
+computing it, so writes racing the job are never lost.
+"""
+from collections import defaultdict
+from datetime import timedelta
+from itertools import chain
+
+from django.db.models import Max, Min, Q
+from django.utils import timezone
+
+from .models import (
+    Availability, AvailabilityRule, DailyUtilization, UtilizationDirtyDay
+)
+from .slots import collect_windows, iter_window_slots, to_seconds
+
+
+# Recurring rules have no end date; roll up this far past today
+RULE_HORIZON_DAYS = 366
+
+# Days per recompute query when a range is rolled up
+CHUNK_DAYS = 31
+
+DEFAULT_BATCH_SIZE = 500
+
+
+def mark_days_dirty(days):
+    """
+    Mark (admin_id, date) pairs for recomputation
+
+    Args:
+        days: Iterable of (admin_id, date) tuples
+    """
+    now = timezone.now()
+    UtilizationDirtyDay.objects.bulk_create(
+        [
+            UtilizationDirtyDay(admin_id=admin_id, date=date, marked_at=now)
+            for admin_id, date in set(days)
+        ],
+        update_conflicts=True,
+        unique_fields=['admin', 'date'],
+        update_fields=['marked_at']
+    )
+
+
+def mark_admin_dirty(admin_id):
+    """Mark every day of an admin for recomputation"""
+    # NULL dates never conflict in the unique constraint, so refresh the
+    # admin's existing mark rather than adding another
+    UtilizationDirtyDay.objects.update_or_create(
+        admin_id=admin_id, date=None, defaults={'marked_at': timezone.now()}
+    )
+
+
+def compute_rollups(admin_ids, start_date, end_date):
+    """
+    Compute utilization for several admins over a date range
+
+    Returns:
+        Dict mapping (admin_id, date) -> DailyUtilization field values, for
+        the days that have availability or bookings
+    """
+    from bookings.models import ArchivedBooking, Booking
+
+    rollups = {}
+
+    def rollup(day):
+        if day not in rollups:
+            rollups[day] = {
+                'available_minutes': 0,
+                'booked_minutes': 0,
+                'confirmed_count': 0,
+                'pending_count': 0,
+                'cancelled_count': 0,
+                'hourly_bookings': [0] * 24,
+            }
+        return rollups[day]
+
+    for day, windows in collect_windows(admin_ids, start_date, end_date).items():
+        rollup(day)['available_minutes'] = sum(
+            len(iter_window_slots(window)) * window.slot_duration for window in windows
+        )
+
+    # Archived bookings still count towards their day
+    bookings = chain.from_iterable(
+        model.objects.filter(
+            admin_id__in=admin_ids,
+            date__range=(start_date, end_date)
+        ).order_by().values_list('admin_id', 'date', 'start_time', 'end_time', 'status')
+        for model in (Booking, ArchivedBooking)
+    )
+    for admin_id, date, start_time, end_time, status in bookings:
+        values = rollup((admin_id, date))
+        values[f'{status}_count'] += 1
+        if status != 'cancelled':
+            values['booked_minutes'] += (to_seconds(end_time) - to_seconds(start_time)) // 60
+            values['hourly_bookings'][start_time.hour] += 1
+
+    return rollups
+
+
+def _date_chunks(start_date, end_date):
+    while start_date <= end_date:
+        chunk_end = min(start_date + timedelta(days=CHUNK_DAYS - 1), end_date)
+        yield start_date, chunk_end
+        start_date = chunk_end + timedelta(days=1)
+
+
+def refresh_rollups(admin_id, dates):
+    """
+    Recompute the DailyUtilization rows of one admin for the given dates
+
+    Dates are loaded in chunks, so a long run of dirty days costs one set of
+    queries per CHUNK_DAYS. Days left with neither availability nor bookings
+    lose their row.
+
+    Returns:
+        Number of days recomputed
+    """
+    dates = sorted(set(dates))
+    if not dates:
+        return 0
+
+    refreshed = 0
+    for chunk_start, chunk_end in _date_chunks(dates[0], dates[-1]):
+        chunk = [date for date in dates if chunk_start <= date <= chunk_end]
+        if not chunk:
+            continue
+        rollups = compute_rollups([admin_id], chunk_start, chunk_end)
+
+        rows = [
+            DailyUtilization(admin_id=admin_id, date=date, **rollups[(admin_id, date)])
+            for date in chunk if (admin_id, date) in rollups
+        ]
+        DailyUtilization.objects.bulk_create(
+            rows,
+            update_conflicts=True,
+            unique_fields=['admin', 'date'],
+            update_fields=[
+                'available_minutes', 'booked_minutes', 'confirmed_count',
+                'pending_count', 'cancelled_count', 'hourly_bookings', 'computed_at'
+            ]
+        )
+        DailyUtilization.objects.filter(
+            admin_id=admin_id,
+            date__in=[date for date in chunk if (admin_id, date) not in rollups]
+        ).delete()
+        refreshed += len(chunk)
+    return refreshed
+
+
+def admin_date_range(admin_id):
+    """
+    Return the (first, last) date an admin may have utilization for
+
+    Covers every Availability, Booking and ArchivedBooking row, and
+    recurring rules up to their end date; open-ended rules are covered
+    RULE_HORIZON_DAYS past today or their start, whichever is later.
+    Returns None if the admin has none of these.
+    """
+    from bookings.models import ArchivedBooking, Booking
+
+    bounds = []
+    for queryset in (Availability.objects, Booking.objects, ArchivedBooking.objects):
+        row = queryset.filter(admin_id=admin_id).aggregate(first=Min('date'), last=Max('date'))
+        if row['first']:
+            bounds.append((row['first'], row['last']))
+
+    rules = AvailabilityRule.objects.filter(admin_id=admin_id).aggregate(
+        first=Min('valid_from'),
+        last=Max('valid_until'),
+        open_from=Max('valid_from', filter=Q(valid_until__isnull=True))
+    )
+    if rules['first']:
+        last = rules['last'] or rules['first']
+        if rules['open_from']:
+            horizon_start = max(rules['open_from'], timezone.localdate())
+            last = max(last, horizon_start + timedelta(days=RULE_HORIZON_DAYS))
+        bounds.append((rules['first'], last))
+
+    if not bounds:
+        return None
+    return min(start for start, _ in bounds), max(end for _, end in bounds)
+
+
+def process_dirty_days(batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Recompute every dirty day, a batch of marks at a time
+
+    Returns:
+        Number of days recomputed
+    """
+    refreshed = 0
+    while True:
+        marks = list(UtilizationDirtyDay.objects.order_by('id')[:batch_size])
+        if not marks:
+            return refreshed
+
+        dates_by_admin = defaultdict(set)
+        whole_admins = set()
+        for mark in marks:
+            if mark.date is None:
+                whole_admins.add(mark.admin_id)
+            else:
+                dates_by_admin[mark.admin_id].add(mark.date)
+
+        for admin_id in whole_admins:
+            bounds = admin_date_range(admin_id)
+            # Rows outside the admin's current range are stale
+            stale = DailyUtilization.objects.filter(admin_id=admin_id)
+            if bounds:
+                first, last = bounds
+                stale = stale.exclude(date__range=(first, last))
+                refreshed += refresh_rollups(admin_id, [
+                    first + timedelta(days=offset)
+                    for offset in range((last - first).days + 1)
+                ])
+            stale.delete()
+            dates_by_admin.pop(admin_id, None)
+
+        for admin_id, dates in dates_by_admin.items():
+            refreshed += refresh_rollups(admin_id, dates)
+
+        # Marks re-set while we were computing keep their new timestamp and
+        # stay for the next batch
+        ids_by_mark_time = defaultdict(list)
+        for mark in marks:
+            ids_by_mark_time[mark.marked_at].append(mark.pk)
+        for marked_at, ids in ids_by_mark_time.items():
+            UtilizationDirtyDay.objects.filter(pk__in=ids, marked_at=marked_at).delete()
+
+
+def rebuild_rollups(start_date, end_date):
+    """
+    Recompute utilization of every admin over a date range
+
+    Returns:
+        Number of rows written
+    """
+    from users.models import User
+
+    admin_ids = list(User.objects.filter(role__in=['admin', 'superadmin']).values_list('id', flat=True))
+    written = 0
+    for chunk_start, chunk_end in _date_chunks(start_date, end_date):
+        rollups = compute_rollups(admin_ids, chunk_start, chunk_end)
+        DailyUtilization.objects.filter(date__range=(chunk_start, chunk_end)).delete()
+        DailyUtilization.objects.bulk_create(
+            [
+                DailyUtilization(admin_id=admin_id, date=date, **values)
+                for (admin_id, date), values in rollups.items()
+            ],
+            batch_size=1000
+        )
+        written += len(rollups)
+    return written
+
+
+def utilization_report(admin_id, start_date, end_date):
+    """
+    Summarize an admin's rollups over a date range with one range query
+
+    Returns:
+        Dict with totals, a per-month breakdown and bookings per start hour
+    """
+    def empty():
+        return {
+            'available_minutes': 0,
+            'booked_minutes': 0,
+            'confirmed': 0,
+            'pending': 0,
+            'cancelled': 0,
+        }
+
+    totals = empty()
+    months = defaultdict(empty)
+    hourly = [0] * 24
+
+    for row in DailyUtilization.objects.filter(
+        admin_id=admin_id,
+        date__range=(start_date, end_date)
+    ).values_list(
+        'date', 'available_minutes', 'booked_minutes', 'confirmed_count',
+        'pending_count', 'cancelled_count', 'hourly_bookings'
+    ):
+        date, available, booked, confirmed, pending, cancelled, hours = row
+        for bucket in (totals, months[date.strftime('%Y-%m')]):
+            bucket['available_minutes'] += available
+            bucket['booked_minutes'] += booked
+            bucket['confirmed'] += confirmed
+            bucket['pending'] += pending
+            bucket['cancelled'] += cancelled
+        for hour, count in enumerate(hours):
+            hourly[hour] += count
+
+    def summarize(bucket):
+        bookings = bucket['confirmed'] + bucket['pending'] + bucket['cancelled']
+        bucket['utilization'] = (
+            round(bucket['booked_minutes'] / bucket['available_minutes'], 4)
+            if bucket['available_minutes'] else None
+        )
+        bucket['cancellation_rate'] = round(bucket['cancelled'] / bookings, 4) if bookings else None
+        return bucket
+
+    peak = max(hourly)
+    return {
+        'totals': summarize(totals),
+        'months': [dict(month=month, **summarize(bucket)) for month, bucket in sorted(months.items())],
+        'hourly_bookings': hourly,
+        'peak_hours': [hour for hour, count in enumerate(hourly) if peak and count == peak],
+    }
@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from .models import Availability
+from .models import Availability, AvailabilityRule
 from users.serializers import UserSerializer
 from datetime import datetime, timedelta
 
@@ -8,19 +8,35 @@ class AvailabilitySerializer(serializers.ModelSerializer):
     """Serializer for Availability model"""
     admin_details = UserSerializer(source='admin', read_only=True)
     total_slots = serializers.SerializerMethodField()
+    booked_slots = serializers.SerializerMethodField()
+    free_slots = serializers.SerializerMethodField()
     
     class Meta:
         model = Availability
         fields = [
             'id', 'admin', 'admin_details', 'date', 'start_time',
             'end_time', 'slot_duration', 'is_active', 'total_slots',
-            'created_at', 'updated_at'
+            'booked_slots', 'free_slots', 'created_at', 'updated_at'
         ]
         read_only_fields = ['id', 'admin', 'created_at', 'updated_at']
     
     def get_total_slots(self, obj):
         """Calculate total number of slots"""
-        return len(obj.get_time_slots())
+        return obj.count_time_slots()
+    
+    def get_booked_slots(self, obj):
+        """Booked slots, from the with_slot_counts annotation when present"""
+        booked = getattr(obj, 'booked_slot_count', None)
+        if booked is None:
+            booked = obj.slots.filter(is_free=False).count()
+        return booked
+    
+    def get_free_slots(self, obj):
+        """Bookable slots (none for inactive availability)"""
+        free = getattr(obj, 'free_slot_count', None)
+        if free is None:
+            free = obj.slots.filter(is_free=True).count()
+        return free
     
     def validate(self, attrs):
         """Validate availability data"""
@@ -43,9 +59,172 @@ class AvailabilitySerializer(serializers.ModelSerializer):
         return attrs
 
 
+class AvailabilityRuleSerializer(serializers.ModelSerializer):
+    """Serializer for recurring AvailabilityRule"""
+    excluded_dates = serializers.ListField(
+        child=serializers.DateField(),
+        required=False
+    )
+    
+    class Meta:
+        model = AvailabilityRule
+        fields = [
+            'id', 'admin', 'weekdays', 'start_time', 'end_time',
+            'slot_duration', 'valid_from', 'valid_until', 'excluded_dates',
+            'is_active', 'created_at', 'updated_at'
+        ]
+        read_only_fields = ['id', 'admin', 'created_at', 'updated_at']
+    
+    def validate(self, attrs):
+        """Validate rule data"""
+        instance = self.instance
+        start_time = attrs.get('start_time', getattr(instance, 'start_time', None))
+        end_time = attrs.get('end_time', getattr(instance, 'end_time', None))
+        weekdays = attrs.get('weekdays', getattr(instance, 'weekdays', None))
+        
+        if start_time and end_time and start_time >= end_time:
+            raise serializers.ValidationError({
+                'end_time': 'End time must be after start time'
+            })
+        
+        if not weekdays or any(not isinstance(day, int) or day not in range(7) for day in weekdays):
+            raise serializers.ValidationError({
+                'weekdays': 'Must be a non-empty list of numbers from 0 (Monday) to 6 (Sunday)'
+            })
+        
+        # Excluded dates are stored as ISO strings in a JSON field
+        if 'excluded_dates' in attrs:
+            attrs['excluded_dates'] = sorted({day.isoformat() for day in attrs['excluded_dates']})
+        
+        return attrs
+
+
+class AvailabilityWindowSerializer(serializers.Serializer):
+    """Serializer for one window of a bulk availability request"""
+    date = serializers.DateField()
+    start_time = serializers.TimeField()
+    end_time = serializers.TimeField()
+    slot_duration = serializers.ChoiceField(choices=[15, 30, 60], default=30)
+    
+    def validate(self, attrs):
+        """Validate window data"""
+        if attrs['date'] < datetime.now().date():
+            raise serializers.ValidationError({
+                'date': 'Cannot create availability for past dates'
+            })
+        
+        if attrs['start_time'] >= attrs['end_time']:
+            raise serializers.ValidationError({
+                'end_time': 'End time must be after start time'
+            })
+        
+        return attrs
+
+
+class WeekTemplateEntrySerializer(serializers.Serializer):
+    """Serializer for one weekday entry of a weekly availability template"""
+    weekday = serializers.IntegerField(min_value=0, max_value=6, help_text='0 = Monday, 6 = Sunday')
+    start_time = serializers.TimeField()
+    end_time = serializers.TimeField()
+    slot_duration = serializers.ChoiceField(choices=[15, 30, 60], default=30)
+    
+    def validate(self, attrs):
+        if attrs['start_time'] >= attrs['end_time']:
+            raise serializers.ValidationError({
+                'end_time': 'End time must be after start time'
+            })
+        return attrs
+
+
+class BulkAvailabilitySerializer(serializers.Serializer):
+    """
+    Serializer for bulk availability creation
+    
+    Accepts either an explicit list of windows, or a weekly template plus a
+    date range which is expanded into windows.
+    """
+    MAX_WINDOWS = 1000
+    MAX_TEMPLATE_DAYS = 366
+    
+    windows = AvailabilityWindowSerializer(many=True, required=False)
+    template = WeekTemplateEntrySerializer(many=True, required=False)
+    start_date = serializers.DateField(required=False)
+    end_date = serializers.DateField(required=False)
+    
+    def validate(self, attrs):
+        """Check the request shape and expand templates into windows"""
+        windows = attrs.get('windows')
+        template = attrs.get('template')
+        
+        if (windows is None) == (template is None):
+            raise serializers.ValidationError(
+                'Provide either windows or template, but not both'
+            )
+        
+        if template is not None:
+            start_date = attrs.get('start_date')
+            end_date = attrs.get('end_date')
+            if not start_date or not end_date:
+                raise serializers.ValidationError({
+                    'start_date': 'start_date and end_date are required with a template'
+                })
+            if start_date < datetime.now().date():
+                raise serializers.ValidationError({
+                    'start_date': 'Cannot create availability for past dates'
+                })
+            if end_date < start_date:
+                raise serializers.ValidationError({
+                    'end_date': 'end_date must not be before start_date'
+                })
+            if (end_date - start_date).days + 1 > self.MAX_TEMPLATE_DAYS:
+                raise serializers.ValidationError({
+                    'end_date': f'Template range cannot exceed {self.MAX_TEMPLATE_DAYS} days'
+                })
+            
+            windows = []
+            current = start_date
+            while current <= end_date:
+                for entry in template:
+                    if entry['weekday'] == current.weekday():
+                        windows.append({
+                            'date': current,
+                            'start_time': entry['start_time'],
+                            'end_time': entry['end_time'],
+                            'slot_duration': entry['slot_duration'],
+                        })
+                current += timedelta(days=1)
+        
+        if not windows:
+            raise serializers.ValidationError('No availability windows to create')
+        
+        if len(windows) > self.MAX_WINDOWS:
+            raise serializers.ValidationError(
+                f'Cannot create more than {self.MAX_WINDOWS} windows per request'
+            )
+        
+        attrs['windows'] = windows
+        return attrs
+
+
 class TimeSlotSerializer(serializers.Serializer):
     """Serializer for individual time slots"""
     start_time = serializers.TimeField()
     end_time = serializers.TimeField()
     is_available = serializers.BooleanField()
     booking_id = serializers.IntegerField(allow_null=True, required=False)
+
+
+class NextSlotSerializer(serializers.Serializer):
+    """Serializer for a free slot found across admins"""
+    admin = serializers.IntegerField()
+    date = serializers.DateField()
+    start_time = serializers.TimeField()
+    end_time = serializers.TimeField()
+
+
+class SlotHoldSerializer(serializers.Serializer):
+    """Serializer for placing a hold on a slot"""
+    admin = serializers.IntegerField()
+    date = serializers.DateField()
+    start_time = serializers.TimeField()
+    end_time = serializers.TimeField()
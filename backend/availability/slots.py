@@ -0,0 +1,297 @@
+"""
+Slot computation for admin availability.
+
+Availability windows and bookings for one admin and day are sorted once and
+merged in a single pass. A booking blocks every slot it overlaps, not only
+the slot whose boundaries it matches exactly.
+"""
+import heapq
+from bisect import bisect_left
+from collections import defaultdict, namedtuple
+from datetime import time, timedelta
+from functools import lru_cache
+from itertools import islice
+from operator import attrgetter, itemgetter
+
+from django.db.models import Q
+
+
+# Lightweight stand-ins for Availability and Booking rows, useful for
+# callers that already hold plain values (background jobs, benchmarks).
+Window = namedtuple('Window', ['start_time', 'end_time', 'slot_duration'])
+Busy = namedtuple('Busy', ['start_time', 'end_time', 'id'])
+
+
+def to_seconds(value):
+    """Convert a time to seconds since midnight"""
+    return value.hour * 3600 + value.minute * 60 + value.second
+
+
+@lru_cache(maxsize=None)
+def from_seconds(seconds):
+    """Convert seconds since midnight back to a time"""
+    return time(seconds // 3600, seconds % 3600 // 60, seconds % 60)
+
+
+def iter_window_slots(window):
+    """
+    Return (start, end) second offsets for every slot in a window
+
+    Args:
+        window: Availability instance or Window tuple
+    """
+    start = to_seconds(window.start_time)
+    end = to_seconds(window.end_time)
+    step = window.slot_duration * 60
+
+    return [(slot_start, slot_start + step)
+            for slot_start in range(start, end - step + 1, step)]
+
+
+class BusyIndex:
+    """
+    Sorted view of the bookings blocking one admin's day
+
+    Keeps a running maximum of booking ends in start order: among bookings
+    starting before a point, the one reaching furthest is the only one that
+    needs checking against a slot.
+    """
+
+    def __init__(self, bookings):
+        busy = sorted(
+            (to_seconds(b.start_time), to_seconds(b.end_time), getattr(b, 'id', None))
+            for b in bookings
+        )
+        self.starts = [entry[0] for entry in busy]
+        self.reach = []
+        furthest = None
+        for entry in busy:
+            if furthest is None or entry[1] > furthest[1]:
+                furthest = entry
+            self.reach.append(furthest)
+
+    def find(self, start, end):
+        """
+        Return the (start, end, id) entry blocking an interval, or None
+
+        Args:
+            start: Interval start in seconds since midnight
+            end: Interval end in seconds since midnight
+        """
+        index = bisect_left(self.starts, end)
+        if index:
+            blocking = self.reach[index - 1]
+            if blocking[1] > start:
+                return blocking
+        return None
+
+
+def compute_slots(windows, bookings):
+    """
+    Build the sorted slot list for a single admin and day
+
+    Args:
+        windows: Availability instances (or Window tuples) for the day
+        bookings: Booking instances (or Busy tuples) that block time
+
+    Returns:
+        List of dicts with start_time, end_time, is_available and booking_id,
+        ordered by start_time
+    """
+    # Each window already produces its slots in order, so the sort only has
+    # to merge those runs; ties keep window order because the sort is stable
+    slots = []
+    for window in sorted(windows, key=attrgetter('start_time')):
+        slots.extend(iter_window_slots(window))
+    slots.sort(key=itemgetter(0))
+
+    busy = BusyIndex(bookings)
+
+    result = []
+    append = result.append
+    for start, end in slots:
+        blocking = busy.find(start, end)
+        if blocking is not None:
+            append({
+                'start_time': from_seconds(start),
+                'end_time': from_seconds(end),
+                'is_available': False,
+                'booking_id': blocking[2],
+            })
+        else:
+            append({
+                'start_time': from_seconds(start),
+                'end_time': from_seconds(end),
+                'is_available': True,
+                'booking_id': None,
+            })
+
+    return result
+
+
+def merge_windows(windows):
+    """
+    Merge overlapping or adjacent windows that share a slot grid
+
+    Windows with the same slot duration whose starts are a whole number of
+    slots apart generate the same slot wherever they overlap; their union
+    generates exactly the slots of both, once. Other windows are kept apart.
+
+    Returns:
+        List of Window tuples
+    """
+    runs = defaultdict(list)
+    for window in windows:
+        start = to_seconds(window.start_time)
+        step = window.slot_duration * 60
+        runs[(step, start % step)].append((start, to_seconds(window.end_time)))
+
+    merged = []
+    for (step, _), intervals in runs.items():
+        intervals.sort()
+        start, end = intervals[0]
+        for next_start, next_end in intervals[1:]:
+            if next_start <= end:
+                end = max(end, next_end)
+                continue
+            merged.append(Window(from_seconds(start), from_seconds(end), step // 60))
+            start, end = next_start, next_end
+        merged.append(Window(from_seconds(start), from_seconds(end), step // 60))
+    return merged
+
+
+def collect_windows(admin_ids, start_date, end_date):
+    """
+    Load the availability windows of several admins over a date range
+
+    Concrete Availability rows win over recurring rules: a date with any
+    Availability row for an admin (even an inactive one, which blocks the
+    day) never gets a rule-generated window. Rules are only expanded for the
+    requested range, and the windows of overlapping rules are merged so a
+    slot is generated once.
+
+    Returns:
+        Dict mapping (admin_id, date) -> list of windows
+    """
+    from .models import Availability, AvailabilityRule
+
+    windows_by_day = defaultdict(list)
+    concrete_days = set()
+    for availability in Availability.objects.filter(
+        admin_id__in=admin_ids,
+        date__range=(start_date, end_date)
+    ).only('admin_id', 'date', 'start_time', 'end_time', 'slot_duration', 'is_active'):
+        day = (availability.admin_id, availability.date)
+        concrete_days.add(day)
+        if availability.is_active:
+            windows_by_day[day].append(availability)
+
+    rules = AvailabilityRule.objects.filter(
+        Q(valid_until__isnull=True) | Q(valid_until__gte=start_date),
+        admin_id__in=admin_ids,
+        valid_from__lte=end_date,
+        is_active=True
+    )
+    rule_windows = defaultdict(list)
+    for rule in rules:
+        for date in rule.dates_between(start_date, end_date):
+            day = (rule.admin_id, date)
+            if day not in concrete_days:
+                rule_windows[day].append(rule)
+
+    for day, windows in rule_windows.items():
+        windows_by_day[day] = windows if len(windows) == 1 else merge_windows(windows)
+
+    return windows_by_day
+
+
+def compute_slots_for_range(admin_ids, start_date, end_date):
+    """
+    Build slots for several admins over a date range with three queries
+
+    Args:
+        admin_ids: Admin user IDs to include
+        start_date: First date of the range (inclusive)
+        end_date: Last date of the range (inclusive)
+
+    Returns:
+        Dict mapping admin_id -> {date: slot list}, containing only the
+        admin/date pairs that have availability
+    """
+    from bookings.models import Booking
+
+    windows_by_day = collect_windows(admin_ids, start_date, end_date)
+
+    bookings_by_day = defaultdict(list)
+    if windows_by_day:
+        for booking in Booking.objects.filter(
+            admin_id__in=admin_ids,
+            date__range=(start_date, end_date),
+            status__in=['confirmed', 'pending']
+        ).only('id', 'admin_id', 'date', 'start_time', 'end_time'):
+            bookings_by_day[(booking.admin_id, booking.date)].append(booking)
+
+    result = defaultdict(dict)
+    for (admin_id, date), windows in sorted(windows_by_day.items()):
+        result[admin_id][date] = compute_slots(windows, bookings_by_day.get((admin_id, date), []))
+
+    return dict(result)
+
+
+def _free_slot_stream(admin_id, slots_by_date, after):
+    """Yield (date, start_time, end_time, admin_id) for an admin's free slots in order"""
+    for date in sorted(slots_by_date):
+        for slot in slots_by_date[date]:
+            if slot['is_available'] and (date, slot['start_time']) >= after:
+                yield date, slot['start_time'], slot['end_time'], admin_id
+
+
+def iter_next_free_slots(admin_ids, start, horizon_days=60, duration=None):
+    """
+    Yield free slots across admins in chronological order
+
+    Dates are loaded in chunks that double in size (1, 2, 4... days), and
+    each chunk's per-admin streams are combined with a heap-based k-way
+    merge. Consumers that stop early never load the later chunks, so the
+    work done grows with the number of slots taken rather than with
+    admins x days.
+
+    Args:
+        admin_ids: Admin user IDs to search
+        start: datetime; only slots starting at or after it are returned
+        horizon_days: Number of days to search before giving up
+        duration: Optional minimum slot length in minutes
+
+    Yields:
+        (date, start_time, end_time, admin_id) tuples
+    """
+    after = (start.date(), start.time().replace(microsecond=0))
+    first_day = start.date()
+    last_day = first_day + timedelta(days=horizon_days - 1)
+    chunk_start = first_day
+    chunk_days = 1
+
+    while chunk_start <= last_day:
+        chunk_end = min(chunk_start + timedelta(days=chunk_days - 1), last_day)
+        slots_by_admin = compute_slots_for_range(admin_ids, chunk_start, chunk_end)
+
+        streams = [
+            _free_slot_stream(admin_id, slots_by_date, after)
+            for admin_id, slots_by_date in slots_by_admin.items()
+        ]
+        for date, start_time, end_time, admin_id in heapq.merge(*streams):
+            if duration and to_seconds(end_time) - to_seconds(start_time) < duration * 60:
+                continue
+            yield date, start_time, end_time, admin_id
+
+        chunk_start = chunk_end + timedelta(days=1)
+        chunk_days *= 2
+
+
+def find_next_free_slots(admin_ids, start, count, horizon_days=60, duration=None):
+    """
+    Return the first `count` free slots across admins from a point in time
+
+    See iter_next_free_slots for the search strategy.
+    """
+    return list(islice(iter_next_free_slots(admin_ids, start, horizon_days, duration), count))
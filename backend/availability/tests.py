@@ -1,3 +1,1027 @@
+import base64
+import time as clock
+from datetime import date, datetime, time, timedelta
+
+from django.core.cache import cache
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient, APIRequestFactory
+
+from bookings.models import Booking
+from calendar_scheduler.testing import QueryPlanMixin
+from users.models import User
+from .models import (
+    Availability, AvailabilityRule, AvailabilitySlot, DailyUtilization, SlotHold, UtilizationDirtyDay
+)
+from .cache import (
+    bump_slot_versions, get_cached_slots, get_slot_cache_stats, get_slot_version, set_cached_slots
+)
+from .freebusy import build_week_matrix, day_bits, encode_bitstring, encode_runs
+from .holds import HoldUnavailable, place_hold
+from .materialized import find_slot_drift, rebuild_all_slots
+from .rollups import process_dirty_days
+from .slots import (
+    Busy, BusyIndex, Window, compute_slots, compute_slots_for_range, find_next_free_slots, to_seconds
+)
+from .views import AvailabilityListCreateView
+
+
+class AvailabilityListSlotCountsTests(TestCase):
+    """Slot counts in availability list responses come from the database"""
+
+    def setUp(self):
+        self.admin = User.objects.create_user('admin', 'admin@example.com', 'pass', role='admin')
+        self.user = User.objects.create_user('user', 'user@example.com', 'pass')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.start = date.today() + timedelta(days=1)
+
+    def _create_availability(self, count):
+        existing = Availability.objects.count()
+        for offset in range(existing, existing + count):
+            Availability.objects.create(
+                admin=self.admin,
+                date=self.start + timedelta(days=offset),
+                start_time=time(9),
+                end_time=time(11),
+                slot_duration=30
+            )
+
+    def _list_query_count(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/availability/')
+        self.assertEqual(response.status_code, 200)
+        return len(queries), response.json()
+
+    def test_counts_include_bookings(self):
+        self._create_availability(1)
+        Booking.objects.create(
+            user=self.user,
+            admin=self.admin,
+            date=self.start,
+            start_time=time(9, 15),
+            end_time=time(9, 45),
+            meeting_purpose='Sync'
+        )
+
+        _, data = self._list_query_count()
+        row = data['results'][0]
+        self.assertEqual(row['total_slots'], 4)
+        self.assertEqual(row['booked_slots'], 2)
+        self.assertEqual(row['free_slots'], 2)
+
+    def test_query_count_is_constant_in_page_size(self):
+        self._create_availability(2)
+        small_page_queries, data = self._list_query_count()
+        self.assertEqual(len(data['results']), 2)
+
+        self._create_availability(30)
+        full_page_queries, data = self._list_query_count()
+        self.assertEqual(len(data['results']), 20)
+
+        self.assertEqual(small_page_queries, full_page_queries)
+
+
+class AvailabilityQueryPlanTests(QueryPlanMixin, TestCase):
+    """Hot availability queries are served by indexes"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admins = [
+            User.objects.create_user(f'admin{i}', f'admin{i}@example.com', 'pass', role='admin')
+            for i in range(5)
+        ]
+        cls.user = User.objects.create_user('user', 'user@example.com', 'pass')
+        cls.superadmin = User.objects.create_user('root', 'root@example.com', 'pass', role='superadmin')
+        cls.today = date.today()
+        Availability.objects.bulk_create([
+            Availability(
+                admin=admin,
+                date=cls.today + timedelta(days=day),
+                start_time=time(hour),
+                end_time=time(hour + 1),
+                slot_duration=30,
+                is_active=day % 7 != 0
+            )
+            for admin in cls.admins
+            for day in range(-60, 120)
+            for hour in (9, 13)
+        ])
+        cls.analyze()
+
+    def _list_queryset(self, user, **params):
+        """The availability list query as AvailabilityListCreateView builds it, first page"""
+        view = AvailabilityListCreateView()
+        view.request = view.initialize_request(APIRequestFactory().get('/api/availability/', params))
+        view.request.user = user
+        return view.get_queryset().order_by('-date', 'start_time', 'id')[:21]
+
+    def test_list_queries(self):
+        window = {'start_date': self.today.isoformat(), 'end_date': (self.today + timedelta(days=30)).isoformat()}
+        for user in (self.superadmin, self.admins[0], self.user):
+            for params in ({}, {'admin': self.admins[1].id}, window):
+                self.assertNoFullScan(self._list_queryset(user, **params), f'{user.role} list {params}')
+
+    def test_window_and_slot_queries(self):
+        admin = self.admins[0]
+        week = (self.today, self.today + timedelta(days=6))
+        querysets = {
+            'windows in range': Availability.objects.filter(
+                admin_id__in=[admin.id, self.admins[1].id], date__range=week
+            ).only('admin_id', 'date', 'start_time', 'end_time', 'slot_duration', 'is_active'),
+            'bulk conflicts': Availability.objects.filter(
+                admin=admin, date__range=week
+            ).only('date', 'start_time', 'end_time'),
+            'materialized slots': AvailabilitySlot.objects.filter(
+                admin_id=admin.id, date=self.today
+            ).order_by('start_time', 'id').values('start_time', 'end_time', 'is_free', 'booking_id'),
+        }
+        for label, queryset in querysets.items():
+            self.assertNoFullScan(queryset, label)
+
+
+class UtilizationRollupTests(TestCase):
+    """Writes mark days dirty and the rollup job recomputes them"""
+
+    def setUp(self):
+        self.admin = User.objects.create_user('admin', 'admin@example.com', 'pass', role='admin')
+        self.user = User.objects.create_user('user', 'user@example.com', 'pass')
+        self.day = date(2030, 3, 4)
+        Availability.objects.create(
+            admin=self.admin,
+            date=self.day,
+            start_time=time(9),
+            end_time=time(12),
+            slot_duration=30
+        )
+        for start, end, status in (
+            (time(9), time(9, 30), 'confirmed'),
+            (time(10), time(11), 'pending'),
+            (time(11), time(11, 30), 'cancelled'),
+        ):
+            Booking.objects.create(
+                user=self.user,
+                admin=self.admin,
+                date=self.day,
+                start_time=start,
+                end_time=end,
+                status=status,
+                meeting_purpose='Sync'
+            )
+
+    def test_writes_mark_days_and_job_computes_them(self):
+        self.assertTrue(UtilizationDirtyDay.objects.filter(admin=self.admin, date=self.day).exists())
+
+        process_dirty_days()
+
+        self.assertFalse(UtilizationDirtyDay.objects.exists())
+        row = DailyUtilization.objects.get(admin=self.admin, date=self.day)
+        self.assertEqual(row.available_minutes, 180)
+        self.assertEqual(row.booked_minutes, 90)
+        self.assertEqual((row.confirmed_count, row.pending_count, row.cancelled_count), (1, 1, 1))
+        self.assertEqual(row.hourly_bookings[9], 1)
+        self.assertEqual(row.hourly_bookings[10], 1)
+        self.assertEqual(row.hourly_bookings[11], 0)
+
+    def test_deleting_everything_removes_the_row(self):
+        process_dirty_days()
+        Booking.objects.filter(admin=self.admin).delete()
+        for availability in Availability.objects.filter(admin=self.admin):
+            availability.delete()
+
+        process_dirty_days()
+        self.assertFalse(DailyUtilization.objects.exists())
+
+    def test_rule_change_marks_every_day_of_the_admin(self):
+        process_dirty_days()
+        rule = AvailabilityRule.objects.create(
+            admin=self.admin,
+            weekdays=[self.day.weekday()],
+            start_time=time(14),
+            end_time=time(16),
+            slot_duration=60,
+            valid_from=self.day - timedelta(days=7),
+            valid_until=self.day + timedelta(days=7)
+        )
+        rule.save()
+        self.assertEqual(UtilizationDirtyDay.objects.filter(admin=self.admin, date=None).count(), 1)
+
+        process_dirty_days()
+        # The concrete window still wins on its day; the rule fills the
+        # same weekday before and after it
+        self.assertEqual(DailyUtilization.objects.get(date=self.day).available_minutes, 180)
+        for offset in (-7, 7):
+            row = DailyUtilization.objects.get(date=self.day + timedelta(days=offset))
+            self.assertEqual(row.available_minutes, 120)
+
+    def test_report_reads_only_rollups(self):
+        process_dirty_days()
+        client = APIClient()
+        client.force_authenticate(self.admin)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get('/api/availability/analytics/utilization/', {
+                'start_date': '2030-03-01',
+                'end_date': '2030-04-30',
+            })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(queries), 1)
+        self.assertIn('daily_utilization', queries[0]['sql'])
+
+        data = response.json()
+        self.assertEqual(data['totals']['available_minutes'], 180)
+        self.assertEqual(data['totals']['booked_minutes'], 90)
+        self.assertEqual(data['totals']['utilization'], 0.5)
+        self.assertEqual(data['totals']['cancellation_rate'], 0.3333)
+        self.assertEqual([month['month'] for month in data['months']], ['2030-03'])
+        self.assertEqual(data['peak_hours'], [9, 10])
+
+    def test_report_access(self):
+        client = APIClient()
+        params = {'start_date': '2030-03-01', 'end_date': '2030-03-31'}
+
+        client.force_authenticate(self.user)
+        response = client.get('/api/availability/analytics/utilization/', params)
+        self.assertEqual(response.status_code, 403)
+
+        other = User.objects.create_user('other', 'other@example.com', 'pass', role='admin')
+        client.force_authenticate(other)
+        response = client.get('/api/availability/analytics/utilization/', {**params, 'admin': self.admin.id})
+        self.assertEqual(response.status_code, 403)
+
+        response = client.get('/api/availability/analytics/utilization/', {'start_date': '2030-03-01'})
+        self.assertEqual(response.status_code, 400)
+
+
+class SlotHoldTests(TestCase):
+    """Held slots are unavailable to everyone but their holder"""
+
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_user('admin', 'admin@example.com', 'pass', role='admin')
+        self.holder = User.objects.create_user('holder', 'holder@example.com', 'pass')
+        self.other = User.objects.create_user('other', 'other@example.com', 'pass')
+        self.day = date.today() + timedelta(days=2)
+        Availability.objects.create(
+            admin=self.admin, date=self.day, start_time=time(9), end_time=time(10), slot_duration=30
+        )
+        self.client = APIClient()
+        self.slot = {
+            'admin': self.admin.id,
+            'date': self.day.isoformat(),
+            'start_time': '09:00:00',
+            'end_time': '09:30:00',
+        }
+
+    def _as(self, user):
+        self.client.force_authenticate(user)
+        return self.client
+
+    def _slots(self, user):
+        response = self._as(user).get('/api/availability/slots/', {
+            'admin': self.admin.id, 'date': self.day.isoformat()
+        })
+        return {slot['start_time']: slot['is_available'] for slot in response.json()['slots']}
+
+    def _book(self, user):
+        return self._as(user).post('/api/bookings/', {
+            'admin': self.admin.id, 'date': self.day.isoformat(),
+            'start_time': '09:00', 'end_time': '09:30', 'meeting_purpose': 'Sync'
+        }, format='json')
+
+    def test_hold_hides_slot_from_others_only(self):
+        response = self._as(self.holder).post('/api/availability/slots/holds/', self.slot, format='json')
+        self.assertEqual(response.status_code, 201)
+
+        self.assertEqual(self._slots(self.other), {'09:00:00': False, '09:30:00': True})
+        self.assertEqual(self._slots(self.holder), {'09:00:00': True, '09:30:00': True})
+        response = self._as(self.other).post('/api/availability/slots/holds/', self.slot, format='json')
+        self.assertEqual(response.status_code, 409)
+
+        next_slots = self._as(self.other).get('/api/availability/slots/next/', {
+            'admins': self.admin.id, 'from': f'{self.day.isoformat()}T00:00', 'count': 2
+        }).json()['slots']
+        self.assertEqual([slot['start_time'] for slot in next_slots], ['09:30:00'])
+
+    def test_holder_books_the_held_slot(self):
+        self._as(self.holder).post('/api/availability/slots/holds/', self.slot, format='json')
+
+        self.assertEqual(self._book(self.other).status_code, 409)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self._book(self.holder).status_code, 201)
+        self.assertEqual(self._as(self.holder).get('/api/availability/slots/holds/').status_code, 404)
+
+    def test_bookings_overlapping_a_hold_are_rejected(self):
+        self._as(self.holder).post('/api/availability/slots/holds/', self.slot, format='json')
+        response = self._as(self.other).post('/api/bookings/', {
+            'admin': self.admin.id, 'date': self.day.isoformat(),
+            'start_time': '09:05', 'end_time': '09:35', 'meeting_purpose': 'Sync'
+        }, format='json')
+        self.assertEqual(response.status_code, 409)
+        self.assertFalse(Booking.objects.exists())
+        self.assertEqual(self._book(self.holder).status_code, 201)
+
+    def test_bulk_bookings_of_held_slots_are_rejected_per_item(self):
+        place_hold(self.holder.id, self.admin.id, self.day, time(9), time(9, 30))
+        response = self._as(self.other).post('/api/bookings/bulk/', {
+            'partial': True,
+            'bookings': [
+                {'admin': self.admin.id, 'date': self.day.isoformat(),
+                 'start_time': '09:15', 'end_time': '09:45', 'meeting_purpose': 'Sync'},
+                {'admin': self.admin.id, 'date': self.day.isoformat(),
+                 'start_time': '09:30', 'end_time': '10:00', 'meeting_purpose': 'Sync'},
+            ]
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        results = response.json()['results']
+        self.assertEqual([result['status'] for result in results], ['rejected', 'created'])
+        self.assertEqual(results[0]['errors'], ['This slot is held by another user'])
+        self.assertEqual(list(Booking.objects.values_list('start_time', flat=True)), [time(9, 30)])
+
+    def test_overlapping_holds_are_refused(self):
+        place_hold(self.holder.id, self.admin.id, self.day, time(9), time(9, 30))
+        with self.assertRaises(HoldUnavailable):
+            place_hold(self.other.id, self.admin.id, self.day, time(9, 15), time(9, 45))
+        place_hold(self.other.id, self.admin.id, self.day, time(9, 30), time(10))
+        self.assertEqual(SlotHold.objects.count(), 2)
+
+    def test_new_hold_releases_the_previous_one(self):
+        self._as(self.holder).post('/api/availability/slots/holds/', self.slot, format='json')
+        self._as(self.holder).post('/api/availability/slots/holds/', {
+            **self.slot, 'start_time': '09:30:00', 'end_time': '10:00:00'
+        }, format='json')
+        self.assertEqual(self._slots(self.other), {'09:00:00': True, '09:30:00': False})
+
+        self._as(self.holder).delete('/api/availability/slots/holds/')
+        self.assertEqual(self._slots(self.other), {'09:00:00': True, '09:30:00': True})
+
+    def test_expired_hold_frees_the_slot(self):
+        place_hold(self.holder.id, self.admin.id, self.day, time(9), time(9, 30), timeout=1)
+        self.assertEqual(self._book(self.other).status_code, 409)
+        clock.sleep(1.1)
+        self.assertEqual(self._book(self.other).status_code, 201)
+
+    def test_booked_or_unknown_slots_cannot_be_held(self):
+        self._book(self.other)
+        response = self._as(self.holder).post('/api/availability/slots/holds/', self.slot, format='json')
+        self.assertEqual(response.status_code, 409)
+        response = self._as(self.holder).post('/api/availability/slots/holds/', {
+            **self.slot, 'start_time': '09:10:00', 'end_time': '09:40:00'
+        }, format='json')
+        self.assertEqual(response.status_code, 404)
+
+
+class ConditionalGetTests(TestCase):
+    """Unchanged availability and slot polls are answered with 304"""
+
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_user('admin', 'admin@example.com', 'pass', role='admin')
+        self.user = User.objects.create_user('user', 'user@example.com', 'pass')
+        self.other = User.objects.create_user('other', 'other@example.com', 'pass')
+        self.day = date.today() + timedelta(days=2)
+        Availability.objects.create(
+            admin=self.admin, date=self.day, start_time=time(9), end_time=time(10), slot_duration=30
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.slots_params = {'admin': self.admin.id, 'date': self.day.isoformat()}
+
+    def _revalidate(self, url, params, response):
+        return self.client.get(url, params, HTTP_IF_NONE_MATCH=response['ETag'])
+
+    def test_slots_revalidate_without_reading_slots(self):
+        first = self.client.get('/api/availability/slots/', self.slots_params)
+        self.assertEqual(first.status_code, 200)
+        self.assertIn('no-cache', first['Cache-Control'])
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self._revalidate('/api/availability/slots/', self.slots_params, first)
+        self.assertEqual(response.status_code, 304)
+        # Only the holds lookup; the slots come from the cache
+        self.assertEqual(len(queries), 1)
+
+        # A hold by someone else changes what this user sees
+        place_hold(self.other.id, self.admin.id, self.day, time(9), time(9, 30))
+        response = self._revalidate('/api/availability/slots/', self.slots_params, first)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], first['ETag'])
+
+    def test_booking_changes_slot_and_list_etags(self):
+        slots = self.client.get('/api/availability/slots/', self.slots_params)
+        listing = self.client.get('/api/availability/')
+        self.assertEqual(self._revalidate('/api/availability/', {}, listing).status_code, 304)
+
+        self.client.post('/api/bookings/', {
+            'admin': self.admin.id, 'date': self.day.isoformat(),
+            'start_time': '09:00', 'end_time': '09:30', 'meeting_purpose': 'Sync'
+        }, format='json')
+
+        self.assertEqual(self._revalidate('/api/availability/slots/', self.slots_params, slots).status_code, 200)
+        response = self._revalidate('/api/availability/', {}, listing)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results'][0]['booked_slots'], 1)
+
+    def test_list_etag_only_reads_bookings_of_the_page(self):
+        later = self.day + timedelta(days=1)
+        Availability.objects.create(
+            admin=self.admin, date=later, start_time=time(9), end_time=time(10), slot_duration=30
+        )
+        params = {'page_size': 1}
+        listing = self.client.get('/api/availability/', params)
+        self.assertEqual(listing.json()['results'][0]['date'], later.isoformat())
+
+        # A booking on a day the page does not show leaves its ETag alone
+        self.client.post('/api/bookings/', {
+            'admin': self.admin.id, 'date': self.day.isoformat(),
+            'start_time': '09:00', 'end_time': '09:30', 'meeting_purpose': 'Sync'
+        }, format='json')
+        with CaptureQueriesContext(connection) as queries:
+            response = self._revalidate('/api/availability/', params, listing)
+        self.assertEqual(response.status_code, 304)
+        booking_queries = [query['sql'] for query in queries if '"bookings"' in query['sql']]
+        self.assertEqual(len(booking_queries), 1)
+        self.assertNotIn(self.day.isoformat(), booking_queries[0])
+
+        self.client.post('/api/bookings/', {
+            'admin': self.admin.id, 'date': later.isoformat(),
+            'start_time': '09:00', 'end_time': '09:30', 'meeting_purpose': 'Sync'
+        }, format='json')
+        self.assertEqual(self._revalidate('/api/availability/', params, listing).status_code, 200)
+
+    def test_list_reads_its_page_once(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/availability/')
+        self.assertEqual(response.status_code, 200)
+        page_queries = [query['sql'] for query in queries if 'LIMIT' in query['sql']]
+        self.assertEqual(len(page_queries), 1)
+
+    def test_etag_is_per_user(self):
+        first = self.client.get('/api/availability/slots/', self.slots_params)
+        self.client.force_authenticate(self.other)
+        self.assertEqual(self._revalidate('/api/availability/slots/', self.slots_params, first).status_code, 200)
+
+
+class AvailabilityRuleTests(TestCase):
+    """Recurring rules expand into windows unless a concrete row overrides the day"""
+
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_user('admin', 'admin@example.com', 'pass', role='admin')
+        self.day = date.today() + timedelta(days=7)
+
+    def _rule(self, start, end, **fields):
+        return AvailabilityRule.objects.create(
+            admin=self.admin, weekdays=[self.day.weekday()], start_time=start, end_time=end,
+            slot_duration=30, valid_from=date.today(), **fields
+        )
+
+    def _starts(self, day=None):
+        slots = compute_slots_for_range([self.admin.id], day or self.day, day or self.day)
+        return [slot['start_time'] for slot in slots.get(self.admin.id, {}).get(day or self.day, [])]
+
+    def test_overlapping_rules_generate_each_slot_once(self):
+        self._rule(time(9), time(10))
+        self._rule(time(9, 30), time(11))
+        self._rule(time(9), time(10))
+        self.assertEqual(self._starts(), [time(9), time(9, 30), time(10), time(10, 30)])
+
+    def test_concrete_rows_override_the_rule_on_their_day(self):
+        self._rule(time(9), time(10))
+        Availability.objects.create(
+            admin=self.admin, date=self.day, start_time=time(14), end_time=time(15), slot_duration=60
+        )
+        self.assertEqual(self._starts(), [time(14)])
+        next_week = self.day + timedelta(days=7)
+        self.assertEqual(self._starts(next_week), [time(9), time(9, 30)])
+
+    def test_inactive_concrete_row_blocks_the_day(self):
+        self._rule(time(9), time(10))
+        Availability.objects.create(
+            admin=self.admin, date=self.day, start_time=time(9), end_time=time(10),
+            slot_duration=30, is_active=False
+        )
+        self.assertEqual(self._starts(), [])
+
+    def test_validity_range_and_excluded_dates(self):
+        self._rule(time(9), time(10), valid_until=self.day + timedelta(days=7),
+                   excluded_dates=[self.day.isoformat()])
+        self.assertEqual(self._starts(), [])
+        self.assertEqual(self._starts(self.day + timedelta(days=7)), [time(9), time(9, 30)])
+        self.assertEqual(self._starts(self.day + timedelta(days=14)), [])
+        self.assertEqual(self._starts(self.day + timedelta(days=1)), [])
+
+    def test_rule_days_are_served_by_the_slots_endpoint(self):
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        response = client.post('/api/availability/rules/', {
+            'weekdays': [self.day.weekday()], 'start_time': '09:00', 'end_time': '10:00',
+            'slot_duration': 30, 'valid_from': date.today().isoformat(),
+            'excluded_dates': [(self.day + timedelta(days=7)).isoformat()]
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+
+        slots = client.get('/api/availability/slots/', {
+            'admin': self.admin.id, 'date': self.day.isoformat()
+        }).json()['slots']
+        self.assertEqual([slot['start_time'] for slot in slots], ['09:00:00', '09:30:00'])
+        self.assertEqual(AvailabilitySlot.objects.count(), 0)
+        self.assertEqual(self._starts(self.day + timedelta(days=7)), [])
+
+
+class DefaultAdminTests(TestCase):
+    """Searches without an admins parameter cover the same admins"""
+
+    def setUp(self):
+        cache.clear()
+        self.day = date.today() + timedelta(days=2)
+        self.admin = User.objects.create_user('admin', 'admin@example.com', 'pass', role='admin')
+        self.superadmin = User.objects.create_user('super', 'super@example.com', 'pass', role='superadmin')
+        User.objects.create_user('inactive', 'inactive@example.com', 'pass', role='admin', is_active=False)
+        for admin in (self.admin, self.superadmin):
+            Availability.objects.create(
+                admin=admin, date=self.day, start_time=time(9), end_time=time(10), slot_duration=30
+            )
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def test_next_slots_and_freebusy_agree(self):
+        slots = self.client.get('/api/availability/slots/next/', {
+            'from': f'{self.day.isoformat()}T00:00', 'count': 10
+        }).json()['slots']
+        grid = self.client.get('/api/availability/freebusy/week/', {
+            'start_date': self.day.isoformat()
+        }).json()['admins']
+
+        expected = {self.admin.id, self.superadmin.id}
+        self.assertEqual({slot['admin'] for slot in slots}, expected)
+        self.assertEqual({int(admin_id) for admin_id in grid}, expected)
+
+
+class SlotEngineTests(TestCase):
+    """The sweep-line slot engine blocks every slot a booking overlaps"""
+
+    def test_bookings_block_every_overlapping_slot(self):
+        slots = compute_slots(
+            [Window(time(9), time(11), 30)],
+            [Busy(time(9, 15), time(10), 7), Busy(time(10, 30), time(10, 45), 8)]
+        )
+        self.assertEqual(
+            [(slot['start_time'], slot['is_available'], slot['booking_id']) for slot in slots],
+            [(time(9), False, 7), (time(9, 30), False, 7), (time(10), True, None), (time(10, 30), False, 8)]
+        )
+
+    def test_adjacent_bookings_do_not_block(self):
+        slots = compute_slots(
+            [Window(time(9), time(10), 30)],
+            [Busy(time(8), time(9), 1), Busy(time(10), time(11), 2)]
+        )
+        self.assertTrue(all(slot['is_available'] for slot in slots))
+
+    def test_windows_are_merged_in_start_order(self):
+        slots = compute_slots([Window(time(13), time(14), 60), Window(time(9), time(10), 30)], [])
+        self.assertEqual(
+            [(slot['start_time'], slot['end_time']) for slot in slots],
+            [(time(9), time(9, 30)), (time(9, 30), time(10)), (time(13), time(14))]
+        )
+
+    def test_busy_index_checks_the_longest_earlier_booking(self):
+        # The short booking starts later, but the long one still covers 11:00
+        index = BusyIndex([Busy(time(9), time(12), 1), Busy(time(9, 30), time(9, 45), 2)])
+        self.assertEqual(index.find(to_seconds(time(11)), to_seconds(time(11, 30)))[2], 1)
+        self.assertIsNone(index.find(to_seconds(time(12)), to_seconds(time(12, 30))))
+        self.assertIsNone(index.find(to_seconds(time(8)), to_seconds(time(9))))
+        self.assertIsNone(BusyIndex([]).find(0, 60))
+
+    def test_cancelled_bookings_leave_slots_available(self):
+        admin = User.objects.create_user('admin', 'admin@example.com', 'pass', role='admin')
+        user = User.objects.create_user('user', 'user@example.com', 'pass')
+        day = date.today() + timedelta(days=3)
+        Availability.objects.create(admin=admin, date=day, start_time=time(9), end_time=time(10), slot_duration=30)
+        Booking.objects.bulk_create([
+            Booking(user=user, admin=admin, date=day, start_time=time(9), end_time=time(9, 30),
+                    meeting_purpose='Sync', status='cancelled'),
+            Booking(user=user, admin=admin, date=day, start_time=time(9, 30), end_time=time(10),
+                    meeting_purpose='Sync', status='pending'),
+        ])
+        slots = compute_slots_for_range([admin.id], day, day)[admin.id][day]
+        self.assertEqual([slot['is_available'] for slot in slots], [True, False])
+
+
+class SlotRangeTests(TestCase):
+    """Slots for several admins and days come from one batched request"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('user', 'user@example.com', 'pass')
+        self.admins = [
+            User.objects.create_user(f'admin{index}', f'admin{index}@example.com', 'pass', role='admin')
+            for index in range(3)
+        ]
+        self.start = date.today() + timedelta(days=1)
+        for admin in self.admins:
+            for offset in range(2):
+                Availability.objects.create(
+                    admin=admin, date=self.start + timedelta(days=offset),
+                    start_time=time(9), end_time=time(10), slot_duration=30
+                )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _get(self, admins, days=2):
+        return self.client.get('/api/availability/slots/range/', {
+            'admins': ','.join(str(admin.id) for admin in admins),
+            'start_date': self.start.isoformat(),
+            'end_date': (self.start + timedelta(days=days - 1)).isoformat(),
+        })
+
+    def test_returns_slots_per_admin_and_day(self):
+        admin = self.admins[0]
+        Booking.objects.create(
+            user=self.user, admin=admin, date=self.start,
+            start_time=time(9, 15), end_time=time(9, 45), meeting_purpose='Sync'
+        )
+        response = self._get(self.admins[:2])
+        self.assertEqual(response.status_code, 200)
+        admins = response.json()['admins']
+        self.assertEqual(set(admins), {str(self.admins[0].id), str(self.admins[1].id)})
+        first_day = admins[str(admin.id)][self.start.isoformat()]
+        self.assertEqual([slot['is_available'] for slot in first_day], [False, False])
+        self.assertEqual(len(admins[str(admin.id)]), 2)
+        self.assertTrue(all(
+            slot['is_available']
+            for slots in admins[str(self.admins[1].id)].values() for slot in slots
+        ))
+
+    def test_admins_without_availability_get_no_days(self):
+        other = User.objects.create_user('idle', 'idle@example.com', 'pass', role='admin')
+        self.assertEqual(self._get([other]).json()['admins'], {str(other.id): {}})
+
+    def test_query_count_does_not_grow_with_admins(self):
+        with CaptureQueriesContext(connection) as one:
+            self._get(self.admins[:1])
+        with CaptureQueriesContext(connection) as many:
+            self._get(self.admins)
+        self.assertEqual(len(one), len(many))
+
+    def test_rejects_invalid_ranges(self):
+        self.assertEqual(self._get(self.admins, days=32).status_code, 400)
+        self.assertEqual(self._get([]).status_code, 400)
+        response = self.client.get('/api/availability/slots/range/', {
+            'admins': 'x', 'start_date': self.start.isoformat(), 'end_date': self.start.isoformat()
+        })
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get('/api/availability/slots/range/', {
+            'admins': self.admins[0].id,
+            'start_date': self.start.isoformat(),
+            'end_date': (self.start - timedelta(days=1)).isoformat()
+        })
+        self.assertEqual(response.status_code, 400)
+
+
+class MaterializedSlotTests(TestCase):
+    """The slot table follows availability and booking writes"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('user', 'user@example.com', 'pass')
+        self.admin = User.objects.create_user('admin', 'admin@example.com', 'pass', role='admin')
+        self.day = date.today() + timedelta(days=3)
+        self.availability = Availability.objects.create(
+            admin=self.admin, date=self.day, start_time=time(9), end_time=time(10), slot_duration=30
+        )
+
+    def _flags(self, day=None):
+        return list(AvailabilitySlot.objects.filter(
+            admin=self.admin, date=day or self.day
+        ).order_by('start_time').values_list('start_time', 'is_free'))
+
+    def _book(self, start, end, day=None):
+        return Booking.objects.create(
+            user=self.user, admin=self.admin, date=day or self.day,
+            start_time=start, end_time=end, meeting_purpose='Sync'
+        )
+
+    def test_saving_a_window_regenerates_its_slots(self):
+        self.assertEqual(self._flags(), [(time(9), True), (time(9, 30), True)])
+        self.availability.end_time = time(10, 30)
+        self.availability.save()
+        self.assertEqual([start for start, _ in self._flags()], [time(9), time(9, 30), time(10)])
+        self.availability.is_active = False
+        self.availability.save()
+        self.assertEqual(self._flags(), [])
+
+    def test_booking_writes_flip_the_flags(self):
+        booking = self._book(time(9, 15), time(9, 45))
+        self.assertEqual(self._flags(), [(time(9), False), (time(9, 30), False)])
+        self.assertEqual(AvailabilitySlot.objects.filter(booking=booking).count(), 2)
+
+        booking.status = 'cancelled'
+        booking.save()
+        self.assertEqual(self._flags(), [(time(9), True), (time(9, 30), True)])
+
+        booking.status = 'confirmed'
+        booking.save()
+        booking.delete()
+        self.assertEqual(self._flags(), [(time(9), True), (time(9, 30), True)])
+        self.assertEqual(find_slot_drift(), (set(), set()))
+
+    def test_moving_a_booking_refreshes_both_days(self):
+        other_day = self.day + timedelta(days=1)
+        Availability.objects.create(
+            admin=self.admin, date=other_day, start_time=time(9), end_time=time(10), slot_duration=30
+        )
+        booking = self._book(time(9), time(9, 30))
+        booking.date = other_day
+        booking.save()
+        self.assertEqual(self._flags(), [(time(9), True), (time(9, 30), True)])
+        self.assertEqual(self._flags(other_day), [(time(9), False), (time(9, 30), True)])
+
+    def test_rebuild_repairs_drift(self):
+        # bulk_create skips Booking.save, so the slot table misses it
+        Booking.objects.bulk_create([Booking(
+            user=self.user, admin=self.admin, date=self.day,
+            start_time=time(9), end_time=time(9, 30), meeting_purpose='Sync'
+        )])
+        missing, stale = find_slot_drift()
+        self.assertEqual(len(missing), 1)
+        self.assertEqual(len(stale), 1)
+
+        self.assertEqual(rebuild_all_slots(), 2)
+        self.assertEqual(find_slot_drift(), (set(), set()))
+        self.assertEqual(self._flags(), [(time(9), False), (time(9, 30), True)])
+
+
+class SlotCacheTests(TestCase):
+    """Slot responses are cached per day version and dropped on writes"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('user', 'user@example.com', 'pass')
+        self.admin = User.objects.create_user('admin', 'admin@example.com', 'pass', role='admin')
+        self.day = date.today() + timedelta(days=3)
+        Availability.objects.create(
+            admin=self.admin, date=self.day, start_time=time(9), end_time=time(10), slot_duration=30
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _get(self):
+        response = self.client.get('/api/availability/slots/', {
+            'admin': self.admin.id, 'date': self.day.isoformat()
+        })
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_second_read_hits_and_booking_writes_invalidate(self):
+        self.assertEqual(self._get()['X-Slot-Cache'], 'MISS')
+        self.assertEqual(self._get()['X-Slot-Cache'], 'HIT')
+
+        Booking.objects.create(
+            user=self.user, admin=self.admin, date=self.day,
+            start_time=time(9), end_time=time(9, 30), meeting_purpose='Sync'
+        )
+        response = self._get()
+        self.assertEqual(response['X-Slot-Cache'], 'MISS')
+        self.assertEqual([slot['is_available'] for slot in response.json()['slots']], [False, True])
+        self.assertEqual(get_slot_cache_stats(), {'hits': 1, 'misses': 2, 'hit_rate': 0.3333})
+
+    def test_version_is_bumped_again_on_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            bump_slot_versions([(self.admin.id, self.day)])
+            # A reader caching slots before the commit stores them under this version
+            slots, version = get_cached_slots(self.admin.id, self.day)
+            set_cached_slots(self.admin.id, self.day, version, [{'stale': True}])
+            self.assertEqual(get_cached_slots(self.admin.id, self.day)[0], [{'stale': True}])
+        self.assertIsNone(get_cached_slots(self.admin.id, self.day)[0])
+
+    def test_rule_changes_invalidate_every_day_of_the_admin(self):
+        other_day = self.day + timedelta(days=1)
+        versions = [get_slot_version(self.admin.id, day) for day in (self.day, other_day)]
+        AvailabilityRule.objects.create(
+            admin=self.admin, weekdays=[0], start_time=time(9), end_time=time(10),
+            slot_duration=30, valid_from=date.today()
+        )
+        for day, version in zip((self.day, other_day), versions):
+            self.assertNotEqual(get_slot_version(self.admin.id, day), version)
+
+    def test_evicted_version_does_not_reuse_old_entries(self):
+        version = get_slot_version(self.admin.id, self.day)
+        set_cached_slots(self.admin.id, self.day, version, [])
+        cache.delete(f'slots:version:{self.admin.id}:{self.day}')
+        self.assertNotEqual(get_slot_version(self.admin.id, self.day), version)
+        self.assertIsNone(get_cached_slots(self.admin.id, self.day)[0])
+
+
+class NextFreeSlotTests(TestCase):
+    """Earliest free slots are merged across admins in time order"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('user', 'user@example.com', 'pass')
+        self.first = User.objects.create_user('first', 'first@example.com', 'pass', role='admin')
+        self.second = User.objects.create_user('second', 'second@example.com', 'pass', role='admin')
+        self.day = date.today() + timedelta(days=2)
+        self.start = datetime.combine(self.day, time())
+        Availability.objects.create(
+            admin=self.first, date=self.day, start_time=time(9), end_time=time(11), slot_duration=60
+        )
+        Availability.objects.create(
+            admin=self.second, date=self.day, start_time=time(9, 30), end_time=time(10, 30), slot_duration=30
+        )
+        Availability.objects.create(
+            admin=self.second, date=self.day + timedelta(days=5),
+            start_time=time(8), end_time=time(9), slot_duration=60
+        )
+
+    def _find(self, count=10, **kwargs):
+        return [
+            (day, start, admin_id)
+            for day, start, _, admin_id in find_next_free_slots(
+                [self.first.id, self.second.id], kwargs.pop('start', self.start), count, **kwargs
+            )
+        ]
+
+    def test_slots_of_all_admins_come_in_time_order(self):
+        # Slots starting together come shortest first
+        Booking.objects.create(
+            user=self.user, admin=self.second, date=self.day,
+            start_time=time(9, 30), end_time=time(10), meeting_purpose='Sync'
+        )
+        later = self.day + timedelta(days=5)
+        self.assertEqual(self._find(), [
+            (self.day, time(9), self.first.id),
+            (self.day, time(10), self.second.id),
+            (self.day, time(10), self.first.id),
+            (later, time(8), self.second.id),
+        ])
+        self.assertEqual(len(self._find(count=2)), 2)
+
+    def test_start_duration_and_horizon(self):
+        self.assertEqual(self._find(start=self.start.replace(hour=10)), [
+            (self.day, time(10), self.second.id),
+            (self.day, time(10), self.first.id),
+            (self.day + timedelta(days=5), time(8), self.second.id),
+        ])
+        self.assertEqual(self._find(duration=60), [
+            (self.day, time(9), self.first.id),
+            (self.day, time(10), self.first.id),
+            (self.day + timedelta(days=5), time(8), self.second.id),
+        ])
+        self.assertEqual(len(self._find(horizon_days=5)), 4)
+
+    def test_endpoint_skips_slots_held_by_others(self):
+        place_hold(self.user.id, self.first.id, self.day, time(9), time(10))
+        client = APIClient()
+        client.force_authenticate(self.second)
+        response = client.get('/api/availability/slots/next/', {
+            'from': f'{self.day.isoformat()}T00:00', 'count': 2,
+            'admins': f'{self.first.id},{self.second.id}'
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [(slot['admin'], slot['start_time']) for slot in response.json()['slots']],
+            [(self.second.id, '09:30:00'), (self.second.id, '10:00:00')]
+        )
+        self.assertEqual(client.get('/api/availability/slots/next/', {'count': 0}).status_code, 400)
+
+
+class BulkAvailabilityTests(TestCase):
+    """Bulk creation writes windows and their slots in a few queries"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('user', 'user@example.com', 'pass')
+        self.admin = User.objects.create_user('admin', 'admin@example.com', 'pass', role='admin')
+        self.start = date.today() + timedelta(days=1)
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def _window(self, offset, start, end):
+        return {
+            'date': (self.start + timedelta(days=offset)).isoformat(),
+            'start_time': start, 'end_time': end, 'slot_duration': 30
+        }
+
+    def _post(self, data):
+        return self.client.post('/api/availability/bulk/', data, format='json')
+
+    def test_windows_are_created_with_their_slots(self):
+        Booking.objects.create(
+            user=self.user, admin=self.admin, date=self.start,
+            start_time=time(9), end_time=time(9, 30), meeting_purpose='Sync'
+        )
+        with CaptureQueriesContext(connection) as small:
+            self._post({'windows': [self._window(0, '09:00', '10:00')]})
+        with CaptureQueriesContext(connection) as large:
+            response = self._post({'windows': [self._window(offset, '09:00', '10:00') for offset in range(1, 21)]})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['created'], 20)
+        self.assertEqual(len(small), len(large))
+        self.assertEqual(AvailabilitySlot.objects.count(), 42)
+        self.assertEqual(AvailabilitySlot.objects.filter(is_free=False).count(), 1)
+        self.assertEqual(find_slot_drift(), (set(), set()))
+
+    def test_template_expands_over_the_date_range(self):
+        response = self._post({
+            'template': [
+                {'weekday': self.start.weekday(), 'start_time': '09:00', 'end_time': '10:00', 'slot_duration': 30},
+            ],
+            'start_date': self.start.isoformat(),
+            'end_date': (self.start + timedelta(days=20)).isoformat(),
+        })
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(
+            sorted(Availability.objects.values_list('date', flat=True)),
+            [self.start + timedelta(days=offset) for offset in (0, 7, 14)]
+        )
+
+    def test_conflicts_reject_the_whole_request(self):
+        self._post({'windows': [self._window(0, '09:00', '10:00')]})
+        response = self._post({'windows': [
+            self._window(0, '09:30', '10:30'),
+            self._window(1, '09:00', '10:00'),
+            self._window(1, '09:30', '11:00'),
+        ]})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([error['index'] for error in response.json()['errors']], [0, 2])
+        self.assertEqual(Availability.objects.count(), 1)
+
+    def test_shape_and_access(self):
+        self.assertEqual(self._post({}).status_code, 400)
+        self.assertEqual(self._post({
+            'windows': [self._window(0, '09:00', '10:00')],
+            'template': [{'weekday': 0, 'start_time': '09:00', 'end_time': '10:00', 'slot_duration': 30}],
+        }).status_code, 400)
+        self.client.force_authenticate(self.user)
+        self.assertEqual(self._post({'windows': [self._window(0, '09:00', '10:00')]}).status_code, 403)
+
+
+class WeekFreeBusyTests(TestCase):
+    """The week grid encodes free, booked and unavailable buckets per admin"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('user', 'user@example.com', 'pass')
+        self.admin = User.objects.create_user('admin', 'admin@example.com', 'pass', role='admin')
+        self.start = date.today() + timedelta(days=1)
+        self.day = self.start + timedelta(days=1)
+        Availability.objects.create(
+            admin=self.admin, date=self.day, start_time=time(9), end_time=time(11), slot_duration=30
+        )
+        Booking.objects.create(
+            user=self.user, admin=self.admin, date=self.day,
+            start_time=time(10), end_time=time(11), meeting_purpose='Sync'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def _get(self, **params):
+        return self.client.get('/api/availability/freebusy/week/', {
+            'start_date': self.start.isoformat(), 'admins': self.admin.id, 'resolution': 60, **params
+        })
+
+    def test_intervals_mark_every_bucket_they_touch(self):
+        intervals = [Busy(time(9, 5), time(9, 20), None), Busy(time(11), time(11), None)]
+        self.assertEqual(day_bits(intervals, 15), 0b11 << 36)
+        self.assertEqual(day_bits([Busy(time(9), time(10), None)], 1), ((1 << 60) - 1) << 540)
+
+    def test_encoders(self):
+        self.assertEqual(encode_runs(0b0110, 0b0100, 6), [[0, 1], [1, 1], [2, 1], [0, 3]])
+        self.assertEqual(encode_runs(0, 0, 4), [[0, 4]])
+        self.assertEqual(encode_bitstring(0b100000001, 9), 'AQE=')
+
+    def test_run_length_rows(self):
+        response = self._get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['buckets'], 168)
+        self.assertEqual(response.json()['admins'], {
+            str(self.admin.id): [[0, 24 + 9], [1, 1], [2, 1], [0, 168 - 24 - 11]]
+        })
+
+    def test_bitstring_rows(self):
+        row = self._get(encoding='bitstring').json()['admins'][str(self.admin.id)]
+        available = int.from_bytes(base64.b64decode(row['available']), 'little')
+        booked = int.from_bytes(base64.b64decode(row['booked']), 'little')
+        self.assertEqual(available, 0b11 << 33)
+        self.assertEqual(booked, 0b1 << 34)
+        self.assertEqual(len(base64.b64decode(row['available'])), 21)
+
+    def test_matrix_query_count_does_not_grow_with_admins(self):
+        others = [
+            User.objects.create_user(f'other{index}', f'other{index}@example.com', 'pass', role='admin').id
+            for index in range(5)
+        ]
+        with CaptureQueriesContext(connection) as one:
+            build_week_matrix([self.admin.id], self.start)
+        with CaptureQueriesContext(connection) as many:
+            matrix = build_week_matrix([self.admin.id, *others], self.start)
+        self.assertEqual(len(one), len(many))
+        self.assertEqual(matrix[others[0]], (0, 0))
 
-# Create your tests here.
+    def test_validation_and_access(self):
+        self.assertEqual(self._get(resolution=7).status_code, 400)
+        self.assertEqual(self._get(encoding='png').status_code, 400)
+        self.client.force_authenticate(self.user)
+        self.assertEqual(self._get().status_code, 403)
@@ -2,7 +2,16 @@ from django.urls import path
 from .views import (
     AvailabilityListCreateView,
     AvailabilityDetailView,
-    AvailableTimeSlotsView
+    BulkAvailabilityCreateView,
+    AvailabilityRuleListCreateView,
+    AvailabilityRuleDetailView,
+    AvailableTimeSlotsView,
+    AvailableTimeSlotsRangeView,
+    NextAvailableSlotsView,
+    SlotHoldView,
+    WeekFreeBusyView,
+    UtilizationReportView,
+    SlotCacheStatsView
 )
 
 app_name = 'availability'
@@ -10,5 +19,14 @@ app_name = 'availability'
 urlpatterns = [
     path('', AvailabilityListCreateView.as_view(), name='availability-list'),
     path('<int:pk>/', AvailabilityDetailView.as_view(), name='availability-detail'),
+    path('bulk/', BulkAvailabilityCreateView.as_view(), name='availability-bulk-create'),
+    path('rules/', AvailabilityRuleListCreateView.as_view(), name='availability-rule-list'),
+    path('rules/<int:pk>/', AvailabilityRuleDetailView.as_view(), name='availability-rule-detail'),
     path('slots/', AvailableTimeSlotsView.as_view(), name='available-slots'),
+    path('slots/range/', AvailableTimeSlotsRangeView.as_view(), name='available-slots-range'),
+    path('slots/holds/', SlotHoldView.as_view(), name='slot-holds'),
+    path('slots/next/', NextAvailableSlotsView.as_view(), name='next-available-slots'),
+    path('freebusy/week/', WeekFreeBusyView.as_view(), name='freebusy-week'),
+    path('analytics/utilization/', UtilizationReportView.as_view(), name='utilization-report'),
+    path('slots/cache-stats/', SlotCacheStatsView.as_view(), name='slot-cache-stats'),
 ]
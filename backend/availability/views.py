@@ -1,21 +1,68 @@
 from rest_framework import generics, status, permissions
 from rest_framework.response import Response
 from rest_framework.views import APIView
+from django.db import IntegrityError, transaction
 from django.db.models import Q
-from datetime import datetime
-from .models import Availability
-from .serializers import AvailabilitySerializer, TimeSlotSerializer
+from collections import defaultdict
+from datetime import datetime, timedelta
+from itertools import islice
+from .models import Availability, AvailabilityRule, AvailabilitySlot
+from .serializers import (
+    AvailabilitySerializer, AvailabilityRuleSerializer, BulkAvailabilitySerializer,
+    TimeSlotSerializer, NextSlotSerializer, SlotHoldSerializer
+)
+from .changes import availabilities_created
+from .slots import compute_slots_for_range, iter_next_free_slots
+from .cache import get_cached_slots, set_cached_slots, get_slot_cache_stats, get_slot_version
+from .freebusy import build_week_matrix, encode_bitstring, encode_runs
+from .rollups import utilization_report
+from .holds import (
+    HoldUnavailable, get_user_hold, held_slots, mark_held, place_hold, release_user_hold
+)
 from bookings.models import Booking
+from users.models import User
+from calendar_scheduler.conditional import (
+    conditional, conditional_response, queryset_state
+)
+from calendar_scheduler.pagination import AvailabilityKeysetPagination
+
+
+# Upper bounds for AvailableTimeSlotsRangeView, keeping payload and query
+# cost per request bounded regardless of what the client asks for
+MAX_SLOT_RANGE_DAYS = 31
+MAX_SLOT_RANGE_ADMINS = 25
+
+# Limits for WeekFreeBusyView
+MAX_FREEBUSY_ADMINS = 500
+FREEBUSY_RESOLUTIONS = [5, 10, 15, 30, 60]
+
+# Limits for NextAvailableSlotsView
+MAX_NEXT_SLOTS = 50
+NEXT_SLOTS_HORIZON_DAYS = 60
+
+# Longest utilization report, in days (two years)
+MAX_UTILIZATION_RANGE_DAYS = 731
+
+
+def default_admins():
+    """Admins searched when a request names none: every active admin and super admin"""
+    return User.objects.filter(role__in=['admin', 'superadmin'], is_active=True).order_by('id')
 
 
 class AvailabilityListCreateView(generics.ListCreateAPIView):
     """List and create availability"""
     serializer_class = AvailabilitySerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = AvailabilityKeysetPagination
     
     def get_queryset(self):
+        return self.filter_scope(
+            Availability.objects.select_related('admin').with_slot_counts()
+        )
+    
+    def filter_scope(self, queryset, active_only=True):
+        """Apply the request's admin and date filters and role scoping"""
         user = self.request.user
-        queryset = Availability.objects.all()
         
         # Filter by admin if provided
         admin_id = self.request.query_params.get('admin')
@@ -35,12 +82,36 @@ class AvailabilityListCreateView(generics.ListCreateAPIView):
             return queryset
         elif user.is_admin_role():
             return queryset.filter(admin=user)
-        else:
+        elif active_only:
             # Regular users can see all active availabilities
             return queryset.filter(is_active=True)
         
         return queryset
     
+    def list_validators(self, request, *args, **kwargs):
+        # The page is read once, here, and serialized by list() on a 200
+        self.page = self.paginate_queryset(self.filter_queryset(self.get_queryset()))
+        
+        # Booked and free slot counts change with the bookings of the listed
+        # admins and days, which leave the availability rows untouched. Only
+        # the days on the requested page matter
+        dates_by_admin = defaultdict(set)
+        for availability in self.page:
+            dates_by_admin[availability.admin_id].add(availability.date)
+        page_days = Q()
+        for admin_id, dates in dates_by_admin.items():
+            page_days |= Q(admin_id=admin_id, date__in=dates)
+        
+        return (
+            queryset_state(self.filter_scope(Availability.objects.all())),
+            queryset_state(Booking.objects.filter(page_days)) if dates_by_admin else None,
+        )
+    
+    @conditional(list_validators)
+    def list(self, request, *args, **kwargs):
+        serializer = self.get_serializer(self.page, many=True)
+        return self.get_paginated_response(serializer.data)
+    
     def perform_create(self, serializer):
         # Automatically set admin to current user if they are admin
         user = self.request.user
@@ -57,13 +128,185 @@ class AvailabilityDetailView(generics.RetrieveUpdateDestroyAPIView):
     serializer_class = AvailabilitySerializer
     permission_classes = [permissions.IsAuthenticated]
     
+    def get_queryset(self):
+        user = self.request.user
+        queryset = Availability.objects.select_related('admin').with_slot_counts()
+        if user.is_super_admin():
+            return queryset
+        elif user.is_admin_role():
+            return queryset.filter(admin=user)
+        return queryset.filter(is_active=True)
+    
+    def perform_update(self, serializer):
+        availability = serializer.save()
+        # Slot counts annotated when the row was loaded are stale after the update
+        availability.__dict__.pop('booked_slot_count', None)
+        availability.__dict__.pop('free_slot_count', None)
+
+
+class BulkAvailabilityCreateView(APIView):
+    """Create many availability windows in one request (Admin only)"""
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def post(self, request):
+        user = request.user
+        if not user.is_admin_role():
+            return Response({
+                'error': 'Only admins can create availability'
+            }, status=status.HTTP_403_FORBIDDEN)
+        
+        serializer = BulkAvailabilitySerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        windows = serializer.validated_data['windows']
+        
+        errors = self._find_conflicts(user, windows)
+        if errors:
+            return Response({
+                'error': 'Some windows conflict with existing availability',
+                'errors': errors
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        try:
+            with transaction.atomic():
+                created = Availability.objects.bulk_create(
+                    [Availability(admin=user, **window) for window in windows],
+                    batch_size=500
+                )
+                availabilities_created(created)
+        except IntegrityError:
+            return Response({
+                'error': 'Availability changed while creating; please retry'
+            }, status=status.HTTP_409_CONFLICT)
+        
+        return Response({
+            'created': len(created),
+            'ids': [availability.id for availability in created]
+        }, status=status.HTTP_201_CREATED)
+    
+    def _find_conflicts(self, admin, windows):
+        """
+        Check windows against each other and existing rows with one query
+        
+        Returns:
+            List of per-window errors (empty if there are no conflicts)
+        """
+        dates = [window['date'] for window in windows]
+        taken = defaultdict(list)
+        for existing in Availability.objects.filter(
+            admin=admin,
+            date__range=(min(dates), max(dates))
+        ).only('date', 'start_time', 'end_time'):
+            taken[existing.date].append((existing.start_time, existing.end_time, 'existing availability'))
+        
+        errors = []
+        for index, window in enumerate(windows):
+            day = taken[window['date']]
+            conflict = next((
+                (start, end, source) for start, end, source in day
+                if window['start_time'] < end and window['end_time'] > start
+            ), None)
+            if conflict:
+                start, end, source = conflict
+                errors.append({
+                    'index': index,
+                    'date': window['date'],
+                    'start_time': window['start_time'],
+                    'end_time': window['end_time'],
+                    'error': f'Overlaps {source} from {start} to {end}'
+                })
+            else:
+                day.append((window['start_time'], window['end_time'], f'window {index}'))
+        return errors
+
+
+class AvailabilityRuleListCreateView(generics.ListCreateAPIView):
+    """List and create recurring availability rules"""
+    serializer_class = AvailabilityRuleSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def get_queryset(self):
+        user = self.request.user
+        queryset = AvailabilityRule.objects.all()
+        
+        # Filter by admin if provided
+        admin_id = self.request.query_params.get('admin')
+        if admin_id:
+            queryset = queryset.filter(admin_id=admin_id)
+        
+        # Role-based filtering
+        if user.is_super_admin():
+            return queryset
+        elif user.is_admin_role():
+            return queryset.filter(admin=user)
+        else:
+            return queryset.filter(is_active=True)
+    
+    def list_validators(self, request, *args, **kwargs):
+        return queryset_state(self.filter_queryset(self.get_queryset()))
+    
+    @conditional(list_validators)
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+    
+    def perform_create(self, serializer):
+        user = self.request.user
+        if user.is_admin_role():
+            serializer.save(admin=user)
+        else:
+            raise permissions.PermissionDenied("Only admins can create availability rules")
+
+
+class AvailabilityRuleDetailView(generics.RetrieveUpdateDestroyAPIView):
+    """Retrieve, update, or delete a recurring availability rule"""
+    serializer_class = AvailabilityRuleSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    
     def get_queryset(self):
         user = self.request.user
         if user.is_super_admin():
-            return Availability.objects.all()
+            return AvailabilityRule.objects.all()
         elif user.is_admin_role():
-            return Availability.objects.filter(admin=user)
-        return Availability.objects.filter(is_active=True)
+            return AvailabilityRule.objects.filter(admin=user)
+        return AvailabilityRule.objects.none()
+
+
+def get_day_slots(admin_pk, date):
+    """
+    Get the serialized slots of one admin and date through the slot cache
+    
+    Returns:
+        Tuple of (slots, 'HIT' or 'MISS')
+    """
+    slots, version = get_cached_slots(admin_pk, date)
+    if slots is not None:
+        return slots, 'HIT'
+    
+    # Slots are materialized with their booked/free state, so a single
+    # indexed lookup on (admin, date) answers the request
+    all_slots = [
+        {
+            'start_time': slot['start_time'],
+            'end_time': slot['end_time'],
+            'is_available': slot['is_free'],
+            'booking_id': slot['booking_id'],
+        }
+        for slot in AvailabilitySlot.objects.filter(
+            admin_id=admin_pk,
+            date=date
+        ).order_by('start_time', 'id').values(
+            'start_time', 'end_time', 'is_free', 'booking_id'
+        )
+    ]
+    
+    # Days covered only by a recurring rule have no materialized slots;
+    # expand the rule for this one date instead
+    if not all_slots:
+        all_slots = compute_slots_for_range([admin_pk], date, date).get(admin_pk, {}).get(date, [])
+    
+    serializer = TimeSlotSerializer(all_slots, many=True)
+    slots = [dict(slot) for slot in serializer.data]
+    set_cached_slots(admin_pk, date, version, slots)
+    return slots, 'MISS'
 
 
 class AvailableTimeSlotsView(APIView):
@@ -86,55 +329,396 @@ class AvailableTimeSlotsView(APIView):
                 'error': 'Invalid date format. Use YYYY-MM-DD'
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        # Get availability for the date
-        availabilities = Availability.objects.filter(
-            admin_id=admin_id,
-            date=date,
-            is_active=True
-        )
-        
-        if not availabilities.exists():
+        try:
+            admin_pk = int(admin_id)
+        except ValueError:
             return Response({
+                'error': 'Invalid admin ID'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        # Read before the slots, so a concurrent bump can only make the ETag stale
+        version = get_slot_version(admin_pk, date)
+        slots, cache_status = get_day_slots(admin_pk, date)
+        slots = mark_held(admin_pk, date, slots, request.user.id)
+        # Holds overlay the cached slots without bumping the version
+        unavailable = tuple(slot['start_time'] for slot in slots if not slot['is_available'])
+        
+        response = conditional_response(
+            request, (version, unavailable),
+            lambda: Response({
                 'date': date_str,
                 'admin': admin_id,
-                'slots': []
+                'slots': slots
             })
-        
-        # Get existing bookings for this admin on this date
-        bookings = Booking.objects.filter(
-            admin_id=admin_id,
-            date=date,
-            status__in=['confirmed', 'pending']
         )
+        response['X-Slot-Cache'] = cache_status
+        return response
+
+
+class SlotHoldView(APIView):
+    """
+    Hold a free slot while the booking form is filled in
+    
+    GET returns the current user's hold, POST holds a slot (replacing any
+    previous hold) and DELETE releases it. Holds expire on their own after
+    SLOT_HOLD_SECONDS and are turned into the booking when the holder books
+    the slot.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def get(self, request):
+        hold = get_user_hold(request.user.id)
+        if hold is None:
+            return Response({
+                'error': 'No slot is held'
+            }, status=status.HTTP_404_NOT_FOUND)
+        return Response(hold)
+    
+    def post(self, request):
+        serializer = SlotHoldSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
         
-        # Create a dict of booked slots
-        booked_slots = {}
-        for booking in bookings:
-            key = (booking.start_time, booking.end_time)
-            booked_slots[key] = booking.id
-        
-        # Generate all time slots
-        all_slots = []
-        for availability in availabilities:
-            slots = availability.get_time_slots()
-            for start_time, end_time in slots:
-                slot_key = (start_time, end_time)
-                is_available = slot_key not in booked_slots
-                
-                all_slots.append({
-                    'start_time': start_time,
-                    'end_time': end_time,
-                    'is_available': is_available,
-                    'booking_id': booked_slots.get(slot_key)
-                })
+        if datetime.combine(data['date'], data['start_time']) < datetime.now():
+            return Response({
+                'error': 'Cannot hold a slot in the past'
+            }, status=status.HTTP_400_BAD_REQUEST)
         
-        # Sort by start_time
-        all_slots.sort(key=lambda x: x['start_time'])
+        slots, _ = get_day_slots(data['admin'], data['date'])
+        start_time = data['start_time'].isoformat()
+        end_time = data['end_time'].isoformat()
+        slot = next((
+            slot for slot in slots
+            if slot['start_time'] == start_time and slot['end_time'] == end_time
+        ), None)
+        if slot is None:
+            return Response({
+                'error': 'No such slot'
+            }, status=status.HTTP_404_NOT_FOUND)
+        if not slot['is_available']:
+            return Response({
+                'error': 'This slot is already booked'
+            }, status=status.HTTP_409_CONFLICT)
         
-        serializer = TimeSlotSerializer(all_slots, many=True)
+        try:
+            hold = place_hold(
+                request.user.id, data['admin'], data['date'], data['start_time'], data['end_time']
+            )
+        except HoldUnavailable as e:
+            return Response({
+                'error': str(e)
+            }, status=status.HTTP_409_CONFLICT)
+        return Response(hold, status=status.HTTP_201_CREATED)
+    
+    def delete(self, request):
+        release_user_hold(request.user.id)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class NextAvailableSlotsView(APIView):
+    """Get the earliest free slots across all active admins and super admins (or a subset)"""
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def get(self, request):
+        try:
+            count = int(request.query_params.get('count', 5))
+            duration = request.query_params.get('duration')
+            duration = int(duration) if duration else None
+        except ValueError:
+            return Response({
+                'error': 'count and duration must be numbers'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        if not 1 <= count <= MAX_NEXT_SLOTS:
+            return Response({
+                'error': f'count must be between 1 and {MAX_NEXT_SLOTS}'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        from_str = request.query_params.get('from')
+        if from_str:
+            try:
+                start = datetime.fromisoformat(from_str).replace(tzinfo=None)
+            except ValueError:
+                return Response({
+                    'error': 'Invalid from format. Use YYYY-MM-DDTHH:MM'
+                }, status=status.HTTP_400_BAD_REQUEST)
+        else:
+            start = datetime.now()
+        
+        admins_param = request.query_params.get('admins')
+        if admins_param:
+            try:
+                admin_ids = sorted({int(value) for value in admins_param.split(',') if value.strip()})
+            except ValueError:
+                return Response({
+                    'error': 'admins must be a comma-separated list of IDs'
+                }, status=status.HTTP_400_BAD_REQUEST)
+        else:
+            admin_ids = list(default_admins().values_list('id', flat=True))
+        
+        slots = []
+        if admin_ids:
+            # Slots held by other users are skipped; fetch in batches of
+            # `count` and check each batch's holds with one query
+            free_slots = iter_next_free_slots(
+                admin_ids,
+                start,
+                horizon_days=NEXT_SLOTS_HORIZON_DAYS,
+                duration=duration
+            )
+            while len(slots) < count:
+                batch = list(islice(free_slots, count))
+                if not batch:
+                    break
+                held = held_slots(
+                    (
+                        (admin_id, date, start_time, end_time)
+                        for date, start_time, end_time, admin_id in batch
+                    ),
+                    request.user.id
+                )
+                slots.extend(
+                    slot for slot in batch if (slot[3], slot[0], slot[1], slot[2]) not in held
+                )
+            slots = slots[:count]
+        
+        serializer = NextSlotSerializer([
+            {
+                'admin': admin_id,
+                'date': date,
+                'start_time': start_time,
+                'end_time': end_time
+            }
+            for date, start_time, end_time, admin_id in slots
+        ], many=True)
         
         return Response({
-            'date': date_str,
-            'admin': admin_id,
+            'from': start.isoformat(timespec='minutes'),
             'slots': serializer.data
         })
+
+
+class WeekFreeBusyView(APIView):
+    """Get a week free/busy grid of admins x time buckets (Admin only)"""
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def get(self, request):
+        if not request.user.is_admin_role():
+            return Response({
+                'error': 'Admin access required'
+            }, status=status.HTTP_403_FORBIDDEN)
+        
+        start_date_str = request.query_params.get('start_date')
+        encoding = request.query_params.get('encoding', 'rle')
+        
+        try:
+            start_date = (
+                datetime.strptime(start_date_str, '%Y-%m-%d').date()
+                if start_date_str else datetime.now().date()
+            )
+        except ValueError:
+            return Response({
+                'error': 'Invalid date format. Use YYYY-MM-DD'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        try:
+            resolution = int(request.query_params.get('resolution', 15))
+        except ValueError:
+            resolution = None
+        if resolution not in FREEBUSY_RESOLUTIONS:
+            return Response({
+                'error': f'resolution must be one of {FREEBUSY_RESOLUTIONS}'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        if encoding not in ('rle', 'bitstring'):
+            return Response({
+                'error': 'encoding must be rle or bitstring'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        admins_param = request.query_params.get('admins')
+        if admins_param:
+            try:
+                admin_ids = sorted({int(value) for value in admins_param.split(',') if value.strip()})
+            except ValueError:
+                return Response({
+                    'error': 'admins must be a comma-separated list of IDs'
+                }, status=status.HTTP_400_BAD_REQUEST)
+        else:
+            admin_ids = list(default_admins().values_list('id', flat=True))
+        
+        if len(admin_ids) > MAX_FREEBUSY_ADMINS:
+            return Response({
+                'error': f'Cannot request more than {MAX_FREEBUSY_ADMINS} admins'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        days = 7
+        size = days * (24 * 60 // resolution)
+        matrix = build_week_matrix(admin_ids, start_date, days, resolution)
+        
+        if encoding == 'rle':
+            rows = {
+                str(admin_id): encode_runs(available, booked, size)
+                for admin_id, (available, booked) in matrix.items()
+            }
+        else:
+            rows = {
+                str(admin_id): {
+                    'available': encode_bitstring(available, size),
+                    'booked': encode_bitstring(booked, size),
+                }
+                for admin_id, (available, booked) in matrix.items()
+            }
+        
+        return Response({
+            'start_date': start_date.isoformat(),
+            'end_date': (start_date + timedelta(days=days - 1)).isoformat(),
+            'resolution': resolution,
+            'buckets': size,
+            'encoding': encoding,
+            'admins': rows
+        })
+
+
+class UtilizationReportView(APIView):
+    """
+    Get booked vs. available minutes, cancellation rate and peak hours
+    from the daily rollups (Admin only)
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def get(self, request):
+        user = request.user
+        if not user.is_admin_role():
+            return Response({
+                'error': 'Admin access required'
+            }, status=status.HTTP_403_FORBIDDEN)
+        
+        admin_id = user.id
+        if request.query_params.get('admin'):
+            try:
+                admin_id = int(request.query_params['admin'])
+            except ValueError:
+                return Response({
+                    'error': 'admin must be a user ID'
+                }, status=status.HTTP_400_BAD_REQUEST)
+            if admin_id != user.id and not user.is_super_admin():
+                return Response({
+                    'error': 'Admins can only view their own utilization'
+                }, status=status.HTTP_403_FORBIDDEN)
+        
+        start_date_str = request.query_params.get('start_date')
+        end_date_str = request.query_params.get('end_date')
+        if not start_date_str or not end_date_str:
+            return Response({
+                'error': 'start_date and end_date parameters are required'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        try:
+            start_date = datetime.strptime(start_date_str, '%Y-%m-%d').date()
+            end_date = datetime.strptime(end_date_str, '%Y-%m-%d').date()
+        except ValueError:
+            return Response({
+                'error': 'Invalid date format. Use YYYY-MM-DD'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        if end_date < start_date:
+            return Response({
+                'error': 'end_date must not be before start_date'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        if (end_date - start_date).days + 1 > MAX_UTILIZATION_RANGE_DAYS:
+            return Response({
+                'error': f'Cannot request more than {MAX_UTILIZATION_RANGE_DAYS} days'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        report = utilization_report(admin_id, start_date, end_date)
+        return Response({
+            'admin': admin_id,
+            'start_date': start_date,
+            'end_date': end_date,
+            **report
+        })
+
+
+class SlotCacheStatsView(APIView):
+    """Get slot cache hit and miss counters (Super Admin only)"""
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def get(self, request):
+        if not request.user.is_super_admin():
+            return Response({
+                'error': 'Super admin access required'
+            }, status=status.HTTP_403_FORBIDDEN)
+        
+        return Response(get_slot_cache_stats())
+
+
+class AvailableTimeSlotsRangeView(APIView):
+    """Get available time slots for several admins over a date range"""
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def get(self, request):
+        admins_param = request.query_params.get('admins')
+        start_date_str = request.query_params.get('start_date')
+        end_date_str = request.query_params.get('end_date')
+        
+        if not admins_param or not start_date_str or not end_date_str:
+            return Response({
+                'error': 'admins, start_date and end_date parameters are required'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        try:
+            admin_ids = sorted({int(value) for value in admins_param.split(',') if value.strip()})
+        except ValueError:
+            return Response({
+                'error': 'admins must be a comma-separated list of IDs'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        try:
+            start_date = datetime.strptime(start_date_str, '%Y-%m-%d').date()
+            end_date = datetime.strptime(end_date_str, '%Y-%m-%d').date()
+        except ValueError:
+            return Response({
+                'error': 'Invalid date format. Use YYYY-MM-DD'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        if end_date < start_date:
+            return Response({
+                'error': 'end_date must not be before start_date'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        if (end_date - start_date).days + 1 > MAX_SLOT_RANGE_DAYS:
+            return Response({
+                'error': f'Date range cannot exceed {MAX_SLOT_RANGE_DAYS} days'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        if not admin_ids or len(admin_ids) > MAX_SLOT_RANGE_ADMINS:
+            return Response({
+                'error': f'Between 1 and {MAX_SLOT_RANGE_ADMINS} admins are allowed'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        slots_by_admin = compute_slots_for_range(admin_ids, start_date, end_date)
+        held = held_slots(
+            (
+                (admin_id, date, slot['start_time'], slot['end_time'])
+                for admin_id, slots_by_date in slots_by_admin.items()
+                for date, slots in slots_by_date.items()
+                for slot in slots if slot['is_available']
+            ),
+            request.user.id
+        )
+        for admin_id, date, start_time, end_time in held:
+            for slot in slots_by_admin[admin_id][date]:
+                if (slot['start_time'], slot['end_time']) == (start_time, end_time):
+                    slot['is_available'] = False
+        
+        return Response({
+            'start_date': start_date_str,
+            'end_date': end_date_str,
+            'admins': {
+                str(admin_id): {
+                    date.isoformat(): TimeSlotSerializer(slots, many=True).data
+                    for date, slots in slots_by_admin.get(admin_id, {}).items()
+                }
+                for admin_id in admin_ids
+            }
+        })
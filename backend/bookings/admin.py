@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Booking
+from .models import Booking, OutboxMessage
 
 
 @admin.register(Booking)
@@ -9,7 +9,7 @@ class BookingAdmin(admin.ModelAdmin):
     search_fields = ['user__username', 'admin__username', 'meeting_purpose']
     date_hierarchy = 'date'
     list_editable = ['status']
-    readonly_fields = ['calendar_event_id', 'created_at', 'updated_at']
+    readonly_fields = ['calendar_event_id', 'calendar_status', 'created_at', 'updated_at']
     
     fieldsets = (
         ('Booking Information', {
@@ -19,7 +19,7 @@ class BookingAdmin(admin.ModelAdmin):
             'fields': ('meeting_purpose', 'meeting_link', 'notes')
         }),
         ('Integration', {
-            'fields': ('calendar_event_id',)
+            'fields': ('calendar_event_id', 'calendar_status')
         }),
         ('Timestamps', {
             'fields': ('created_at', 'updated_at')
@@ -33,3 +33,10 @@ class BookingAdmin(admin.ModelAdmin):
         elif request.user.is_admin_role():
             return qs.filter(admin=request.user)
         return qs.filter(user=request.user)
+
+
+@admin.register(OutboxMessage)
+class OutboxMessageAdmin(admin.ModelAdmin):
+    list_display = ['kind', 'booking', 'status', 'attempts', 'next_attempt_at', 'created_at']
+    list_filter = ['status', 'kind']
+    readonly_fields = ['created_at', 'processed_at']
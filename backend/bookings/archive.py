@@ -0,0 +1,119 @@
+"""
+Archival of old and cancelled bookings.
+
+Hot queries (overlap checks, slots, dashboards, lists) only look at recent
+and upcoming bookings, so history only grows the bookings table and its
+indexes. archive_bookings moves bookings dated more than
+BOOKING_ARCHIVE_AFTER_DAYS ago, and cancelled bookings untouched for
+CANCELLED_BOOKING_RETENTION_DAYS, into booking_archive, in batches that
+each commit on their own.
+
+Archived rows keep their id and columns. History reads take one queryset
+per table and merge them (see MergedKeysetPagination and the export's
+include_archived option). Dashboard counters and utilization rollups count
+archived rows too, so archiving changes neither.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .counters import bookings_counted
+from .models import ArchivedBooking, Booking
+
+
+DEFAULT_BATCH_SIZE = 1000
+
+# Columns copied from Booking to ArchivedBooking
+ARCHIVE_COLUMNS = [
+    'id', 'user_id', 'admin_id', 'date', 'start_time', 'end_time', 'timezone',
+    'meeting_purpose', 'meeting_link', 'calendar_event_id', 'calendar_status',
+    'status', 'notes', 'created_at', 'updated_at',
+]
+
+
+def archivable(now=None, horizon_days=None, cancelled_retention_days=None):
+    """
+    Condition matching bookings due for the archive
+
+    Bookings with outbox messages still waiting to be sent stay live until
+    the outbox is done with them.
+    """
+    now = now or timezone.now()
+    if horizon_days is None:
+        horizon_days = settings.BOOKING_ARCHIVE_AFTER_DAYS
+    if cancelled_retention_days is None:
+        cancelled_retention_days = settings.CANCELLED_BOOKING_RETENTION_DAYS
+
+    return (
+        Q(date__lt=now.date() - timedelta(days=horizon_days)) |
+        Q(status='cancelled', updated_at__lt=now - timedelta(days=cancelled_retention_days))
+    ) & ~Q(outbox_messages__status__in=['pending', 'processing'])
+
+
+def archive_batch(ids, condition=None):
+    """
+    Move bookings into the archive in one transaction
+
+    The locked rows are filtered by the condition again, so a booking
+    rescheduled or given a new outbox message since it was selected stays
+    live. Deleting from the live table bypasses Booking.delete, so dashboard
+    counts, which include archived bookings, are left as they are, though
+    the rows are stamped as changed since the dashboards list live
+    bookings only; the materialized slots the bookings occupied are
+    refreshed.
+
+    Args:
+        ids: IDs of bookings selected for the archive
+        condition: Q the bookings must still match, archivable() by default
+
+    Returns:
+        Number of bookings archived
+    """
+    from availability.changes import bookings_changed
+
+    if condition is None:
+        condition = archivable()
+
+    with transaction.atomic():
+        rows = list(
+            Booking.objects.select_for_update().filter(condition, id__in=ids).values(*ARCHIVE_COLUMNS)
+        )
+        ArchivedBooking.objects.bulk_create([ArchivedBooking(**row) for row in rows])
+        Booking.objects.filter(id__in=[row['id'] for row in rows]).delete()
+        # The delete cleared the slots' booking but not their is_free flag
+        bookings_changed((row['admin_id'], row['date']) for row in rows)
+        bookings_counted(
+            ((row['user_id'], row['admin_id'], row['status']),) * 2 for row in rows
+        )
+    return len(rows)
+
+
+def archive_bookings(batch_size=DEFAULT_BATCH_SIZE, max_batches=None, now=None,
+                     horizon_days=None, cancelled_retention_days=None):
+    """
+    Archive every due booking, batch_size at a time
+
+    Batches walk the table in id order from where the previous one stopped,
+    so each batch costs the same however much has been archived already.
+
+    Returns:
+        Number of bookings archived
+    """
+    condition = archivable(now, horizon_days, cancelled_retention_days)
+    archived = 0
+    batches = 0
+    last_id = 0
+    while max_batches is None or batches < max_batches:
+        ids = list(
+            Booking.objects.filter(condition, id__gt=last_id)
+            .order_by('id').values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            break
+        archived += archive_batch(ids, condition)
+        last_id = ids[-1]
+        batches += 1
+    return archived
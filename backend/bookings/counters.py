@@ -0,0 +1,172 @@
+"""
+Dashboard counters maintained alongside booking writes.
+
+Every booking counts once towards its user (perspective 'user') and once
+towards its admin (perspective 'admin'), in `total` and in the column of its
+status. Booking.save, Booking.delete and bulk reservations report their
+changes here inside their own transaction, and the counters are updated
+once it commits, so a rolled back write never counts. Applying them after
+commit keeps the admin's counter row out of the booking transaction: it
+would otherwise serialize every booking of the admin, whatever the day,
+behind the per-day booking lock. A process dying between the commit and
+the update, and writes that bypass those paths (QuerySet.update, raw SQL),
+are repaired by reconcile_counters.
+
+Every change to a booking, counted or not (a reschedule, a new meeting
+link, archiving), also stamps changed_at on the rows of its user and
+admin, so the dashboards take their ETag from the counter row they read
+anyway.
+"""
+from collections import Counter, defaultdict
+
+from django.db import transaction
+from django.db.models import Count, F, Q
+from django.utils import timezone
+
+from .models import ArchivedBooking, Booking, BookingCounter
+
+
+STATUS_COLUMNS = ('pending', 'confirmed', 'cancelled')
+COUNTER_COLUMNS = ('total',) + STATUS_COLUMNS
+
+
+def _deltas(changes):
+    """
+    Sum (previous, current) counter keys into per-row column deltas
+
+    Rows touched by a change that leaves the counts alone get empty deltas.
+    """
+    deltas = defaultdict(Counter)
+    for previous, current in changes:
+        for key, sign in ((previous, -1), (current, 1)):
+            if key is None:
+                continue
+            user_id, admin_id, status = key
+            for row in ((user_id, 'user'), (admin_id, 'admin')):
+                deltas[row]['total'] += sign
+                if status in STATUS_COLUMNS:
+                    deltas[row][status] += sign
+    return deltas
+
+
+def bookings_counted(changes):
+    """
+    Apply booking changes to the counters once the current transaction commits
+
+    Call inside the transaction that writes the bookings. Missing rows are
+    created first, then rows needing the same increments are updated
+    together, so a batch of new bookings costs a few queries however many
+    users it touches. Every row involved gets a new changed_at.
+
+    Args:
+        changes: Iterable of (previous, current) pairs of
+            (user_id, admin_id, status) keys; previous is None for new
+            bookings, current is None for deleted ones, and both are the
+            same key for changes that leave the counts alone
+    """
+    groups = defaultdict(list)
+    for (user_id, perspective), delta in _deltas(changes).items():
+        delta = tuple(sorted((column, value) for column, value in delta.items() if value))
+        groups[(perspective, delta)].append(user_id)
+    if groups:
+        transaction.on_commit(lambda: _apply(groups))
+
+
+def _apply(groups):
+    """Create missing counter rows, then add each group's deltas"""
+    now = timezone.now()
+    with transaction.atomic():
+        BookingCounter.objects.bulk_create(
+            [
+                BookingCounter(user_id=user_id, perspective=perspective)
+                for (perspective, _), user_ids in groups.items()
+                for user_id in user_ids
+            ],
+            ignore_conflicts=True
+        )
+        for (perspective, delta), user_ids in groups.items():
+            BookingCounter.objects.filter(user_id__in=user_ids, perspective=perspective).update(
+                changed_at=now, **{column: F(column) + value for column, value in delta}
+            )
+
+
+def count_bookings():
+    """
+    Count bookings per user and per admin from the live and archive tables
+
+    Returns:
+        Dict mapping (user_id, perspective) -> {column: count}
+    """
+    aggregates = {'total': Count('id')}
+    aggregates.update({
+        status: Count('id', filter=Q(status=status)) for status in STATUS_COLUMNS
+    })
+
+    counts = defaultdict(Counter)
+    # Archiving leaves the counters alone, so archived bookings count too
+    for model in (Booking, ArchivedBooking):
+        for perspective, field in (('user', 'user_id'), ('admin', 'admin_id')):
+            for row in model.objects.order_by().values(field).annotate(**aggregates):
+                counts[(row[field], perspective)].update({column: row[column] for column in COUNTER_COLUMNS})
+    return {key: {column: values[column] for column in COUNTER_COLUMNS} for key, values in counts.items()}
+
+
+def find_counter_drift():
+    """
+    Compare the counters table with fresh counts
+
+    Returns:
+        Dict mapping (user_id, perspective) -> expected column values, for
+        every counter row that is wrong or missing
+    """
+    expected = count_bookings()
+    zero = dict.fromkeys(COUNTER_COLUMNS, 0)
+
+    drift = {}
+    stored = set()
+    for counter in BookingCounter.objects.all():
+        key = (counter.user_id, counter.perspective)
+        stored.add(key)
+        values = expected.get(key, zero)
+        if any(getattr(counter, column) != values[column] for column in COUNTER_COLUMNS):
+            drift[key] = values
+    for key, values in expected.items():
+        if key not in stored:
+            drift[key] = values
+    return drift
+
+
+def reconcile_counters():
+    """
+    Rewrite counters that drifted from the booking table
+
+    Call inside a transaction so bookings do not change while it runs.
+
+    Returns:
+        Number of counter rows fixed
+    """
+    drift = find_counter_drift()
+    now = timezone.now()
+    BookingCounter.objects.bulk_create(
+        [
+            BookingCounter(user_id=user_id, perspective=perspective, changed_at=now, **values)
+            for (user_id, perspective), values in drift.items()
+        ],
+        update_conflicts=True,
+        unique_fields=['user', 'perspective'],
+        update_fields=[*COUNTER_COLUMNS, 'changed_at'],
+        batch_size=500
+    )
+    return len(drift)
+
+
+def get_counts(user_id, perspective):
+    """
+    Return the counter columns and changed_at for one user and perspective
+
+    Counts are zero and changed_at None if the user has no counter row.
+    """
+    counter = BookingCounter.objects.filter(
+        user_id=user_id, perspective=perspective
+    ).values(*COUNTER_COLUMNS, 'changed_at').first()
+    return counter or {**dict.fromkeys(COUNTER_COLUMNS, 0), 'changed_at': None}
@@ -0,0 +1,117 @@
+"""
+Streaming booking exports.
+
+Rows are read with values_list() and iterator(), so neither model instances
+nor the full result set are ever held in memory: the database cursor is
+consumed a chunk at a time and each chunk is encoded and handed to the
+response before the next one is fetched.
+"""
+import csv
+import heapq
+import json
+
+
+# (output column, queryset lookup)
+EXPORT_COLUMNS = [
+    ('id', 'id'),
+    ('user', 'user_id'),
+    ('user_email', 'user__email'),
+    ('admin', 'admin_id'),
+    ('admin_email', 'admin__email'),
+    ('date', 'date'),
+    ('start_time', 'start_time'),
+    ('end_time', 'end_time'),
+    ('timezone', 'timezone'),
+    ('meeting_purpose', 'meeting_purpose'),
+    ('status', 'status'),
+    ('calendar_status', 'calendar_status'),
+    ('meeting_link', 'meeting_link'),
+    ('created_at', 'created_at'),
+    ('updated_at', 'updated_at'),
+]
+
+EXPORT_ORDERING = ('-date', '-start_time', 'id')
+DATE_INDEX = [column for column, _ in EXPORT_COLUMNS].index('date')
+START_TIME_INDEX = [column for column, _ in EXPORT_COLUMNS].index('start_time')
+
+DEFAULT_CHUNK_SIZE = 2000
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+def _export_key(row):
+    """Sort key putting rows in EXPORT_ORDERING order"""
+    start_time = row[START_TIME_INDEX]
+    return (
+        -row[DATE_INDEX].toordinal(),
+        -(start_time.hour * 3600 + start_time.minute * 60 + start_time.second),
+        row[0]
+    )
+
+
+def iter_rows(queryset, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Yield lists of up to chunk_size value tuples in EXPORT_COLUMNS order
+
+    Args:
+        queryset: Booking queryset, already filtered and role-scoped, or a
+            list of such querysets (live and archived bookings) to merge
+        chunk_size: Rows fetched from the cursor per round trip
+    """
+    querysets = queryset if isinstance(queryset, (list, tuple)) else [queryset]
+    streams = [
+        queryset.order_by(*EXPORT_ORDERING).values_list(
+            *[lookup for _, lookup in EXPORT_COLUMNS]
+        ).iterator(chunk_size=chunk_size)
+        for queryset in querysets
+    ]
+    rows = streams[0] if len(streams) == 1 else heapq.merge(*streams, key=_export_key)
+
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class _Buffer:
+    """File-like object whose write() returns the data instead of storing it"""
+
+    def write(self, value):
+        return value
+
+
+def _isoformat(value):
+    return value.isoformat() if hasattr(value, 'isoformat') else value
+
+
+def iter_csv(queryset, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Yield a CSV export of a booking queryset, one string per chunk"""
+    writer = csv.writer(_Buffer())
+    yield writer.writerow([column for column, _ in EXPORT_COLUMNS])
+    for chunk in iter_rows(queryset, chunk_size):
+        yield ''.join(
+            writer.writerow([_isoformat(value) for value in row]) for row in chunk
+        )
+
+
+def iter_ndjson(queryset, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Yield a newline-delimited JSON export of a booking queryset, one string per chunk"""
+    columns = [column for column, _ in EXPORT_COLUMNS]
+    for chunk in iter_rows(queryset, chunk_size):
+        yield ''.join(
+            json.dumps(dict(zip(columns, map(_isoformat, row))), separators=(',', ':')) + '\n'
+            for row in chunk
+        )
+
+
+EXPORTERS = {
+    'csv': iter_csv,
+    'ndjson': iter_ndjson,
+}
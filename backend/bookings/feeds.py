@@ -0,0 +1,162 @@
+"""
+iCalendar (.ics) subscription feeds of a user's bookings.
+
+Calendar apps poll feeds every few minutes. Each poll first runs one
+aggregate (row count and latest updated_at) over the feed's bookings; the
+ETag is derived from it, so an unchanged feed answers 304 without reading or
+encoding a single booking. Any save bumps updated_at and any delete changes
+the count, so both change the ETag. There is no Last-Modified: the latest
+updated_at does not move on deletes and HTTP dates only have 1s precision.
+
+Only changes to bookings refresh the validators: renaming the person on the
+other side of a booking shows up with the next booking change.
+"""
+import hashlib
+from datetime import datetime, timezone as dt_timezone
+from functools import lru_cache
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from django.db.models import Count, Max
+
+from .models import Booking
+
+
+# Bump when the feed's output changes, so cached feeds are refetched
+FEED_VERSION = 1
+
+FEED_PERSPECTIVES = ('user', 'admin')
+
+PRODID = '-//Calendar Scheduler//Bookings//EN'
+
+EVENT_STATUS = {
+    'pending': 'TENTATIVE',
+    'confirmed': 'CONFIRMED',
+    'cancelled': 'CANCELLED',
+}
+
+DEFAULT_CHUNK_SIZE = 1000
+
+
+def feed_bookings(user, perspective):
+    """Bookings shown in a user's feed: the ones they booked, or the ones booked with them"""
+    if perspective == 'admin':
+        return Booking.objects.filter(admin=user)
+    return Booking.objects.filter(user=user)
+
+
+def feed_validators(user, perspective):
+    """
+    Return the ETag of a feed, computed with one aggregate query
+    """
+    state = feed_bookings(user, perspective).aggregate(
+        count=Count('id'),
+        last_modified=Max('updated_at')
+    )
+    last_modified = state['last_modified']
+    key = ':'.join(str(part) for part in (
+        FEED_VERSION, perspective, user.pk, state['count'],
+        last_modified.isoformat() if last_modified else ''
+    ))
+    return hashlib.sha256(key.encode()).hexdigest()[:32]
+
+
+def escape_text(value):
+    """Escape a TEXT property value (RFC 5545 section 3.3.11)"""
+    return (
+        value.replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,')
+        .replace('\r\n', '\\n').replace('\n', '\\n').replace('\r', '\\n')
+    )
+
+
+def fold(line):
+    """Fold a content line to 75 octets per physical line (RFC 5545 section 3.1)"""
+    encoded = line.encode()
+    if len(encoded) <= 75:
+        return line + '\r\n'
+
+    parts = []
+    limit = 75
+    while encoded:
+        cut = min(limit, len(encoded))
+        # Never split a multi-byte UTF-8 sequence
+        while cut < len(encoded) and encoded[cut] & 0xC0 == 0x80:
+            cut -= 1
+        parts.append(encoded[:cut].decode())
+        encoded = encoded[cut:]
+        limit = 74  # continuation lines start with a space
+    return '\r\n '.join(parts) + '\r\n'
+
+
+@lru_cache(maxsize=None)
+def _zone(name):
+    try:
+        return ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError):
+        return dt_timezone.utc
+
+
+def _utc_stamp(value):
+    return value.astimezone(dt_timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+
+def _local_stamp(date, time, zone_name):
+    """Format a booking's wall-clock time in its timezone as a UTC DATE-TIME"""
+    return _utc_stamp(datetime.combine(date, time, tzinfo=_zone(zone_name)))
+
+
+def _display_name(first_name, last_name, email):
+    return f'{first_name} {last_name}'.strip() or email
+
+
+def iter_ics(user, perspective, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Yield a VCALENDAR of a user's feed, one string per chunk of events
+
+    Events are read with values_list().iterator(), so memory does not grow
+    with the number of bookings.
+    """
+    other = 'user' if perspective == 'admin' else 'admin'
+    rows = feed_bookings(user, perspective).order_by('date', 'start_time', 'id').values_list(
+        'id', 'date', 'start_time', 'end_time', 'timezone', 'status', 'meeting_purpose',
+        'meeting_link', 'notes', 'created_at', 'updated_at',
+        f'{other}__first_name', f'{other}__last_name', f'{other}__email'
+    ).iterator(chunk_size=chunk_size)
+
+    name = 'My bookings' if perspective == 'user' else 'Meetings booked with me'
+    yield ''.join(fold(line) for line in (
+        'BEGIN:VCALENDAR',
+        'VERSION:2.0',
+        f'PRODID:{PRODID}',
+        'CALSCALE:GREGORIAN',
+        'METHOD:PUBLISH',
+        f'X-WR-CALNAME:{escape_text(name)}',
+    ))
+
+    chunk = []
+    for (booking_id, date, start_time, end_time, zone_name, status, purpose, link, notes,
+         created_at, updated_at, first_name, last_name, email) in rows:
+        description = f'{purpose}\n\n{notes}' if notes else purpose
+        summary = f'Meeting with {_display_name(first_name, last_name, email)}'
+        lines = [
+            'BEGIN:VEVENT',
+            f'UID:booking-{booking_id}@calendar-scheduler',
+            f'DTSTAMP:{_utc_stamp(updated_at)}',
+            f'CREATED:{_utc_stamp(created_at)}',
+            f'LAST-MODIFIED:{_utc_stamp(updated_at)}',
+            f'DTSTART:{_local_stamp(date, start_time, zone_name)}',
+            f'DTEND:{_local_stamp(date, end_time, zone_name)}',
+            f'SUMMARY:{escape_text(summary)}',
+            f'DESCRIPTION:{escape_text(description)}',
+            f'STATUS:{EVENT_STATUS.get(status, "CONFIRMED")}',
+        ]
+        if link:
+            lines.append(f'URL:{link}')
+        lines.append('END:VEVENT')
+        chunk.append(''.join(fold(line) for line in lines))
+
+        if len(chunk) == chunk_size:
+            yield ''.join(chunk)
+            chunk = []
+
+    chunk.append(fold('END:VCALENDAR'))
+    yield ''.join(chunk)
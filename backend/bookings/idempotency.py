@@ -0,0 +1,166 @@
+"""
+Idempotency-Key support for booking writes.
+
+A client that retries a POST with the same Idempotency-Key gets the response
+of the first attempt instead of a second booking, cancellation or
+reschedule. Responses are kept in the IdempotencyKey table for
+IDEMPOTENCY_KEY_TTL seconds per (user, key).
+
+The first request claims the key by inserting its row; the unique
+constraint on (user, key) lets exactly one of several concurrent duplicates
+in, whichever process they reach. The others poll until its response is
+stored and replay it, or give up with 409 after WAIT_SECONDS. Replays are
+answered with a single query.
+"""
+import hashlib
+import time
+from datetime import timedelta
+from functools import wraps
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import IdempotencyKey
+
+
+HEADER = 'Idempotency-Key'
+REPLAYED_HEADER = 'Idempotent-Replayed'
+MAX_KEY_LENGTH = 255
+
+# A claim outlives a crashed worker by at most this long
+PENDING_TIMEOUT = 60
+
+# How long a duplicate waits for the first request to finish
+WAIT_SECONDS = 10
+POLL_INTERVAL = 0.05
+MAX_POLL_INTERVAL = 0.5
+
+
+def _fingerprint(request):
+    """Identify the request a key was first used with"""
+    digest = hashlib.sha256()
+    digest.update(request.method.encode())
+    digest.update(request.get_full_path().encode())
+    digest.update(request.body)
+    return digest.hexdigest()
+
+
+def _replay(entry):
+    response = Response(entry.response, status=entry.status_code)
+    response[REPLAYED_HEADER] = 'true'
+    return response
+
+
+def _get(user_id, key):
+    """Return the live entry for a key, deleting it if it has expired"""
+    entry = IdempotencyKey.objects.filter(user_id=user_id, key=key).first()
+    if entry is not None and entry.expires_at <= timezone.now():
+        IdempotencyKey.objects.filter(pk=entry.pk, expires_at=entry.expires_at).delete()
+        return None
+    return entry
+
+
+def _claim(user_id, key, fingerprint):
+    """Insert the pending entry for a key; None if another request holds it"""
+    try:
+        with transaction.atomic():
+            return IdempotencyKey.objects.create(
+                user_id=user_id,
+                key=key,
+                fingerprint=fingerprint,
+                expires_at=timezone.now() + timedelta(seconds=PENDING_TIMEOUT)
+            )
+    except IntegrityError:
+        return None
+
+
+def _wait_for(user_id, key):
+    """Poll a pending entry until it completes, disappears or WAIT_SECONDS pass"""
+    deadline = time.monotonic() + WAIT_SECONDS
+    interval = POLL_INTERVAL
+    while time.monotonic() < deadline:
+        time.sleep(interval)
+        interval = min(interval * 2, MAX_POLL_INTERVAL)
+        entry = _get(user_id, key)
+        if entry is None or entry.status_code is not None:
+            return entry
+    return _get(user_id, key)
+
+
+def purge_expired_keys():
+    """Delete expired entries; returns the number deleted"""
+    return IdempotencyKey.objects.filter(expires_at__lte=timezone.now()).delete()[0]
+
+
+def idempotent(handler):
+    """
+    Make a view handler honour the Idempotency-Key header
+
+    Requests without the header run as usual. Responses below 500 are
+    stored and replayed, including the error responses of API exceptions
+    such as validation errors; server errors and other exceptions release
+    the key so a retry runs the handler again. Reusing a key for a
+    different method, path or body is rejected with 422.
+    """
+    @wraps(handler)
+    def wrapper(self, request, *args, **kwargs):
+        key = request.headers.get(HEADER)
+        if key is None:
+            return handler(self, request, *args, **kwargs)
+        if not key or len(key) > MAX_KEY_LENGTH:
+            return Response({
+                'error': f'{HEADER} must be 1 to {MAX_KEY_LENGTH} characters'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        user_id = request.user.pk
+        fingerprint = _fingerprint(request)
+
+        while True:
+            entry = _get(user_id, key)
+            if entry is None:
+                claim = _claim(user_id, key, fingerprint)
+                if claim is not None:
+                    break
+                # Claimed by a concurrent duplicate; look again
+                continue
+            if entry.fingerprint != fingerprint:
+                return Response({
+                    'error': f'{HEADER} was already used for a different request'
+                }, status=status.HTTP_422_UNPROCESSABLE_ENTITY)
+            if entry.status_code is None:
+                entry = _wait_for(user_id, key)
+                if entry is None:
+                    continue
+                if entry.status_code is None:
+                    response = Response({
+                        'error': f'A request with this {HEADER} is still in progress'
+                    }, status=status.HTTP_409_CONFLICT)
+                    response['Retry-After'] = '1'
+                    return response
+            return _replay(entry)
+
+        try:
+            try:
+                response = handler(self, request, *args, **kwargs)
+            except Exception as exc:
+                # API exceptions become the error response the client would
+                # get, which is stored like any other; the rest are re-raised
+                response = self.handle_exception(exc)
+        except Exception:
+            claim.delete()
+            raise
+
+        if response.status_code >= 500:
+            claim.delete()
+        else:
+            IdempotencyKey.objects.filter(pk=claim.pk).update(
+                status_code=response.status_code,
+                response=response.data,
+                expires_at=timezone.now() + timedelta(seconds=settings.IDEMPOTENCY_KEY_TTL)
+            )
+        return response
+
+    return wrapper
@@ -0,0 +1,57 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from bookings.archive import DEFAULT_BATCH_SIZE, archivable, archive_bookings
+from bookings.models import Booking
+
+
+class Command(BaseCommand):
+    help = 'Move old and long-cancelled bookings to the archive table'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help='Bookings moved per transaction'
+        )
+        parser.add_argument(
+            '--max-batches',
+            type=int,
+            default=None,
+            help='Stop after this many batches'
+        )
+        parser.add_argument(
+            '--horizon-days',
+            type=int,
+            default=settings.BOOKING_ARCHIVE_AFTER_DAYS,
+            help='Archive bookings dated more than this many days ago'
+        )
+        parser.add_argument(
+            '--cancelled-retention-days',
+            type=int,
+            default=settings.CANCELLED_BOOKING_RETENTION_DAYS,
+            help='Archive cancelled bookings unchanged for this many days'
+        )
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Only count the bookings due for the archive'
+        )
+
+    def handle(self, *args, **options):
+        if options['check']:
+            due = Booking.objects.filter(archivable(
+                horizon_days=options['horizon_days'],
+                cancelled_retention_days=options['cancelled_retention_days']
+            )).count()
+            self.stdout.write(f'{due} bookings are due for the archive')
+            return
+
+        archived = archive_bookings(
+            batch_size=options['batch_size'],
+            max_batches=options['max_batches'],
+            horizon_days=options['horizon_days'],
+            cancelled_retention_days=options['cancelled_retention_days']
+        )
+        self.stdout.write(self.style.SUCCESS(f'Archived {archived} bookings'))
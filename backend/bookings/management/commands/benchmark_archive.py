@@ -0,0 +1,131 @@
+import statistics
+import time
+from datetime import date, time as dt_time, timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from bookings.archive import archive_bookings
+from bookings.models import ArchivedBooking, Booking
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = 'Measure hot booking queries as history grows, with and without archiving (rolled back)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--history',
+            default='100000,300000,1000000',
+            help='Comma-separated total history sizes to measure at'
+        )
+        parser.add_argument('--live', type=int, default=5000, help='Upcoming bookings kept live')
+        parser.add_argument('--admins', type=int, default=50, help='Admins the bookings are spread over')
+        parser.add_argument('--repeat', type=int, default=200, help='Runs per query; the median is reported')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows per insert and archive batch')
+
+    def _seed(self, first, last, start, step, batch_size):
+        """Insert bookings first..last-1, 30-minute slots walking from start by step days"""
+        admin_count = len(self.admins)
+        per_day = admin_count * 48
+        for batch_start in range(first, last, batch_size):
+            batch = []
+            for index in range(batch_start, min(batch_start + batch_size, last)):
+                slot = index // admin_count % 48
+                batch.append(Booking(
+                    user=self.users[index % admin_count],
+                    admin=self.admins[index % admin_count],
+                    date=start + timedelta(days=step * (index // per_day)),
+                    start_time=dt_time(slot // 2, slot % 2 * 30),
+                    end_time=dt_time(slot // 2, slot % 2 * 30 + 29),
+                    meeting_purpose='Benchmark booking',
+                    status='cancelled' if index % 10 == 0 else 'confirmed'
+                ))
+            Booking.objects.bulk_create(batch)
+
+    def _hot_queries(self):
+        """The queries behind overlap checks, slots, dashboards and lists"""
+        today = date.today()
+        admin = self.admins[0]
+        user = self.users[0]
+        day = today + timedelta(days=3)
+        return [
+            ('overlap', lambda: Booking.objects.active_overlapping(
+                admin.id, day, dt_time(9), dt_time(9, 30)
+            ).exists()),
+            ('slots', lambda: list(Booking.objects.filter(
+                admin_id__in=[admin.id],
+                date__range=(today, today + timedelta(days=6)),
+                status__in=['confirmed', 'pending']
+            ).only('id', 'admin_id', 'date', 'start_time', 'end_time'))),
+            ('dashboard', lambda: list(Booking.objects.filter(
+                user=user, date__gte=today, status__in=['confirmed', 'pending']
+            ).order_by('date', 'start_time')[:10])),
+            ('list', lambda: list(
+                Booking.objects.filter(admin=admin).order_by('-date', '-start_time', 'id')[:20]
+            )),
+        ]
+
+    def _measure(self, repeat):
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        results = {}
+        for name, query in self._hot_queries():
+            timings = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                query()
+                timings.append(time.perf_counter() - started)
+            results[name] = statistics.median(timings) * 1e6
+        return results
+
+    def _report(self, label, history, live_rows, results):
+        self.stdout.write(
+            f'{history:>9,} {label:<10} {live_rows:>9,} live rows  ' +
+            '  '.join(f'{name} {micros:7.1f}us' for name, micros in results.items())
+        )
+
+    def handle(self, *args, **options):
+        sizes = sorted(int(value) for value in options['history'].split(','))
+        batch_size = options['batch_size']
+        suffix = int(time.time())
+
+        with transaction.atomic():
+            self.users = User.objects.bulk_create([
+                User(username=f'bench-user-{suffix}-{index}', email=f'bench-user-{index}@example.com')
+                for index in range(options['admins'])
+            ])
+            self.admins = User.objects.bulk_create([
+                User(username=f'bench-admin-{suffix}-{index}', email=f'bench-admin-{index}@example.com', role='admin')
+                for index in range(options['admins'])
+            ])
+
+            # Upcoming bookings, the same at every history size
+            self._seed(0, options['live'], date.today() + timedelta(days=1), 1, batch_size)
+            # History walks backwards from just past the archive horizon
+            history_start = date.today() - timedelta(days=settings.BOOKING_ARCHIVE_AFTER_DAYS + 1)
+
+            seeded = 0
+            for size in sizes:
+                started = time.perf_counter()
+                self._seed(
+                    options['live'] + seeded, options['live'] + size, history_start, -1, batch_size
+                )
+                seeded = size
+                self.stdout.write(f'seeded history to {size:,} in {time.perf_counter() - started:.1f}s')
+
+                self._report('unarchived', size, Booking.objects.count(), self._measure(options['repeat']))
+
+                savepoint = transaction.savepoint()
+                started = time.perf_counter()
+                archived = archive_bookings(batch_size=batch_size)
+                elapsed = time.perf_counter() - started
+                self.stdout.write(
+                    f'archived {archived:,} bookings in {elapsed:.1f}s ({archived / elapsed:,.0f} rows/s)'
+                )
+                self._report('archived', size, Booking.objects.count(), self._measure(options['repeat']))
+                assert ArchivedBooking.objects.count() == archived
+                transaction.savepoint_rollback(savepoint)
+
+            transaction.set_rollback(True)
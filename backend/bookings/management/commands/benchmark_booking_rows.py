@@ -0,0 +1,84 @@
+import statistics
+import time
+from datetime import date, time as dt_time, timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+
+from bookings.models import Booking
+from bookings.rows import booking_rows
+from bookings.serializers import BookingSerializer
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = 'Compare BookingSerializer with the .values() row plan on large pages (rolled back)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10000, help='Bookings per page')
+        parser.add_argument('--admins', type=int, default=50, help='Admins the bookings are spread over')
+        parser.add_argument('--repeat', type=int, default=5, help='Runs per path; the median is reported')
+
+    def _seed(self, rows, admin_count):
+        suffix = int(time.time())
+        users = User.objects.bulk_create([
+            User(username=f'bench-user-{suffix}-{index}', email=f'bench-user-{index}@example.com')
+            for index in range(admin_count)
+        ])
+        admins = User.objects.bulk_create([
+            User(username=f'bench-admin-{suffix}-{index}', email=f'bench-admin-{index}@example.com', role='admin')
+            for index in range(admin_count)
+        ])
+        start = date(2030, 1, 1)
+        Booking.objects.bulk_create([
+            Booking(
+                user=users[index % admin_count],
+                admin=admins[index % admin_count],
+                date=start + timedelta(days=index // (admin_count * 48)),
+                start_time=dt_time(index // admin_count % 48 // 2, index // admin_count % 2 * 30),
+                end_time=dt_time(index // admin_count % 48 // 2, index // admin_count % 2 * 30 + 29),
+                meeting_purpose='Benchmark booking',
+                status='confirmed'
+            )
+            for index in range(rows)
+        ], batch_size=5000)
+        return Booking.objects.filter(admin__in=admins).order_by('-date', '-start_time', 'id')
+
+    def _time(self, render, repeat):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            body = JSONRenderer().render(render())
+            timings.append(time.perf_counter() - started)
+        return statistics.median(timings), body
+
+    def handle(self, *args, **options):
+        rows = options['rows']
+
+        with transaction.atomic():
+            queryset = self._seed(rows, options['admins'])
+
+            paths = [
+                ('serializer', lambda: BookingSerializer(queryset, many=True).data),
+                ('serializer+join', lambda: BookingSerializer(
+                    queryset.select_related('user', 'admin'), many=True
+                ).data),
+                ('row plan', lambda: booking_rows.render(booking_rows.values(queryset))),
+            ]
+            bodies = {}
+            results = {}
+            for name, render in paths:
+                results[name], bodies[name] = self._time(render, options['repeat'])
+                self.stdout.write(
+                    f'{name:<16} {results[name] * 1000:8.1f}ms per page  '
+                    f'{results[name] / rows * 1e6:6.1f}us per row'
+                )
+
+            identical = len(set(bodies.values())) == 1
+            self.stdout.write(
+                f'row plan is {results["serializer+join"] / results["row plan"]:.1f}x faster than '
+                f'the joined serializer; output identical: {identical}'
+            )
+
+            transaction.set_rollback(True)
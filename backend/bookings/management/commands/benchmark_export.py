@@ -0,0 +1,112 @@
+import time
+import tracemalloc
+from datetime import date, time as dt_time, timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from bookings.export import EXPORTERS
+from bookings.models import Booking
+from bookings.serializers import BookingSerializer
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = 'Measure time and peak memory of streaming booking exports over seeded rows (rolled back)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000000, help='Bookings to seed')
+        parser.add_argument('--admins', type=int, default=50, help='Admins the bookings are spread over')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows per seeding insert')
+        parser.add_argument(
+            '--serializer-rows',
+            type=int,
+            default=10000,
+            help='Rows to run through BookingSerializer for comparison (0 to skip)'
+        )
+
+    def _seed(self, rows, admin_count, batch_size):
+        """Insert non-overlapping 15-minute bookings spread over admins and days"""
+        suffix = int(time.time())
+        users = User.objects.bulk_create([
+            User(username=f'bench-user-{suffix}-{index}', email=f'bench-user-{index}@example.com')
+            for index in range(admin_count)
+        ])
+        admins = User.objects.bulk_create([
+            User(username=f'bench-admin-{suffix}-{index}', email=f'bench-admin-{index}@example.com', role='admin')
+            for index in range(admin_count)
+        ])
+
+        slots_per_day = 96
+        start = date(2030, 1, 1)
+        for first in range(0, rows, batch_size):
+            batch = []
+            for index in range(first, min(first + batch_size, rows)):
+                slot = index // admin_count % slots_per_day
+                batch.append(Booking(
+                    user=users[index % admin_count],
+                    admin=admins[index % admin_count],
+                    date=start + timedelta(days=index // (admin_count * slots_per_day)),
+                    start_time=dt_time(slot // 4, slot % 4 * 15),
+                    end_time=dt_time(slot // 4, slot % 4 * 15 + 14),
+                    meeting_purpose='Benchmark booking',
+                    status='confirmed'
+                ))
+            Booking.objects.bulk_create(batch)
+
+    def _stream(self, exporter, rows, traced):
+        """
+        Consume an export, returning (seconds, bytes, peak memory by rows read)
+
+        Peak memory is sampled after the chunks that cross 1%, 10% and 100%
+        of the rows; flat numbers mean memory does not grow with row count.
+        """
+        checkpoints = sorted({max(1, rows // 100), max(1, rows // 10), rows})
+        peaks = []
+        size = 0
+        seen = 0
+        if traced:
+            tracemalloc.start()
+        started = time.perf_counter()
+        for chunk in exporter(Booking.objects.all()):
+            size += len(chunk)
+            seen += chunk.count('\n')
+            while traced and checkpoints and seen >= checkpoints[0]:
+                peaks.append((checkpoints.pop(0), tracemalloc.get_traced_memory()[1]))
+        elapsed = time.perf_counter() - started
+        if traced:
+            tracemalloc.stop()
+        return elapsed, size, peaks
+
+    def handle(self, *args, **options):
+        rows = options['rows']
+        with transaction.atomic():
+            started = time.perf_counter()
+            self._seed(rows, options['admins'], options['batch_size'])
+            self.stdout.write(f'seeded {rows} bookings in {time.perf_counter() - started:.1f}s')
+
+            for name, exporter in EXPORTERS.items():
+                elapsed, size, _ = self._stream(exporter, rows, traced=False)
+                self.stdout.write(
+                    f'{name}: {elapsed:.1f}s, {rows / elapsed:,.0f} rows/s, {size / 1e6:.0f} MB streamed'
+                )
+                _, _, peaks = self._stream(exporter, rows, traced=True)
+                self.stdout.write(f'{name} peak memory: ' + ', '.join(
+                    f'{read:,} rows {peak / 1e6:.1f} MB' for read, peak in peaks
+                ))
+
+            sample = options['serializer_rows']
+            if sample:
+                queryset = Booking.objects.order_by('-date', '-start_time', 'id')[:sample]
+                tracemalloc.start()
+                started = time.perf_counter()
+                BookingSerializer(queryset, many=True).data
+                elapsed = time.perf_counter() - started
+                peak = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+                self.stdout.write(
+                    f'BookingSerializer on {sample:,} rows: {elapsed:.1f}s, '
+                    f'{sample / elapsed:,.0f} rows/s, peak {peak / 1e6:.1f} MB'
+                )
+
+            transaction.set_rollback(True)
@@ -0,0 +1,37 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from bookings import outbox
+
+
+class Command(BaseCommand):
+    help = 'Dispatch pending booking side effects (calendar events and emails) from the outbox'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=outbox.DEFAULT_BATCH_SIZE)
+        parser.add_argument('--workers', type=int, default=4, help='Dispatch threads')
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Keep draining, picking up retries as they come due'
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=5.0,
+            help='Seconds to sleep between drains with --loop'
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            stats = outbox.drain(batch_size=options['batch_size'], workers=options['workers'])
+            if stats['claimed'] or not options['loop']:
+                self.stdout.write(
+                    f"{stats['claimed']} messages: {stats['done']} done, "
+                    f"{stats['retry']} retrying, {stats['failed']} failed "
+                    f"({stats['throughput_per_second']}/s, max lag {stats['max_lag_seconds']}s)"
+                )
+            if not options['loop']:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from bookings.idempotency import purge_expired_keys
+
+
+class Command(BaseCommand):
+    help = 'Delete Idempotency-Key entries whose replay window has passed'
+
+    def handle(self, *args, **options):
+        purged = purge_expired_keys()
+        self.stdout.write(self.style.SUCCESS(f'Purged {purged} idempotency keys'))
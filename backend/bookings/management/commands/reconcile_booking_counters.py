@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from bookings.counters import find_counter_drift, reconcile_counters
+
+
+class Command(BaseCommand):
+    help = 'Recount the dashboard booking counters from the booking table, or check them for drift'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Only report counters that differ from the booking table'
+        )
+
+    def handle(self, *args, **options):
+        if options['check']:
+            drift = find_counter_drift()
+            if drift:
+                raise CommandError(
+                    f'{len(drift)} booking counters drifted. '
+                    f'Run "python manage.py reconcile_booking_counters" to repair them.'
+                )
+            self.stdout.write(self.style.SUCCESS('Booking counters are in sync'))
+            return
+
+        with transaction.atomic():
+            fixed = reconcile_counters()
+        self.stdout.write(self.style.SUCCESS(f'Fixed {fixed} booking counters'))
@@ -0,0 +1,32 @@
+# Generated by Django 5.0.1 on 2026-10-18 02:36
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0002_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BookingLock',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('generation', models.PositiveBigIntegerField(default=0, help_text='Number of reservations made under this lock')),
+                ('admin', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'booking_locks',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='bookinglock',
+            constraint=models.UniqueConstraint(fields=('admin', 'date'), name='unique_booking_lock'),
+        ),
+    ]
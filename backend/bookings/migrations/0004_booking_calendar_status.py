@@ -0,0 +1,25 @@
+# Generated by Django 5.0.1 on 2026-10-18 02:37
+
+from django.db import migrations, models
+
+
+def mark_existing_events(apps, schema_editor):
+    """Bookings that already have a calendar event were created synchronously"""
+    Booking = apps.get_model('bookings', 'Booking')
+    Booking.objects.exclude(calendar_event_id='').update(calendar_status='created')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0003_bookinglock'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='booking',
+            name='calendar_status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('created', 'Created'), ('failed', 'Failed'), ('skipped', 'Skipped')], default='skipped', help_text='State of the Google Calendar event creation', max_length=20),
+        ),
+        migrations.RunPython(mark_existing_events, migrations.RunPython.noop),
+    ]
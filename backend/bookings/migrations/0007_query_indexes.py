@@ -0,0 +1,23 @@
+# Generated by Django 5.0.1 on 2026-10-18 02:46
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0006_booking_keyset_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['admin', '-date', '-start_time', 'id'], name='booking_admin_keyset_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['user', '-date', '-start_time', 'id'], name='booking_user_keyset_idx'),
+        ),
+    ]
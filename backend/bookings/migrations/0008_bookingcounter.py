@@ -0,0 +1,59 @@
+# Generated by Django 5.0.1 on 2026-10-18 02:49
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def populate_counters(apps, schema_editor):
+    """Count bookings made before the counters table existed"""
+    Booking = apps.get_model('bookings', 'Booking')
+    BookingCounter = apps.get_model('bookings', 'BookingCounter')
+
+    statuses = ('pending', 'confirmed', 'cancelled')
+    aggregates = {'total': models.Count('id')}
+    aggregates.update({
+        status: models.Count('id', filter=models.Q(status=status)) for status in statuses
+    })
+
+    rows = []
+    for perspective, field in (('user', 'user_id'), ('admin', 'admin_id')):
+        for row in Booking.objects.order_by().values(field).annotate(**aggregates):
+            rows.append(BookingCounter(
+                user_id=row[field],
+                perspective=perspective,
+                total=row['total'],
+                **{status: row[status] for status in statuses}
+            ))
+    BookingCounter.objects.bulk_create(rows, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0007_query_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BookingCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('perspective', models.CharField(choices=[('user', 'As user'), ('admin', 'As admin')], max_length=10)),
+                ('total', models.IntegerField(default=0)),
+                ('pending', models.IntegerField(default=0)),
+                ('confirmed', models.IntegerField(default=0)),
+                ('cancelled', models.IntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'booking_counters',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='bookingcounter',
+            constraint=models.UniqueConstraint(fields=('user', 'perspective'), name='unique_booking_counter'),
+        ),
+        migrations.RunPython(populate_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.0.1 on 2026-10-18 03:11
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0008_bookingcounter'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedBooking',
+            fields=[
+                ('id', models.IntegerField(primary_key=True, serialize=False)),
+                ('date', models.DateField()),
+                ('start_time', models.TimeField()),
+                ('end_time', models.TimeField()),
+                ('timezone', models.CharField(default='UTC', max_length=50)),
+                ('meeting_purpose', models.TextField()),
+                ('meeting_link', models.URLField(blank=True)),
+                ('calendar_event_id', models.CharField(blank=True, max_length=255)),
+                ('calendar_status', models.CharField(choices=[('pending', 'Pending'), ('created', 'Created'), ('failed', 'Failed'), ('skipped', 'Skipped')], default='skipped', max_length=20)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('confirmed', 'Confirmed'), ('cancelled', 'Cancelled')], max_length=20)),
+                ('notes', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('admin', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'booking_archive',
+                'ordering': ['-date', '-start_time'],
+                'indexes': [models.Index(fields=['-date', '-start_time', 'id'], name='archive_keyset_idx'), models.Index(fields=['admin', '-date', '-start_time', 'id'], name='archive_admin_keyset_idx'), models.Index(fields=['user', '-date', '-start_time', 'id'], name='archive_user_keyset_idx')],
+            },
+        ),
+    ]
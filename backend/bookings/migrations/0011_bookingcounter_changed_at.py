@@ -0,0 +1,18 @@
+# Generated by Django 5.0.1 on 2026-10-18 04:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0010_idempotencykey'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bookingcounter',
+            name='changed_at',
+            field=models.DateTimeField(blank=True, help_text='Last change to any booking of the user in this perspective', null=True),
+        ),
+    ]
@@ -1,8 +1,21 @@
-from django.db import models
+from django.db import models, transaction
 from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
 from users.models import User
 
 
+class BookingQuerySet(models.QuerySet):
+    def active_overlapping(self, admin_id, date, start_time, end_time):
+        """Active bookings of an admin on a date overlapping [start_time, end_time)"""
+        return self.filter(
+            admin_id=admin_id,
+            date=date,
+            status__in=['confirmed', 'pending'],
+            start_time__lt=end_time,
+            end_time__gt=start_time
+        )
+
+
 class Booking(models.Model):
     """
     Meeting booking model
@@ -13,6 +26,17 @@ class Booking(models.Model):
         ('cancelled', 'Cancelled'),
     ]
     
+    CALENDAR_STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('created', 'Created'),
+        ('failed', 'Failed'),
+        ('skipped', 'Skipped'),
+    ]
+    
+    # Fields that decide where a booking sits; saves touching none of them
+    # skip validation and slot maintenance
+    SCHEDULING_FIELDS = {'user', 'admin', 'date', 'start_time', 'end_time', 'status'}
+    
     user = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -46,6 +70,12 @@ class Booking(models.Model):
         blank=True,
         help_text='Google Calendar event ID'
     )
+    calendar_status = models.CharField(
+        max_length=20,
+        choices=CALENDAR_STATUS_CHOICES,
+        default='skipped',
+        help_text='State of the Google Calendar event creation'
+    )
     status = models.CharField(
         max_length=20,
         choices=STATUS_CHOICES,
@@ -58,9 +88,19 @@ class Booking(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = BookingQuerySet.as_manager()
+    
     class Meta:
         db_table = 'bookings'
         ordering = ['-date', '-start_time']
+        indexes = [
+            # Keyset pagination key of the booking list
+            models.Index(fields=['-date', '-start_time', 'id'], name='booking_keyset_idx'),
+            # The same key within one admin's or one user's bookings: role
+            # scoped lists, dashboards, slot queries and the overlap check
+            models.Index(fields=['admin', '-date', '-start_time', 'id'], name='booking_admin_keyset_idx'),
+            models.Index(fields=['user', '-date', '-start_time', 'id'], name='booking_user_keyset_idx'),
+        ]
         constraints = [
             models.UniqueConstraint(
                 fields=['admin', 'date', 'start_time'],
@@ -69,6 +109,22 @@ class Booking(models.Model):
             )
         ]
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember where the booking sat when loaded, so moves can refresh both days
+        instance._loaded_slot_day = (
+            instance.__dict__.get('admin_id'),
+            instance.__dict__.get('date')
+        )
+        # ...and who it counted towards, so status changes move dashboard counters
+        instance._loaded_counter_key = (
+            instance.__dict__.get('user_id'),
+            instance.__dict__.get('admin_id'),
+            instance.__dict__.get('status')
+        )
+        return instance
+    
     def __str__(self):
         return f"{self.user.username} meeting with {self.admin.username} on {self.date} at {self.start_time}"
     
@@ -82,21 +138,294 @@ class Booking(models.Model):
             raise ValidationError('Cannot book a meeting with yourself')
         
         # Check for overlapping bookings (excluding current instance and cancelled)
-        from django.db.models import Q
-        overlapping = Booking.objects.filter(
-            admin=self.admin,
-            date=self.date,
-            status__in=['confirmed', 'pending']
-        ).exclude(pk=self.pk)
+        overlapping = Booking.objects.active_overlapping(
+            self.admin_id, self.date, self.start_time, self.end_time
+        ).exclude(pk=self.pk).only('start_time', 'end_time').first()
         
-        for booking in overlapping:
-            if (self.start_time < booking.end_time and 
-                self.end_time > booking.start_time):
-                raise ValidationError(
-                    f'This slot overlaps with an existing booking from '
-                    f'{booking.start_time} to {booking.end_time}'
-                )
-    
-    def save(self, *args, **kwargs):
-        self.full_clean()
-        super().save(*args, **kwargs)
+        if overlapping:
+            raise ValidationError(
+                f'This slot overlaps with an existing booking from '
+                f'{overlapping.start_time} to {overlapping.end_time}'
+            )
+    
+    def slot_days(self):
+        """Return the (admin_id, date) pairs whose slots this booking affects"""
+        days = {(self.admin_id, self.date)}
+        loaded = getattr(self, '_loaded_slot_day', None)
+        if loaded:
+            days.add(loaded)
+        return days
+    
+    def counter_key(self):
+        """Return the (user_id, admin_id, status) this booking counts towards"""
+        return (self.user_id, self.admin_id, self.status)
+    
+    def _previous_counter_key(self):
+        if self._state.adding:
+            return None
+        loaded = getattr(self, '_loaded_counter_key', None)
+        if not loaded:
+            return None
+        # Deferred fields were not loaded; they cannot have been changed either
+        return tuple(
+            previous if previous is not None else current
+            for previous, current in zip(loaded, self.counter_key())
+        )
+    
+    def save(self, *args, clean=True, **kwargs):
+        """
+        Validate and save, keeping slots and counters in step
+        
+        Args:
+            clean: Run full_clean first; reservations pass False after
+                running the same checks with their overlap query under
+                the admin day's lock
+        """
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and not self.SCHEDULING_FIELDS & set(update_fields):
+            super().save(*args, **kwargs)
+            # Counts are unchanged, but dashboards show these fields too
+            from .counters import bookings_counted
+            bookings_counted([(self.counter_key(), self.counter_key())])
+            return
+        
+        if clean:
+            self.full_clean()
+        previous = self._previous_counter_key()
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            
+            from availability.changes import bookings_changed
+            bookings_changed(self.slot_days())
+            
+            from .counters import bookings_counted
+            bookings_counted([(previous, self.counter_key())])
+        self._loaded_slot_day = (self.admin_id, self.date)
+        self._loaded_counter_key = self.counter_key()
+    
+    def delete(self, *args, **kwargs):
+        days = self.slot_days()
+        previous = self._previous_counter_key() or self.counter_key()
+        with transaction.atomic():
+            result = super().delete(*args, **kwargs)
+            
+            from availability.changes import bookings_changed
+            bookings_changed(days)
+            
+            from .counters import bookings_counted
+            bookings_counted([(previous, None)])
+        return result
+
+
+class BookingLock(models.Model):
+    """
+    Lock row serializing booking writes for one admin and date
+    
+    Written at the start of every reservation transaction; see
+    bookings.reservations.
+    """
+    admin = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+    date = models.DateField()
+    generation = models.PositiveBigIntegerField(
+        default=0,
+        help_text='Number of reservations made under this lock'
+    )
+    
+    class Meta:
+        db_table = 'booking_locks'
+        constraints = [
+            models.UniqueConstraint(fields=['admin', 'date'], name='unique_booking_lock')
+        ]
+    
+    def __str__(self):
+        return f"Lock {self.admin_id} {self.date}"
+
+
+class OutboxMessage(models.Model):
+    """
+    Booking side effect (emails, calendar calls) waiting to be dispatched
+    
+    Rows are written in the same transaction as the booking change, so a
+    committed change always has its side effects recorded; see
+    bookings.outbox for the drain.
+    """
+    KIND_CHOICES = [
+        ('booking_created', 'Booking Created'),
+        ('booking_cancelled', 'Booking Cancelled'),
+        ('booking_rescheduled', 'Booking Rescheduled'),
+    ]
+    
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('processing', 'Processing'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+    
+    kind = models.CharField(max_length=30, choices=KIND_CHOICES)
+    booking = models.ForeignKey(
+        Booking,
+        on_delete=models.CASCADE,
+        related_name='outbox_messages'
+    )
+    payload = models.JSONField(
+        default=dict,
+        blank=True,
+        help_text='Extra data captured with the change, e.g. the previous time of a reschedule'
+    )
+    status = models.CharField(
+        max_length=20,
+        choices=STATUS_CHOICES,
+        default='pending'
+    )
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(
+        help_text='Earliest time the message may be dispatched'
+    )
+    locked_until = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text='End of the lease held by the drain processing this message'
+    )
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        db_table = 'booking_outbox'
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='outbox_status_due_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.kind} for booking {self.booking_id} ({self.status})"
+
+
+class BookingCounter(models.Model):
+    """
+    Booking totals for one user, seen as booker or as admin
+    
+    Kept up to date by booking writes (see bookings.counters), so dashboards
+    read their statistics from one row instead of counting bookings.
+    """
+    PERSPECTIVE_CHOICES = [
+        ('user', 'As user'),
+        ('admin', 'As admin'),
+    ]
+    
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+    perspective = models.CharField(max_length=10, choices=PERSPECTIVE_CHOICES)
+    total = models.IntegerField(default=0)
+    pending = models.IntegerField(default=0)
+    confirmed = models.IntegerField(default=0)
+    cancelled = models.IntegerField(default=0)
+    changed_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text='Last change to any booking of the user in this perspective'
+    )
+    
+    class Meta:
+        db_table = 'booking_counters'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'perspective'], name='unique_booking_counter')
+        ]
+    
+    def __str__(self):
+        return f"Booking counts of {self.user_id} as {self.perspective}"
+
+
+class ArchivedBooking(models.Model):
+    """
+    Booking moved out of the bookings table by bookings.archive
+    
+    Keeps the original id and every column, so history reads can merge it
+    with live bookings. Archived rows are read-only.
+    """
+    id = models.IntegerField(primary_key=True)
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+    admin = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+    date = models.DateField()
+    start_time = models.TimeField()
+    end_time = models.TimeField()
+    timezone = models.CharField(max_length=50, default='UTC')
+    meeting_purpose = models.TextField()
+    meeting_link = models.URLField(blank=True)
+    calendar_event_id = models.CharField(max_length=255, blank=True)
+    calendar_status = models.CharField(
+        max_length=20,
+        choices=Booking.CALENDAR_STATUS_CHOICES,
+        default='skipped'
+    )
+    status = models.CharField(max_length=20, choices=Booking.STATUS_CHOICES)
+    notes = models.TextField(blank=True)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        db_table = 'booking_archive'
+        ordering = ['-date', '-start_time']
+        indexes = [
+            # Same keys as the live table, for scoped history pages
+            models.Index(fields=['-date', '-start_time', 'id'], name='archive_keyset_idx'),
+            models.Index(fields=['admin', '-date', '-start_time', 'id'], name='archive_admin_keyset_idx'),
+            models.Index(fields=['user', '-date', '-start_time', 'id'], name='archive_user_keyset_idx'),
+        ]
+    
+    def __str__(self):
+        return f"Archived booking {self.id} on {self.date} at {self.start_time}"
+
+
+class IdempotencyKey(models.Model):
+    """
+    Idempotency-Key of a booking write and the response to replay for it
+    
+    A row without a status code is a claim by a request that is still
+    running. The unique constraint makes the claim atomic across processes;
+    see bookings.idempotency.
+    """
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+    key = models.CharField(max_length=255)
+    fingerprint = models.CharField(
+        max_length=64,
+        help_text='Hash of the method, path and body the key was first used with'
+    )
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True)
+    response = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    expires_at = models.DateTimeField(
+        help_text='When the claim lapses or the stored response is forgotten'
+    )
+    
+    class Meta:
+        db_table = 'idempotency_keys'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'key'], name='unique_idempotency_key')
+        ]
+        indexes = [
+            models.Index(fields=['expires_at'], name='idempotency_expiry_idx'),
+        ]
+    
+    def __str__(self):
+        return f"Idempotency key {self.key} of {self.user_id}"
@@ -0,0 +1,340 @@
+"""
+Transactional outbox for booking side effects.
+
+Booking writes add an OutboxMessage in the same transaction, so emails and
+calendar calls are recorded exactly when the change commits and never when
+it rolls back. A drain claims due messages in batches, dispatches them
+through a thread pool and records the outcome: successes are marked done,
+failures are retried with exponential backoff until MAX_ATTEMPTS, after
+which the message is marked failed.
+
+Claims are leases: a drain that dies mid-batch leaves its messages in
+'processing' until locked_until passes, when another drain reclaims them.
+Handlers are therefore written to be safe to repeat: the calendar event is
+saved before any email goes out, and each recipient an email reached is
+recorded on the message, so a retry only emails the others.
+"""
+import logging
+import time
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta, time as dt_time
+
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Count, F, Min, Q
+from django.utils import timezone
+
+from calendar_scheduler.integrations.email_service import RECIPIENTS, EmailService
+from calendar_scheduler.integrations.google_calendar import GoogleCalendarService
+from .models import OutboxMessage
+
+logger = logging.getLogger(__name__)
+
+
+MAX_ATTEMPTS = 8
+BACKOFF_BASE_SECONDS = 30
+BACKOFF_MAX_SECONDS = 3600
+LEASE_SECONDS = 300
+DEFAULT_BATCH_SIZE = 50
+
+LAST_DRAIN_KEY = 'outbox:last-drain'
+
+
+class DispatchError(Exception):
+    """Raised by a handler when a side effect should be retried"""
+
+
+def enqueue(kind, booking, payload=None):
+    """
+    Record a side effect for a booking change
+
+    Call inside the transaction that writes the booking.
+
+    Args:
+        kind: One of OutboxMessage.KIND_CHOICES
+        booking: Saved Booking instance
+        payload: Optional JSON-serializable data for the handler
+    """
+    return OutboxMessage.objects.create(
+        kind=kind,
+        booking=booking,
+        payload=payload or {},
+        next_attempt_at=timezone.now()
+    )
+
+
+def enqueue_many(kind, bookings):
+    """Record the same side effect for many bookings with one bulk insert"""
+    now = timezone.now()
+    return OutboxMessage.objects.bulk_create([
+        OutboxMessage(kind=kind, booking=booking, payload={}, next_attempt_at=now)
+        for booking in bookings
+    ], batch_size=500)
+
+
+def backoff_seconds(attempts):
+    """Delay before retrying a message that has failed `attempts` times"""
+    return min(BACKOFF_BASE_SECONDS * 2 ** (attempts - 1), BACKOFF_MAX_SECONDS)
+
+
+def _claimable(now):
+    return (
+        Q(status='pending', next_attempt_at__lte=now) |
+        Q(status='processing', locked_until__lt=now)
+    )
+
+
+def claim_batch(batch_size=DEFAULT_BATCH_SIZE, lease_seconds=LEASE_SECONDS):
+    """
+    Lease up to `batch_size` due messages to the caller
+
+    Uses SELECT ... FOR UPDATE SKIP LOCKED where the database supports it,
+    so concurrent drains take disjoint batches. Elsewhere (SQLite) the
+    claiming UPDATE re-checks that rows are still claimable and the batch is
+    read back by its lease stamp, so a row is only ever handed to one drain.
+
+    Returns:
+        List of OutboxMessage with booking, user and admin loaded
+    """
+    now = timezone.now()
+    lease = now + timedelta(seconds=lease_seconds)
+
+    with transaction.atomic():
+        due = OutboxMessage.objects.filter(_claimable(now)).order_by('next_attempt_at', 'id')
+        if connection.features.has_select_for_update_skip_locked:
+            due = due.select_for_update(skip_locked=True)
+        ids = list(due.values_list('id', flat=True)[:batch_size])
+        if not ids:
+            return []
+
+        OutboxMessage.objects.filter(_claimable(now), id__in=ids).update(
+            status='processing',
+            locked_until=lease,
+            attempts=F('attempts') + 1
+        )
+
+    return list(
+        OutboxMessage.objects.filter(id__in=ids, status='processing', locked_until=lease)
+        .select_related('booking__user', 'booking__admin')
+    )
+
+
+def send_to_remaining(message, send):
+    """
+    Email every recipient the message has not reached yet
+
+    Each delivery is recorded in the message payload before the next
+    recipient is emailed, so a retry after a partial failure does not send
+    anyone the same email twice.
+
+    Args:
+        message: Claimed OutboxMessage
+        send: EmailService send method accepting recipients=
+    """
+    delivered = list(message.payload.get('delivered', []))
+    for recipient in RECIPIENTS:
+        if recipient in delivered:
+            continue
+        send(recipients=(recipient,))
+        delivered.append(recipient)
+        message.payload['delivered'] = delivered
+        OutboxMessage.objects.filter(
+            pk=message.pk, locked_until=message.locked_until
+        ).update(payload=message.payload)
+
+
+def handle_booking_created(message, email_service, calendar_service, final_attempt):
+    """
+    Create the calendar event if still needed, then send the confirmation emails
+
+    The booking is re-read first: one cancelled since the message was
+    written gets neither, and the message is simply done.
+    """
+    booking = message.booking
+    booking.refresh_from_db()
+    if booking.status == 'cancelled':
+        logger.info(f"Booking {booking.id} was cancelled; skipping its confirmation")
+        if booking.calendar_status == 'pending':
+            booking.calendar_status = 'skipped'
+            booking.save(update_fields=['calendar_status', 'updated_at'])
+        return
+
+    if booking.calendar_status == 'pending':
+        event_data = calendar_service.create_event(booking.admin, booking)
+        if event_data:
+            booking.meeting_link = event_data.get('meet_link', '') or event_data.get('html_link', '')
+            booking.calendar_event_id = event_data.get('event_id', '')
+            booking.calendar_status = 'created'
+            logger.info(f"Calendar event created for booking {booking.id}: {booking.meeting_link}")
+        elif not final_attempt:
+            raise DispatchError(f'Calendar event could not be created for booking {booking.id}')
+        else:
+            # Out of retries: confirm the booking without a meeting link
+            booking.calendar_status = 'failed'
+            logger.error(f"Giving up on calendar event for booking {booking.id}")
+
+        # Persisted before emailing, so a retry after an email failure
+        # does not create a second event
+        booking.save(update_fields=[
+            'meeting_link', 'calendar_event_id', 'calendar_status', 'updated_at'
+        ])
+
+    send_to_remaining(message, partial(
+        email_service.send_booking_confirmation_email, booking, fail_silently=False
+    ))
+
+
+def handle_booking_cancelled(message, email_service, calendar_service, final_attempt):
+    """Send the cancellation emails"""
+    send_to_remaining(message, partial(
+        email_service.send_booking_cancellation_email, message.booking, fail_silently=False
+    ))
+
+
+def handle_booking_rescheduled(message, email_service, calendar_service, final_attempt):
+    """Send the reschedule emails with the time the booking moved from"""
+    payload = message.payload
+    send_to_remaining(message, partial(
+        email_service.send_booking_reschedule_email,
+        message.booking,
+        date.fromisoformat(payload['old_date']),
+        dt_time.fromisoformat(payload['old_start_time']),
+        dt_time.fromisoformat(payload['old_end_time']),
+        fail_silently=False
+    ))
+
+
+HANDLERS = {
+    'booking_created': handle_booking_created,
+    'booking_cancelled': handle_booking_cancelled,
+    'booking_rescheduled': handle_booking_rescheduled,
+}
+
+
+def dispatch(message, email_service=EmailService, calendar_service=GoogleCalendarService):
+    """
+    Run the handler for one claimed message
+
+    Returns:
+        None on success, or the exception that made it fail
+    """
+    try:
+        HANDLERS[message.kind](
+            message, email_service, calendar_service,
+            final_attempt=message.attempts >= MAX_ATTEMPTS
+        )
+        return None
+    except Exception as e:
+        logger.warning(f"Outbox message {message.id} ({message.kind}) failed: {str(e)}")
+        return e
+
+
+def record_result(message, error, now=None):
+    """
+    Mark a dispatched message done, schedule its retry, or give up on it
+
+    Returns:
+        'done', 'retry' or 'failed', or None when the lease expired and
+        another drain has reclaimed the message
+    """
+    now = now or timezone.now()
+
+    if error is None:
+        outcome = 'done'
+        fields = {'status': 'done', 'processed_at': now, 'last_error': ''}
+    elif message.attempts >= MAX_ATTEMPTS:
+        outcome = 'failed'
+        fields = {'status': 'failed', 'processed_at': now, 'last_error': str(error)}
+    else:
+        outcome = 'retry'
+        fields = {
+            'status': 'pending',
+            'next_attempt_at': now + timedelta(seconds=backoff_seconds(message.attempts)),
+            'last_error': str(error),
+        }
+
+    updated = OutboxMessage.objects.filter(
+        pk=message.pk, locked_until=message.locked_until
+    ).update(locked_until=None, **fields)
+    return outcome if updated else None
+
+
+def drain(batch_size=DEFAULT_BATCH_SIZE, workers=4, max_messages=None,
+          email_service=EmailService, calendar_service=GoogleCalendarService):
+    """
+    Dispatch due outbox messages until none are left
+
+    Args:
+        batch_size: Messages claimed per round trip
+        workers: Dispatch threads; 1 runs handlers inline
+        max_messages: Optional cap on messages claimed by this call
+        email_service: Object with the EmailService send methods
+        calendar_service: Object with a GoogleCalendarService-style create_event
+
+    Returns:
+        Dict with counts per outcome, throughput and lag (seconds between a
+        message being written and finishing)
+    """
+    stats = {'claimed': 0, 'done': 0, 'retry': 0, 'failed': 0}
+    lags = []
+    started = time.perf_counter()
+    pool = ThreadPoolExecutor(max_workers=workers) if workers > 1 else None
+
+    def run(message):
+        try:
+            return dispatch(message, email_service, calendar_service)
+        finally:
+            # Pool threads open their own connections; don't leak them
+            if pool:
+                connection.close()
+
+    try:
+        while max_messages is None or stats['claimed'] < max_messages:
+            limit = batch_size
+            if max_messages is not None:
+                limit = min(batch_size, max_messages - stats['claimed'])
+            batch = claim_batch(limit)
+            if not batch:
+                break
+            stats['claimed'] += len(batch)
+
+            errors = pool.map(run, batch) if pool else map(run, batch)
+            for message, error in zip(batch, list(errors)):
+                now = timezone.now()
+                outcome = record_result(message, error, now)
+                if outcome:
+                    stats[outcome] += 1
+                if outcome in ('done', 'failed'):
+                    lags.append((now - message.created_at).total_seconds())
+    finally:
+        if pool:
+            pool.shutdown()
+
+    elapsed = time.perf_counter() - started
+    stats.update({
+        'elapsed_seconds': round(elapsed, 3),
+        'throughput_per_second': round(stats['claimed'] / elapsed, 1) if elapsed else 0,
+        'max_lag_seconds': round(max(lags), 3) if lags else None,
+        'mean_lag_seconds': round(sum(lags) / len(lags), 3) if lags else None,
+        'finished_at': timezone.now().isoformat(),
+    })
+    if stats['claimed']:
+        cache.set(LAST_DRAIN_KEY, stats, timeout=None)
+    return stats
+
+
+def get_outbox_metrics():
+    """Return queue depth, the age of the oldest waiting message and the last drain's stats"""
+    now = timezone.now()
+    totals = OutboxMessage.objects.aggregate(
+        pending=Count('id', filter=Q(status='pending')),
+        due=Count('id', filter=Q(status='pending', next_attempt_at__lte=now)),
+        processing=Count('id', filter=Q(status='processing')),
+        failed=Count('id', filter=Q(status='failed')),
+        oldest_pending=Min('created_at', filter=Q(status__in=['pending', 'processing'])),
+    )
+    oldest = totals.pop('oldest_pending')
+    totals['oldest_pending_age_seconds'] = round((now - oldest).total_seconds(), 3) if oldest else None
+    totals['last_drain'] = cache.get(LAST_DRAIN_KEY)
+    return totals
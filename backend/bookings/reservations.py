@@ -0,0 +1,217 @@
+"""
+Concurrency-safe booking writes.
+
+Every reservation runs in a transaction that first bumps the BookingLock row
+for its (admin, date). On PostgreSQL and MySQL the UPDATE holds a row lock
+until commit; SQLite has no row locks, but the UPDATE takes the database
+write lock, which serializes writers just the same. Writing before reading
+also avoids SQLite's deadlock when two readers try to upgrade at once.
+The overlap test then runs as one indexed range query while the lock is held.
+"""
+import time
+from collections import defaultdict
+
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, OperationalError, connection, transaction
+from django.db.models import F
+
+from .counters import bookings_counted
+from .models import Booking, BookingLock
+
+
+# SQLite reports lock contention as an error instead of waiting when the
+# busy timeout is exceeded or with shared-cache databases; retry those
+LOCK_RETRIES = 10
+LOCK_RETRY_DELAY = 0.01
+
+
+class SlotUnavailable(Exception):
+    """Raised when a reservation overlaps an active booking"""
+
+
+def lock_admin_day(admin_id, date):
+    """
+    Take the (admin, date) booking lock for the current transaction
+
+    Must be called inside transaction.atomic().
+    """
+    locked = BookingLock.objects.filter(admin_id=admin_id, date=date).update(
+        generation=F('generation') + 1
+    )
+    if locked:
+        return
+
+    try:
+        with transaction.atomic():
+            BookingLock.objects.create(admin_id=admin_id, date=date, generation=1)
+    except IntegrityError:
+        # Another transaction created the row first; wait for its lock
+        BookingLock.objects.filter(admin_id=admin_id, date=date).update(
+            generation=F('generation') + 1
+        )
+
+
+def _is_lock_error(error):
+    return connection.vendor == 'sqlite' and 'locked' in str(error)
+
+
+def run_with_lock_retries(operation):
+    """Run operation() in a transaction, retrying SQLite lock contention"""
+    # Retrying only makes sense when this call owns the whole transaction
+    retries = 0 if connection.in_atomic_block else LOCK_RETRIES
+
+    for attempt in range(retries + 1):
+        try:
+            with transaction.atomic():
+                return operation()
+        except OperationalError as error:
+            if attempt == retries or not _is_lock_error(error):
+                raise
+            time.sleep(LOCK_RETRY_DELAY * (attempt + 1))
+
+
+def reserve_booking(booking, after_save=None):
+    """
+    Save a new or rescheduled booking if its interval is still free
+
+    Args:
+        booking: Unsaved Booking, or a saved one with updated fields
+        after_save: Optional callable run with the booking inside the same
+            transaction, e.g. to write its outbox message
+
+    Returns:
+        The saved booking
+
+    Raises:
+        ValidationError: A field or model check failed
+        SlotUnavailable: The interval overlaps an active booking
+    """
+    _validate_booking(booking)
+
+    def operation():
+        lock_admin_day(booking.admin_id, booking.date)
+
+        # The only overlap query: Booking.save skips full_clean below
+        if booking.status != 'cancelled':
+            overlapping = Booking.objects.active_overlapping(
+                booking.admin_id, booking.date, booking.start_time, booking.end_time
+            ).exclude(pk=booking.pk).only('start_time', 'end_time').first()
+            if overlapping:
+                raise SlotUnavailable(
+                    f'This slot overlaps with an existing booking from '
+                    f'{overlapping.start_time} to {overlapping.end_time}'
+                )
+
+        booking.save(clean=False)
+        if after_save:
+            after_save(booking)
+        return booking
+
+    return run_with_lock_retries(operation)
+
+
+def _validate_booking(booking):
+    """
+    Field and model checks of Booking.full_clean, minus the overlap query
+
+    The overlap (and unique constraint) check is left to the range query
+    run under the admin day's lock.
+
+    User and admin are not re-fetched; callers pass resolved instances.
+    """
+    booking.clean_fields(exclude=['user', 'admin'])
+    if booking.start_time >= booking.end_time:
+        raise ValidationError('End time must be after start time')
+    if booking.user_id == booking.admin_id:
+        raise ValidationError('Cannot book a meeting with yourself')
+
+
+def reserve_bookings(bookings, partial=False, check=None, after_create=None):
+    """
+    Insert many new bookings, checking them against each other and the table
+
+    Each affected (admin, date) is locked as in reserve_booking, then checked
+    with a single range query; items are then accepted in order, so of two
+    overlapping items the first wins. Accepted bookings are inserted with
+    bulk_create in the same transaction.
+
+    Args:
+        bookings: Unsaved Booking instances
+        partial: Insert the valid items even if others are rejected;
+            otherwise nothing is inserted unless every item is valid
+        check: Optional callable run once with the candidate bookings
+            while their days are locked; returns a list aligned with them
+            holding an error message for each booking to reject, else None
+        after_create: Optional callable run with the created bookings inside
+            the same transaction
+
+    Returns:
+        List aligned with `bookings` holding None for created items and a
+        list of error messages for rejected ones
+    """
+    errors = [None] * len(bookings)
+    for index, booking in enumerate(bookings):
+        try:
+            _validate_booking(booking)
+        except ValidationError as e:
+            errors[index] = e.messages
+
+    if not partial and any(errors):
+        return errors
+
+    def operation():
+        # Fresh copy per attempt, so a retried transaction starts clean
+        results = list(errors)
+        candidates = [
+            (index, booking) for index, booking in enumerate(bookings)
+            if errors[index] is None
+        ]
+        by_day = defaultdict(list)
+        for index, booking in candidates:
+            by_day[(booking.admin_id, booking.date)].append(booking)
+
+        # A fixed lock order keeps two batches from deadlocking
+        taken = {}
+        for (admin_id, date), day_bookings in sorted(by_day.items()):
+            lock_admin_day(admin_id, date)
+            taken[(admin_id, date)] = list(Booking.objects.active_overlapping(
+                admin_id, date,
+                min(booking.start_time for booking in day_bookings),
+                max(booking.end_time for booking in day_bookings)
+            ).values_list('start_time', 'end_time'))
+
+        if check:
+            rejected = check([booking for _, booking in candidates])
+            for (index, _), error in zip(candidates, rejected):
+                if error:
+                    results[index] = [error]
+            candidates = [(index, booking) for index, booking in candidates if results[index] is None]
+
+        accepted = []
+        for index, booking in candidates:
+            day = taken[(booking.admin_id, booking.date)]
+            conflict = next((
+                (start, end) for start, end in day
+                if booking.start_time < end and booking.end_time > start
+            ), None)
+            if conflict:
+                results[index] = [
+                    f'This slot overlaps with a booking from {conflict[0]} to {conflict[1]}'
+                ]
+            else:
+                day.append((booking.start_time, booking.end_time))
+                accepted.append(booking)
+
+        if not accepted or (not partial and len(accepted) < len(candidates)):
+            return results
+
+        created = Booking.objects.bulk_create(accepted, batch_size=500)
+
+        from availability.changes import bookings_changed
+        bookings_changed({(booking.admin_id, booking.date) for booking in created})
+        bookings_counted([(None, booking.counter_key()) for booking in created])
+        if after_create:
+            after_create(created)
+        return results
+
+    return run_with_lock_retries(operation)
@@ -0,0 +1,174 @@
+"""
+Fast read path for booking lists.
+
+BookingSerializer builds a model instance per row, then two User instances
+for user_details and admin_details, and walks every field through DRF's
+get_attribute/to_representation machinery. For the list and dashboards
+that dominates the response time once pages grow.
+
+RowPlan compiles a read serializer once into a flat plan of
+(key, column, converter) entries, reads the rows with .values() (the nested
+users come from joined columns), and renders each row by walking the plan.
+Converters are the serializer's own fields' to_representation, skipped for
+fields where it returns database values unchanged and inlined for ISO 8601
+dates, times and datetimes, so the output is the same as the serializer's,
+key order included.
+"""
+from functools import cached_property
+from operator import methodcaller
+
+from django.core.exceptions import ImproperlyConfigured
+from django.utils import timezone
+from rest_framework import ISO_8601, serializers
+from rest_framework.relations import PrimaryKeyRelatedField
+from rest_framework.settings import api_settings
+
+from .serializers import BookingSerializer
+
+
+# Fields whose to_representation returns the database value unchanged
+PASSTHROUGH_FIELDS = (
+    serializers.CharField, serializers.ChoiceField, serializers.IntegerField,
+    serializers.BooleanField, serializers.ReadOnlyField, PrimaryKeyRelatedField,
+)
+
+_isoformat = methodcaller('isoformat')
+
+
+def _output_format(field, default):
+    output_format = getattr(field, 'format', default)
+    return output_format.lower() if output_format else output_format
+
+
+class _DateTimeConverter:
+    """
+    DateTimeField.to_representation with the timezone looked up once per render
+
+    Looking up the current timezone is most of DateTimeField's cost, and it
+    cannot change while one response renders.
+    """
+
+    def __init__(self, field):
+        self.field = field
+
+    def bind(self):
+        field = self.field
+        field_timezone = field.timezone if hasattr(field, 'timezone') else field.default_timezone()
+        if field_timezone is None:
+            return field.to_representation
+
+        def convert(value):
+            if isinstance(value, str) or timezone.is_naive(value):
+                return field.to_representation(value)
+            value = value.astimezone(field_timezone).isoformat()
+            return value[:-6] + 'Z' if value.endswith('+00:00') else value
+        return convert
+
+
+def _converter(name, field):
+    """
+    Return the converter for a field's values, None if they pass through
+
+    Raises:
+        ImproperlyConfigured: If the field needs a model instance
+    """
+    if isinstance(field, PASSTHROUGH_FIELDS) and not getattr(field, 'pk_field', None):
+        return None
+    if isinstance(field, (serializers.RelatedField, serializers.SerializerMethodField)) or field.source == '*':
+        raise ImproperlyConfigured(f'{name}: {type(field).__name__} needs model instances')
+    if isinstance(field, serializers.DateField):
+        if _output_format(field, api_settings.DATE_FORMAT) == ISO_8601:
+            return _isoformat
+    elif isinstance(field, serializers.TimeField):
+        if _output_format(field, api_settings.TIME_FORMAT) == ISO_8601:
+            return _isoformat
+    elif isinstance(field, serializers.DateTimeField):
+        if _output_format(field, api_settings.DATETIME_FORMAT) == ISO_8601:
+            return _DateTimeConverter(field)
+    return field.to_representation
+
+
+def _compile(serializer, prefix=''):
+    """
+    Turn a serializer's readable fields into plan entries
+
+    Returns:
+        List of (key, column, converter, nested) tuples; converter is None
+        for passthrough fields and may need binding per render (see _bind),
+        nested is the plan of a nested serializer
+    """
+    plan = []
+    for name, field in serializer.fields.items():
+        if field.write_only:
+            continue
+        column = prefix + field.source.replace('.', '__')
+        if isinstance(field, serializers.ListSerializer):
+            raise ImproperlyConfigured(f'{name}: many=True fields cannot be read from rows')
+        if isinstance(field, serializers.BaseSerializer):
+            plan.append((name, None, None, _compile(field, column + '__')))
+        else:
+            plan.append((name, column, _converter(name, field), None))
+    return plan
+
+
+def _bind(plan):
+    """Resolve converters that depend on per-request state, such as the timezone"""
+    return [
+        (
+            key, column,
+            convert.bind() if isinstance(convert, _DateTimeConverter) else convert,
+            None if nested is None else _bind(nested)
+        )
+        for key, column, convert, nested in plan
+    ]
+
+
+def _columns(plan):
+    for _, column, _, nested in plan:
+        if nested is None:
+            yield column
+        else:
+            yield from _columns(nested)
+
+
+def _render(plan, row):
+    data = {}
+    for key, column, convert, nested in plan:
+        if nested is not None:
+            data[key] = _render(nested, row)
+            continue
+        value = row[column]
+        data[key] = value if convert is None or value is None else convert(value)
+    return data
+
+
+class RowPlan:
+    """
+    Read serializer compiled for rendering .values() rows
+
+    Supports plain model fields, primary key relations and nested (not
+    many) serializers of them, which is all BookingSerializer uses.
+    """
+
+    def __init__(self, serializer_class):
+        self.serializer_class = serializer_class
+
+    @cached_property
+    def plan(self):
+        return _compile(self.serializer_class())
+
+    @cached_property
+    def columns(self):
+        return list(_columns(self.plan))
+
+    def values(self, queryset):
+        """Read a queryset as rows holding every column the plan needs"""
+        return queryset.values(*self.columns)
+
+    def render(self, rows):
+        """Render rows as the serializer would render their instances"""
+        plan = _bind(self.plan)
+        return [_render(plan, row) for row in rows]
+
+
+booking_rows = RowPlan(BookingSerializer)
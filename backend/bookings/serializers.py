@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from .models import Booking
+from .models import ArchivedBooking, Booking
 from users.serializers import UserSerializer
 from datetime import datetime
 
@@ -14,11 +14,11 @@ class BookingSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'user', 'user_details', 'admin', 'admin_details',
             'date', 'start_time', 'end_time', 'timezone', 'meeting_purpose',
-            'meeting_link', 'calendar_event_id', 'status', 'notes',
+            'meeting_link', 'calendar_event_id', 'calendar_status', 'status', 'notes',
             'created_at', 'updated_at'
         ]
         read_only_fields = [
-            'id', 'meeting_link', 'calendar_event_id',
+            'id', 'meeting_link', 'calendar_event_id', 'calendar_status',
             'created_at', 'updated_at'
         ]
     
@@ -51,6 +51,17 @@ class BookingSerializer(serializers.ModelSerializer):
         return attrs
 
 
+class BookingHistorySerializer(BookingSerializer):
+    """Serializer for live and archived bookings in one history list"""
+    archived = serializers.SerializerMethodField()
+    
+    class Meta(BookingSerializer.Meta):
+        fields = BookingSerializer.Meta.fields + ['archived']
+    
+    def get_archived(self, obj):
+        return isinstance(obj, ArchivedBooking)
+
+
 class BookingCreateSerializer(serializers.ModelSerializer):
     """Serializer for creating bookings"""
     
@@ -73,3 +84,40 @@ class BookingUpdateSerializer(serializers.ModelSerializer):
 class CancelBookingSerializer(serializers.Serializer):
     """Serializer for cancelling bookings"""
     reason = serializers.CharField(required=False, allow_blank=True)
+
+
+class BulkBookingItemSerializer(serializers.Serializer):
+    """
+    One booking in a bulk request
+    
+    Users and admins are plain IDs, resolved for the whole batch in one
+    query by the view.
+    """
+    user = serializers.IntegerField(required=False)
+    admin = serializers.IntegerField()
+    date = serializers.DateField()
+    start_time = serializers.TimeField()
+    end_time = serializers.TimeField()
+    timezone = serializers.CharField(max_length=50, required=False, default='UTC')
+    meeting_purpose = serializers.CharField()
+    notes = serializers.CharField(required=False, allow_blank=True, default='')
+
+
+class BulkBookingSerializer(serializers.Serializer):
+    """
+    Serializer for bulk booking creation
+    
+    Items are validated one by one by the view, so that with partial=true
+    an invalid item only rejects itself.
+    """
+    MAX_BOOKINGS = 500
+    
+    bookings = serializers.ListField(
+        child=serializers.DictField(),
+        allow_empty=False,
+        max_length=MAX_BOOKINGS
+    )
+    partial = serializers.BooleanField(
+        default=False,
+        help_text='Create the valid items even if others are rejected'
+    )
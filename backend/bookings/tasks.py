@@ -0,0 +1,47 @@
+import logging
+
+from celery import shared_task
+
+from . import outbox
+
+logger = logging.getLogger(__name__)
+
+# Seconds a request waits for the broker when queueing a drain
+PUBLISH_CONNECT_TIMEOUT = 1
+
+
+@shared_task
+def drain_outbox(batch_size=outbox.DEFAULT_BATCH_SIZE, workers=4):
+    """
+    Dispatch due booking side effects (calendar events and emails)
+    
+    Args:
+        batch_size: Messages claimed per round trip
+        workers: Dispatch threads
+    """
+    stats = outbox.drain(batch_size=batch_size, workers=workers)
+    if stats['claimed']:
+        logger.info(
+            f"Outbox drained {stats['claimed']} messages "
+            f"({stats['done']} done, {stats['retry']} retrying, {stats['failed']} failed)"
+        )
+    return stats
+
+
+def enqueue_outbox_drain():
+    """
+    Queue drain_outbox without failing or stalling the request if the broker is down
+
+    Publishes once over its own connection with a short connect timeout and
+    no reconnect retries, and stores no result: the default publish would
+    keep reconnecting to the broker and the result backend for about 20
+    seconds per on_commit callback while Redis is unreachable.
+    """
+    try:
+        with drain_outbox.app.connection_for_write(
+            connect_timeout=PUBLISH_CONNECT_TIMEOUT, transport_options={'max_retries': 0}
+        ) as connection:
+            drain_outbox.apply_async(ignore_result=True, retry=False, connection=connection)
+    except Exception as e:
+        # The messages stay in the outbox for the next drain
+        logger.error(f"Could not queue outbox drain: {str(e)}")
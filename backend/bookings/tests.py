@@ -1,3 +1,1209 @@
-from django.test import TestCase
+import csv
+import io
+import json
+import logging
+import threading
+import time as clock
+from datetime import date, time, timedelta
 
-# Create your tests here.
+from django.core import mail
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured, ValidationError
+from django.db import connection, connections
+from django.db.models import Q
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient, APIRequestFactory
+
+from availability.materialized import find_slot_drift
+from availability.models import Availability, AvailabilitySlot
+from calendar_scheduler.integrations.email_service import RECIPIENTS, EmailService
+from calendar_scheduler.testing import QueryPlanMixin
+from users.models import User
+from . import outbox
+from .archive import archive_batch, archive_bookings
+from .counters import find_counter_drift, get_counts, reconcile_counters
+from .export import iter_ndjson
+from .feeds import fold
+from . import idempotency
+from .models import ArchivedBooking, Booking, BookingCounter, IdempotencyKey, OutboxMessage
+from .reservations import SlotUnavailable, reserve_booking
+from .rows import RowPlan, booking_rows
+from .serializers import BookingHistorySerializer, BookingSerializer
+from .tasks import PUBLISH_CONNECT_TIMEOUT, drain_outbox, enqueue_outbox_drain
+from .views import BookingListCreateView
+
+logger = logging.getLogger(__name__)
+
+
+class ReservationStressTests(TransactionTestCase):
+    """Concurrent reservations for one admin and day never double book"""
+
+    THREADS = 8
+    ATTEMPTS_PER_THREAD = 12
+
+    def setUp(self):
+        self.admin = User.objects.create_user('admin', 'admin@example.com', 'pass', role='admin')
+        self.users = [
+            User.objects.create_user(f'user{i}', f'user{i}@example.com', 'pass')
+            for i in range(self.THREADS)
+        ]
+        self.day = date.today() + timedelta(days=7)
+
+    def _worker(self, user, offsets, outcomes, barrier):
+        try:
+            barrier.wait()
+            for offset in offsets:
+                # Start times differ between threads, so the unique constraint
+                # on (admin, date, start_time) cannot catch the overlaps
+                start_minute = 9 * 60 + offset
+                booking = Booking(
+                    user=user,
+                    admin=self.admin,
+                    date=self.day,
+                    start_time=time(start_minute // 60, start_minute % 60),
+                    end_time=time((start_minute + 30) // 60, (start_minute + 30) % 60),
+                    meeting_purpose='Stress test'
+                )
+                try:
+                    reserve_booking(booking)
+                    outcomes.append('reserved')
+                except SlotUnavailable:
+                    outcomes.append('rejected')
+        finally:
+            connections.close_all()
+
+    def test_no_double_bookings_under_contention(self):
+        if connection.vendor == 'sqlite' and connection.settings_dict['NAME'] == ':memory:':
+            self.skipTest('Threads cannot share a private in-memory SQLite database')
+
+        outcomes = []
+        barrier = threading.Barrier(self.THREADS)
+        threads = [
+            threading.Thread(
+                target=self._worker,
+                args=(
+                    user,
+                    [(index * 7 + attempt * 11) % 180 for attempt in range(self.ATTEMPTS_PER_THREAD)],
+                    outcomes,
+                    barrier
+                )
+            )
+            for index, user in enumerate(self.users)
+        ]
+
+        started = clock.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = clock.perf_counter() - started
+
+        self.assertEqual(len(outcomes), self.THREADS * self.ATTEMPTS_PER_THREAD)
+        logger.info(
+            'Reservation stress: %d attempts in %.2fs (%.0f/s), %d reserved',
+            len(outcomes), elapsed, len(outcomes) / elapsed, outcomes.count('reserved')
+        )
+
+        active = list(Booking.objects.filter(
+            admin=self.admin,
+            date=self.day,
+            status__in=['confirmed', 'pending']
+        ).order_by('start_time'))
+        self.assertEqual(len(active), outcomes.count('reserved'))
+        self.assertGreater(len(active), 0)
+        for previous, current in zip(active, active[1:]):
+            self.assertLessEqual(
+                previous.end_time, current.start_time,
+                f'Double booking: {previous.start_time}-{previous.end_time} '
+                f'overlaps {current.start_time}-{current.end_time}'
+            )
+
+
+class ReservationQueryTests(TestCase):
+    """A reservation checks for overlaps with one range query under the lock"""
+
+    def setUp(self):
+        self.admin = User.objects.create_user('admin', 'admin@example.com', 'pass', role='admin')
+        self.user = User.objects.create_user('user', 'user@example.com', 'pass')
+        self.day = date.today() + timedelta(days=7)
+
+    def _booking(self, start, end):
+        return Booking(
+            user=self.user, admin=self.admin, date=self.day,
+            start_time=start, end_time=end, meeting_purpose='Sync'
+        )
+
+    def _overlap_queries(self, booking):
+        with CaptureQueriesContext(connection) as queries:
+            reserve_booking(booking)
+        return [
+            query['sql'] for query in queries
+            if query['sql'].startswith('SELECT') and 'FROM "bookings"' in query['sql']
+        ]
+
+    def test_create_and_reschedule_read_bookings_once(self):
+        booking = self._booking(time(9), time(9, 30))
+        self.assertEqual(len(self._overlap_queries(booking)), 1)
+
+        booking.start_time, booking.end_time = time(9, 15), time(9, 45)
+        self.assertEqual(len(self._overlap_queries(booking)), 1)
+        self.assertEqual(Booking.objects.get().start_time, time(9, 15))
+
+    def test_model_checks_still_apply(self):
+        reserve_booking(self._booking(time(9), time(9, 30)))
+        with self.assertRaises(SlotUnavailable):
+            reserve_booking(self._booking(time(9), time(9, 30)))
+        with self.assertRaises(ValidationError):
+            reserve_booking(self._booking(time(10), time(9, 30)))
+        with self.assertRaises(ValidationError):
+            reserve_booking(Booking(
+                user=self.admin, admin=self.admin, date=self.day,
+                start_time=time(11), end_time=time(11, 30), meeting_purpose='Sync'
+            ))
+        self.assertEqual(Booking.objects.count(), 1)
+
+
+class FakeCalendarService:
+    """Stands in for GoogleCalendarService, recording the events it creates"""
+
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.created = []
+
+    def create_event(self, user, booking):
+        if self.fail:
+            return None
+        self.created.append(booking.id)
+        return {'event_id': f'event-{booking.id}', 'meet_link': f'https://meet.example.com/{booking.id}'}
+
+
+class FlakyEmailService(EmailService):
+    """EmailService whose first admin email fails"""
+
+    def __init__(self):
+        self.failed = False
+
+    def send_booking_cancellation_email(self, booking, fail_silently=True, recipients=RECIPIENTS):
+        if 'admin' in recipients and not self.failed:
+            self.failed = True
+            raise ConnectionError('SMTP unavailable')
+        EmailService.send_booking_cancellation_email(booking, fail_silently, recipients)
+
+
+@override_settings(EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend')
+class OutboxTests(TestCase):
+    """Booking side effects are written with the booking and drained with retries"""
+
+    def setUp(self):
+        self.admin = User.objects.create_user(
+            'admin', 'admin@example.com', 'pass', role='admin',
+            google_calendar_token={'token': 'test'}
+        )
+        self.user = User.objects.create_user('user', 'user@example.com', 'pass')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.day = date.today() + timedelta(days=3)
+
+    def _create_booking(self, start=time(9), end=time(9, 30)):
+        return self.client.post('/api/bookings/', {
+            'admin': self.admin.id,
+            'date': self.day.isoformat(),
+            'start_time': start.isoformat(),
+            'end_time': end.isoformat(),
+            'meeting_purpose': 'Sync'
+        }, format='json')
+
+    def test_create_writes_outbox_message_and_drain_dispatches_it(self):
+        response = self._create_booking()
+        self.assertEqual(response.status_code, 201)
+        message = OutboxMessage.objects.get()
+        self.assertEqual((message.kind, message.status), ('booking_created', 'pending'))
+
+        calendar = FakeCalendarService()
+        stats = outbox.drain(workers=1, calendar_service=calendar)
+
+        self.assertEqual((stats['claimed'], stats['done']), (1, 1))
+        booking = Booking.objects.get()
+        self.assertEqual(booking.calendar_status, 'created')
+        self.assertEqual(calendar.created, [booking.id])
+        self.assertEqual(len(mail.outbox), 2)
+        self.assertIn(booking.meeting_link, mail.outbox[0].body)
+        self.assertEqual(OutboxMessage.objects.get().status, 'done')
+
+        # Nothing is dispatched twice
+        self.assertEqual(outbox.drain(workers=1, calendar_service=calendar)['claimed'], 0)
+
+    def test_bookings_cancelled_before_the_drain_get_no_confirmation(self):
+        booking_id = self._create_booking().json()['id']
+        self.client.post(f'/api/bookings/{booking_id}/cancel/', {}, format='json')
+
+        calendar = FakeCalendarService()
+        self.assertEqual(outbox.drain(workers=1, calendar_service=calendar)['done'], 2)
+        self.assertEqual(calendar.created, [])
+        self.assertEqual(Booking.objects.get().calendar_status, 'skipped')
+        self.assertEqual(
+            [message.subject.split(':')[0] for message in mail.outbox],
+            ['Booking Cancelled', 'Booking Cancelled']
+        )
+
+    def test_rejected_booking_writes_no_message(self):
+        self._create_booking()
+        response = self._create_booking(time(9, 15), time(9, 45))
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(OutboxMessage.objects.count(), 1)
+
+    def test_failures_back_off_then_give_up(self):
+        self._create_booking()
+        calendar = FakeCalendarService(fail=True)
+
+        stats = outbox.drain(workers=1, calendar_service=calendar)
+        message = OutboxMessage.objects.get()
+        self.assertEqual(stats['retry'], 1)
+        self.assertEqual((message.status, message.attempts), ('pending', 1))
+        self.assertGreater(message.next_attempt_at, timezone.now())
+        self.assertEqual(len(mail.outbox), 0)
+
+        # Not due yet
+        self.assertEqual(outbox.drain(workers=1, calendar_service=calendar)['claimed'], 0)
+
+        # The last attempt confirms the booking without a calendar event
+        OutboxMessage.objects.update(attempts=outbox.MAX_ATTEMPTS - 1, next_attempt_at=timezone.now())
+        stats = outbox.drain(workers=1, calendar_service=calendar)
+        self.assertEqual(stats['done'], 1)
+        self.assertEqual(Booking.objects.get().calendar_status, 'failed')
+        self.assertEqual(len(mail.outbox), 2)
+
+    def test_cancel_and_reschedule_enqueue_messages(self):
+        booking_id = self._create_booking().json()['id']
+        outbox.drain(workers=1, calendar_service=FakeCalendarService())
+        mail.outbox.clear()
+
+        response = self.client.post(f'/api/bookings/{booking_id}/reschedule/', {
+            'start_time': '10:00', 'end_time': '10:30'
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+        response = self.client.post(f'/api/bookings/{booking_id}/cancel/', {}, format='json')
+        self.assertEqual(response.status_code, 200)
+
+        stats = outbox.drain(workers=1, calendar_service=FakeCalendarService())
+        self.assertEqual(stats['done'], 2)
+        self.assertEqual(len(mail.outbox), 4)
+        self.assertIn('09:00 AM', mail.outbox[0].body)
+
+        metrics = outbox.get_outbox_metrics()
+        self.assertEqual((metrics['pending'], metrics['failed']), (0, 0))
+        self.assertEqual(metrics['last_drain']['done'], 2)
+
+    def test_retry_only_emails_recipients_not_reached(self):
+        booking_id = self._create_booking().json()['id']
+        outbox.drain(workers=1, calendar_service=FakeCalendarService())
+        self.client.post(f'/api/bookings/{booking_id}/cancel/', {}, format='json')
+        mail.outbox.clear()
+
+        email = FlakyEmailService()
+        self.assertEqual(outbox.drain(workers=1, email_service=email)['retry'], 1)
+        self.assertEqual([message.to for message in mail.outbox], [['user@example.com']])
+
+        OutboxMessage.objects.update(next_attempt_at=timezone.now())
+        self.assertEqual(outbox.drain(workers=1, email_service=email)['done'], 1)
+        self.assertEqual(
+            [message.to for message in mail.outbox], [['user@example.com'], ['admin@example.com']]
+        )
+
+
+@override_settings(EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend')
+class CeleryDispatchTests(TestCase):
+    """Booking writes answer at once and leave side effects to a Celery worker"""
+
+    def setUp(self):
+        self.admin = User.objects.create_user(
+            'admin', 'admin@example.com', 'pass', role='admin',
+            google_calendar_token={'token': 'test'}
+        )
+        self.other_admin = User.objects.create_user('other', 'other@example.com', 'pass', role='admin')
+        self.user = User.objects.create_user('user', 'user@example.com', 'pass')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.day = date.today() + timedelta(days=3)
+
+    def _create_booking(self, admin):
+        return self.client.post('/api/bookings/', {
+            'admin': admin.id,
+            'date': self.day.isoformat(),
+            'start_time': '09:00',
+            'end_time': '09:30',
+            'meeting_purpose': 'Sync'
+        }, format='json')
+
+    def test_create_queues_a_drain_after_commit(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = self._create_booking(self.admin)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['calendar_status'], 'pending')
+        self.assertEqual(response.json()['meeting_link'], '')
+        self.assertIn(enqueue_outbox_drain, callbacks)
+        self.assertEqual(len(mail.outbox), 0)
+
+        self.assertEqual(self._create_booking(self.other_admin).json()['calendar_status'], 'skipped')
+
+    def test_task_drains_the_outbox(self):
+        self._create_booking(self.other_admin)
+        stats = drain_outbox.apply(kwargs={'workers': 1}).get()
+        self.assertEqual((stats['claimed'], stats['done']), (1, 1))
+        self.assertEqual(len(mail.outbox), 2)
+        self.assertEqual(Booking.objects.get().calendar_status, 'skipped')
+
+    def test_unreachable_broker_is_logged_without_raising(self):
+        conf = drain_outbox.app.conf
+        previous = conf.broker_write_url
+        self.addCleanup(setattr, conf, 'broker_write_url', previous)
+        # Nothing listens on port 1
+        conf.broker_write_url = 'redis://127.0.0.1:1/0'
+
+        started = clock.monotonic()
+        with self.assertLogs('bookings.tasks', 'ERROR'):
+            enqueue_outbox_drain()
+        self.assertLess(clock.monotonic() - started, PUBLISH_CONNECT_TIMEOUT + 2)
+
+
+class BulkBookingTests(TestCase):
+    """Bulk booking creation checks items against each other and the table"""
+
+    def setUp(self):
+        self.admin = User.objects.create_user('admin', 'admin@example.com', 'pass', role='admin')
+        self.superadmin = User.objects.create_user('root', 'root@example.com', 'pass', role='superadmin')
+        self.users = [
+            User.objects.create_user(f'user{i}', f'user{i}@example.com', 'pass')
+            for i in range(20)
+        ]
+        self.client = APIClient()
+        self.client.force_authenticate(self.superadmin)
+        self.day = date.today() + timedelta(days=3)
+
+    def _item(self, user, start_minute, day_offset=0):
+        end_minute = start_minute + 30
+        return {
+            'user': user.id,
+            'admin': self.admin.id,
+            'date': (self.day + timedelta(days=day_offset)).isoformat(),
+            'start_time': f'{start_minute // 60:02d}:{start_minute % 60:02d}',
+            'end_time': f'{end_minute // 60:02d}:{end_minute % 60:02d}',
+            'meeting_purpose': 'Workshop'
+        }
+
+    def _post(self, items, partial=False):
+        return self.client.post(
+            '/api/bookings/bulk/', {'bookings': items, 'partial': partial}, format='json'
+        )
+
+    def test_creates_all_items_with_outbox_messages(self):
+        items = [self._item(user, 9 * 60 + 30 * (i % 10), i // 10) for i, user in enumerate(self.users)]
+        with CaptureQueriesContext(connection) as queries:
+            response = self._post(items)
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['created'], 20)
+        self.assertEqual(Booking.objects.count(), 20)
+        self.assertEqual(OutboxMessage.objects.filter(kind='booking_created').count(), 20)
+
+        # Lookups, conflict checks and counters are per day or per batch, not
+        # per item: half the items over as many days cost the same queries
+        half = [self._item(user, 9 * 60 + 60 * (i % 5), 2 + i // 5) for i, user in enumerate(self.users[:10])]
+        with CaptureQueriesContext(connection) as half_queries:
+            response = self._post(half)
+        self.assertEqual(response.json()['created'], 10)
+        self.assertEqual(len(half_queries), len(queries))
+
+    def test_conflicts_reject_the_whole_batch_by_default(self):
+        Booking.objects.create(
+            user=self.users[0], admin=self.admin, date=self.day,
+            start_time=time(9), end_time=time(9, 30), meeting_purpose='Existing'
+        )
+        items = [
+            self._item(self.users[1], 9 * 60 + 15),   # overlaps the existing booking
+            self._item(self.users[2], 10 * 60),
+            self._item(self.users[3], 10 * 60 + 15),  # overlaps the item above
+        ]
+
+        response = self._post(items)
+        self.assertEqual(response.status_code, 400)
+        statuses = [result['status'] for result in response.json()['results']]
+        self.assertEqual(statuses, ['rejected'] * 3)
+        self.assertEqual(Booking.objects.count(), 1)
+
+        response = self._post(items, partial=True)
+        self.assertEqual(response.status_code, 201)
+        statuses = [result['status'] for result in response.json()['results']]
+        self.assertEqual(statuses, ['rejected', 'created', 'rejected'])
+        self.assertEqual(Booking.objects.count(), 2)
+
+    def test_invalid_items_are_reported_per_index(self):
+        items = [
+            self._item(self.users[0], 9 * 60),
+            dict(self._item(self.users[1], 10 * 60), admin=self.users[2].id),
+            dict(self._item(self.users[1], 11 * 60), end_time='10:00'),
+        ]
+        response = self._post(items, partial=True)
+        self.assertEqual(response.status_code, 201)
+        results = response.json()['results']
+        self.assertEqual([result['status'] for result in results], ['created', 'rejected', 'rejected'])
+        self.assertIn('admin', results[1]['errors'])
+
+    def test_only_super_admins_book_for_others(self):
+        self.client.force_authenticate(self.users[0])
+        response = self._post([self._item(self.users[1], 9 * 60)])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Booking.objects.count(), 0)
+
+
+class BookingKeysetPaginationTests(TestCase):
+    """Booking list pages by cursor without gaps or repeats"""
+
+    def setUp(self):
+        self.admin = User.objects.create_user('admin', 'admin@example.com', 'pass', role='admin')
+        self.other_admin = User.objects.create_user('admin2', 'admin2@example.com', 'pass', role='admin')
+        self.superadmin = User.objects.create_user('root', 'root@example.com', 'pass', role='superadmin')
+        self.user = User.objects.create_user('user', 'user@example.com', 'pass')
+        start = date.today() + timedelta(days=1)
+        bookings = []
+        for day in range(5):
+            for hour in range(9, 14):
+                for admin in (self.admin, self.other_admin):
+                    bookings.append(Booking(
+                        user=self.user, admin=admin, date=start + timedelta(days=day),
+                        start_time=time(hour), end_time=time(hour, 30),
+                        meeting_purpose='Sync', status='cancelled' if hour == 13 else 'confirmed'
+                    ))
+        Booking.objects.bulk_create(bookings)
+        self.client = APIClient()
+        self.client.force_authenticate(self.superadmin)
+
+    def _walk(self, url):
+        ids = []
+        pages = 0
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            data = response.json()
+            self.assertNotIn('count', data)
+            ids.extend(row['id'] for row in data['results'])
+            url = data['next']
+            pages += 1
+        return ids, pages
+
+    def _expected(self, queryset):
+        return list(queryset.order_by('-date', '-start_time', 'id').values_list('id', flat=True))
+
+    def test_pages_follow_list_ordering(self):
+        ids, pages = self._walk('/api/bookings/?page_size=7')
+        self.assertEqual(ids, self._expected(Booking.objects.all()))
+        self.assertEqual(pages, 8)
+
+    def test_previous_link_returns_the_same_page(self):
+        first = self.client.get('/api/bookings/?page_size=7').json()
+        second = self.client.get(first['next']).json()
+        back = self.client.get(second['previous']).json()
+        self.assertEqual(
+            [row['id'] for row in back['results']],
+            [row['id'] for row in first['results']]
+        )
+        self.assertIsNone(back['previous'])
+
+    def test_filters_and_role_scoping_apply(self):
+        ids, _ = self._walk('/api/bookings/?page_size=4&status=confirmed')
+        self.assertEqual(ids, self._expected(Booking.objects.filter(status='confirmed')))
+
+        self.client.force_authenticate(self.admin)
+        ids, _ = self._walk('/api/bookings/?page_size=4')
+        self.assertEqual(ids, self._expected(Booking.objects.filter(admin=self.admin)))
+
+    def test_page_parameter_keeps_page_number_mode(self):
+        data = self.client.get('/api/bookings/?page=2').json()
+        self.assertEqual(data['count'], 50)
+        self.assertEqual(
+            [row['id'] for row in data['results']],
+            self._expected(Booking.objects.all())[20:40]
+        )
+
+    def test_invalid_cursor_is_rejected(self):
+        self.assertEqual(self.client.get('/api/bookings/?cursor=garbage').status_code, 404)
+
+
+class DashboardCounterTests(TestCase):
+    """Dashboard statistics come from counters kept in step with bookings"""
+
+    def setUp(self):
+        self.admin = User.objects.create_user('admin', 'admin@example.com', 'pass', role='admin')
+        self.user = User.objects.create_user('user', 'user@example.com', 'pass')
+        self.client = APIClient()
+        self.today = date.today()
+
+    def _book(self, day_offset, hour, status='confirmed'):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Booking.objects.create(
+                user=self.user, admin=self.admin, date=self.today + timedelta(days=day_offset),
+                start_time=time(hour), end_time=time(hour, 30), meeting_purpose='Sync', status=status
+            )
+
+    def _dashboard(self, user, url):
+        self.client.force_authenticate(user)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response.json(), len(queries)
+
+    def test_writes_keep_counters_in_sync(self):
+        self.client.force_authenticate(self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            booking_id = self.client.post('/api/bookings/', {
+                'admin': self.admin.id, 'date': (self.today + timedelta(days=2)).isoformat(),
+                'start_time': '09:00', 'end_time': '09:30', 'meeting_purpose': 'Sync'
+            }, format='json').json()['id']
+            self.client.post(
+                f'/api/bookings/{booking_id}/reschedule/', {'start_time': '10:00', 'end_time': '10:30'}, format='json'
+            )
+        self._book(3, 9, status='pending')
+        booking = self._book(4, 9)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f'/api/bookings/{booking_id}/cancel/', {}, format='json')
+            booking.delete()
+
+        self.assertEqual(find_counter_drift(), {})
+        counter = BookingCounter.objects.get(user=self.admin, perspective='admin')
+        self.assertEqual(
+            (counter.total, counter.pending, counter.confirmed, counter.cancelled),
+            (2, 1, 0, 1)
+        )
+
+    def test_counters_are_updated_after_the_booking_commits(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            with CaptureQueriesContext(connection) as queries:
+                Booking.objects.create(
+                    user=self.user, admin=self.admin, date=self.today + timedelta(days=1),
+                    start_time=time(9), end_time=time(9, 30), meeting_purpose='Sync'
+                )
+        # The booking transaction never touches the admin-wide counter row
+        self.assertFalse(any('booking_counters' in query['sql'] for query in queries))
+        self.assertEqual(get_counts(self.admin.id, 'admin')['total'], 0)
+
+        for callback in callbacks:
+            callback()
+        self.assertEqual(get_counts(self.admin.id, 'admin')['total'], 1)
+        self.assertEqual(find_counter_drift(), {})
+
+    def test_dashboards_use_at_most_three_queries(self):
+        self._book(0, 9)
+        self._book(1, 9, status='pending')
+        self._book(-1, 9)
+        self._book(-2, 9, status='cancelled')
+        user_data, small_user = self._dashboard(self.user, '/api/bookings/dashboard/user/')
+        admin_data, small_admin = self._dashboard(self.admin, '/api/bookings/dashboard/admin/')
+
+        self.assertEqual(user_data['statistics'], {'total': 4, 'cancelled': 1, 'completed': 2})
+        self.assertEqual(admin_data['statistics'], {'total': 4, 'pending': 1, 'today': 1})
+        self.assertEqual(len(admin_data['today_bookings']), 1)
+        self.assertEqual(len(admin_data['upcoming_bookings']), 2)
+
+        for day in range(-60, 0):
+            for hour in (10, 11, 12):
+                self._book(day, hour)
+        user_data, large_user = self._dashboard(self.user, '/api/bookings/dashboard/user/')
+        _, large_admin = self._dashboard(self.admin, '/api/bookings/dashboard/admin/')
+
+        self.assertEqual(user_data['statistics']['completed'], len(user_data['past_bookings']))
+        # The counter row read for the statistics is the ETag validator too
+        self.assertLessEqual(max(small_user, small_admin), 3)
+        self.assertEqual((large_user, large_admin), (small_user, small_admin))
+
+    def test_reconcile_repairs_bypassed_writes(self):
+        self._book(1, 9)
+        Booking.objects.update(status='cancelled')
+        self.assertEqual(len(find_counter_drift()), 2)
+
+        self.assertEqual(reconcile_counters(), 2)
+        self.assertEqual(find_counter_drift(), {})
+        counter = BookingCounter.objects.get(user=self.user, perspective='user')
+        self.assertEqual((counter.confirmed, counter.cancelled), (0, 1))
+
+
+class BookingExportTests(TestCase):
+    """Exports stream every visible booking in list order"""
+
+    def setUp(self):
+        self.admin = User.objects.create_user('admin', 'admin@example.com', 'pass', role='admin')
+        self.other_admin = User.objects.create_user('admin2', 'admin2@example.com', 'pass', role='admin')
+        self.user = User.objects.create_user('user', 'user@example.com', 'pass')
+        start = date.today() + timedelta(days=1)
+        Booking.objects.bulk_create([
+            Booking(
+                user=self.user, admin=admin, date=start + timedelta(days=day),
+                start_time=time(hour), end_time=time(hour, 30), meeting_purpose='Sync, "weekly"',
+                status='cancelled' if hour == 12 else 'confirmed'
+            )
+            for day in range(3) for hour in range(9, 13) for admin in (self.admin, self.other_admin)
+        ])
+        self.client = APIClient()
+
+    def _export(self, user, **params):
+        self.client.force_authenticate(user)
+        response = self.client.get('/api/bookings/export/', params)
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content).decode()
+
+    def test_csv_is_role_scoped_and_ordered(self):
+        rows = list(csv.DictReader(io.StringIO(self._export(self.admin))))
+        expected = list(
+            Booking.objects.filter(admin=self.admin).order_by('-date', '-start_time', 'id')
+            .values_list('id', flat=True)
+        )
+        self.assertEqual([int(row['id']) for row in rows], expected)
+        self.assertEqual(rows[0]['meeting_purpose'], 'Sync, "weekly"')
+        self.assertEqual(rows[0]['user_email'], 'user@example.com')
+
+    def test_ndjson_applies_list_filters(self):
+        lines = self._export(self.user, type='ndjson', status='cancelled').splitlines()
+        rows = [json.loads(line) for line in lines]
+        self.assertEqual(len(rows), 6)
+        self.assertEqual({row['status'] for row in rows}, {'cancelled'})
+        self.assertEqual(rows[0]['start_time'], '12:00:00')
+
+    def test_rows_are_fetched_in_chunks(self):
+        chunks = list(iter_ndjson(Booking.objects.all(), chunk_size=5))
+        self.assertEqual([chunk.count('\n') for chunk in chunks], [5, 5, 5, 5, 4])
+
+    def test_rejects_unknown_type_and_bad_dates(self):
+        self.client.force_authenticate(self.user)
+        response = self.client.get('/api/bookings/export/', {'type': 'xml'})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get('/api/bookings/export/', {'start_date': 'soon'})
+        self.assertEqual(response.status_code, 400)
+
+
+class CalendarFeedTests(TestCase):
+    """Tokenized .ics feeds answer unchanged polls with 304"""
+
+    def setUp(self):
+        self.admin = User.objects.create_user(
+            'admin', 'admin@example.com', 'pass', role='admin', first_name='Ada', last_name='Admin'
+        )
+        self.user = User.objects.create_user('user', 'user@example.com', 'pass')
+        self.booking = Booking.objects.create(
+            user=self.user, admin=self.admin, date=date(2030, 1, 7),
+            start_time=time(9), end_time=time(9, 30), timezone='Europe/Paris',
+            meeting_purpose='Plan; review, "all"', status='confirmed'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.url = self.client.get('/api/bookings/feeds/').json()['user']
+        self.client.force_authenticate(None)
+
+    def _content(self, response):
+        return b''.join(response.streaming_content).decode()
+
+    def test_feed_lists_bookings_in_utc(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/calendar; charset=utf-8')
+        body = self._content(response)
+        self.assertTrue(body.startswith('BEGIN:VCALENDAR\r\n'))
+        self.assertTrue(body.endswith('END:VCALENDAR\r\n'))
+        self.assertIn(f'UID:booking-{self.booking.id}@calendar-scheduler\r\n', body)
+        self.assertIn('DTSTART:20300107T080000Z\r\n', body)
+        self.assertIn('SUMMARY:Meeting with Ada Admin\r\n', body)
+        self.assertIn('DESCRIPTION:Plan\\; review\\, "all"\r\n', body)
+
+    def test_unchanged_feed_answers_304_with_one_aggregate(self):
+        response = self.client.get(self.url)
+        etag = response['ETag']
+        self.assertFalse(etag.startswith('W/'))
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(len(queries), 2)
+
+        # Deletes don't move a change time, so If-Modified-Since is not honoured
+        self.assertFalse(response.has_header('Last-Modified'))
+        response = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE='Sat, 01 Jan 2100 00:00:00 GMT')
+        self.assertEqual(response.status_code, 200)
+
+    def test_changes_and_deletes_change_the_etag(self):
+        etag = self.client.get(self.url)['ETag']
+
+        self.booking.status = 'cancelled'
+        self.booking.save()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('STATUS:CANCELLED', self._content(response))
+        etag = response['ETag']
+
+        self.booking.delete()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('BEGIN:VEVENT', self._content(response))
+
+    def test_tokens_scope_and_rotate(self):
+        admin_feed = self.url.replace('/user.ics', '/admin.ics')
+        self.assertEqual(self.client.get(admin_feed).status_code, 404)
+
+        self.client.force_authenticate(self.user)
+        self.client.post('/api/bookings/feeds/')
+        self.client.force_authenticate(None)
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+    def test_fold_keeps_utf8_sequences_whole(self):
+        line = 'DESCRIPTION:' + 'é' * 80
+        folded = fold(line)
+        physical = folded.split('\r\n')[:-1]
+        self.assertTrue(all(len(part.encode()) <= 75 for part in physical))
+        self.assertEqual(''.join(part[1:] if index else part for index, part in enumerate(physical)), line)
+
+
+class IdempotencyKeyTests(TestCase):
+    """Retried booking writes with the same Idempotency-Key are replayed"""
+
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_user('admin', 'admin@example.com', 'pass', role='admin')
+        self.user = User.objects.create_user('user', 'user@example.com', 'pass')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.payload = {
+            'admin': self.admin.id,
+            'date': (date.today() + timedelta(days=3)).isoformat(),
+            'start_time': '09:00',
+            'end_time': '09:30',
+            'meeting_purpose': 'Sync'
+        }
+
+    def _post(self, url, data, key):
+        return self.client.post(url, data, format='json', HTTP_IDEMPOTENCY_KEY=key)
+
+    def test_retried_create_replays_without_queries(self):
+        first = self._post('/api/bookings/', self.payload, 'create-1')
+        self.assertEqual(first.status_code, 201)
+
+        with CaptureQueriesContext(connection) as queries:
+            retry = self._post('/api/bookings/', self.payload, 'create-1')
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(retry.status_code, 201)
+        self.assertEqual(retry.json(), first.json())
+        self.assertEqual(retry[idempotency.REPLAYED_HEADER], 'true')
+        self.assertEqual(Booking.objects.count(), 1)
+        self.assertEqual(OutboxMessage.objects.count(), 1)
+
+    def test_keys_are_scoped_per_user_and_request(self):
+        self._post('/api/bookings/', self.payload, 'shared')
+        response = self._post('/api/bookings/', {**self.payload, 'start_time': '10:00', 'end_time': '10:30'}, 'shared')
+        self.assertEqual(response.status_code, 422)
+
+        other = User.objects.create_user('other', 'other@example.com', 'pass')
+        self.client.force_authenticate(other)
+        response = self._post('/api/bookings/', {**self.payload, 'start_time': '11:00', 'end_time': '11:30'}, 'shared')
+        self.assertEqual(response.status_code, 201)
+
+    def test_retried_cancel_and_reschedule(self):
+        booking_id = self._post('/api/bookings/', self.payload, 'create').json()['id']
+        url = f'/api/bookings/{booking_id}/reschedule/'
+        moved = {'start_time': '10:00', 'end_time': '10:30'}
+        self.assertEqual(self._post(url, moved, 'move').status_code, 200)
+        self.assertEqual(self._post(url, moved, 'move').status_code, 200)
+
+        url = f'/api/bookings/{booking_id}/cancel/'
+        self.assertEqual(self._post(url, {}, 'cancel').status_code, 200)
+        # Without the key the second cancel would be rejected as already cancelled
+        self.assertEqual(self._post(url, {}, 'cancel').status_code, 200)
+        self.assertEqual(OutboxMessage.objects.filter(booking_id=booking_id).count(), 3)
+
+    def test_validation_errors_are_stored_and_replayed(self):
+        invalid = {**self.payload, 'end_time': '08:00'}
+        first = self._post('/api/bookings/', invalid, 'invalid')
+        self.assertEqual(first.status_code, 400)
+        # Freeing the slot would not make the retry run the view again
+        retry = self._post('/api/bookings/', invalid, 'invalid')
+        self.assertEqual(retry.status_code, 400)
+        self.assertEqual(retry.json(), first.json())
+        self.assertEqual(retry[idempotency.REPLAYED_HEADER], 'true')
+
+    def test_expired_keys_run_again_and_are_purged(self):
+        self._post('/api/bookings/', {**self.payload, 'end_time': '08:00'}, 'expiring')
+        IdempotencyKey.objects.update(expires_at=timezone.now())
+        response = self._post('/api/bookings/', {**self.payload, 'end_time': '08:00'}, 'expiring')
+        self.assertFalse(response.has_header(idempotency.REPLAYED_HEADER))
+
+        IdempotencyKey.objects.update(expires_at=timezone.now())
+        self.assertEqual(idempotency.purge_expired_keys(), 1)
+
+    def test_duplicate_waits_for_the_first_request(self):
+        request = APIRequestFactory().post('/api/bookings/', self.payload, format='json')
+        claim = idempotency._claim(self.user.pk, 'slow', idempotency._fingerprint(request))
+
+        class FinishingClock:
+            """Stands in for the time module; the first request finishes while the duplicate sleeps"""
+            monotonic = staticmethod(clock.monotonic)
+
+            @staticmethod
+            def sleep(seconds):
+                IdempotencyKey.objects.filter(pk=claim.pk).update(status_code=201, response={'id': 99})
+
+        self.addCleanup(setattr, idempotency, 'time', clock)
+        idempotency.time = FinishingClock
+        response = self._post('/api/bookings/', self.payload, 'slow')
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json(), {'id': 99})
+        self.assertFalse(Booking.objects.exists())
+
+
+class BookingArchiveTests(TestCase):
+    """Old and cancelled bookings move to the archive and stay readable"""
+
+    def setUp(self):
+        self.admin = User.objects.create_user('admin', 'admin@example.com', 'pass', role='admin')
+        self.user = User.objects.create_user('user', 'user@example.com', 'pass')
+        self.today = date.today()
+        self.old = self._book(-400, 9)
+        self.recent = self._book(-10, 9)
+        self.upcoming = self._book(5, 9)
+        self.cancelled = self._book(3, 10, status='cancelled')
+        Booking.objects.filter(id=self.cancelled.id).update(
+            updated_at=timezone.now() - timedelta(days=120)
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _book(self, day_offset, hour, status='confirmed'):
+        return Booking.objects.bulk_create([Booking(
+            user=self.user, admin=self.admin, date=self.today + timedelta(days=day_offset),
+            start_time=time(hour), end_time=time(hour, 30), meeting_purpose='Sync', status=status
+        )])[0]
+
+    def test_moves_old_and_stale_cancelled_bookings(self):
+        self.assertEqual(archive_bookings(batch_size=1), 2)
+
+        self.assertEqual(
+            set(ArchivedBooking.objects.values_list('id', flat=True)),
+            {self.old.id, self.cancelled.id}
+        )
+        self.assertEqual(
+            set(Booking.objects.values_list('id', flat=True)),
+            {self.recent.id, self.upcoming.id}
+        )
+        archived = ArchivedBooking.objects.get(id=self.old.id)
+        self.assertEqual((archived.date, archived.created_at), (self.old.date, self.old.created_at))
+        self.assertEqual(archive_bookings(), 0)
+
+    def test_waits_for_pending_outbox_messages(self):
+        message = outbox.enqueue('booking_cancelled', self.cancelled)
+        self.assertEqual(archive_bookings(), 1)
+        self.assertTrue(Booking.objects.filter(id=self.cancelled.id).exists())
+
+        OutboxMessage.objects.filter(id=message.id).update(status='done')
+        self.assertEqual(archive_bookings(), 1)
+        self.assertFalse(OutboxMessage.objects.exists())
+
+    def test_counters_do_not_drift(self):
+        reconcile_counters()
+        archive_bookings()
+        self.assertEqual(find_counter_drift(), {})
+
+    def test_batches_recheck_the_locked_rows(self):
+        # Changed after the ids were selected, before their batch ran
+        outbox.enqueue('booking_cancelled', self.cancelled)
+        Booking.objects.filter(id=self.old.id).update(date=self.today + timedelta(days=1))
+        self.assertEqual(archive_batch([self.old.id, self.cancelled.id]), 0)
+        self.assertEqual(OutboxMessage.objects.count(), 1)
+        self.assertFalse(ArchivedBooking.objects.exists())
+
+    def test_slots_of_archived_bookings_are_refreshed(self):
+        Availability.objects.create(
+            admin=self.admin, date=self.old.date, start_time=time(9), end_time=time(10), slot_duration=30
+        )
+        self.assertFalse(AvailabilitySlot.objects.get(start_time=time(9)).is_free)
+        archive_bookings()
+        self.assertEqual(find_slot_drift(), (set(), set()))
+
+    def test_history_pages_across_both_tables(self):
+        archive_bookings()
+        ids = []
+        archived = {}
+        url = '/api/bookings/history/?page_size=1'
+        while url:
+            data = self.client.get(url).json()
+            ids.extend(row['id'] for row in data['results'])
+            archived.update((row['id'], row['archived']) for row in data['results'])
+            url = data['next']
+
+        self.assertEqual(ids, [self.upcoming.id, self.cancelled.id, self.recent.id, self.old.id])
+        self.assertEqual(
+            [booking_id for booking_id, flag in archived.items() if flag],
+            [self.cancelled.id, self.old.id]
+        )
+        data = self.client.get('/api/bookings/history/', {'status': 'cancelled'}).json()
+        self.assertEqual([row['id'] for row in data['results']], [self.cancelled.id])
+
+    def test_export_includes_archived_on_request(self):
+        archive_bookings()
+        response = self.client.get('/api/bookings/export/', {'type': 'ndjson'})
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        self.assertEqual([row['id'] for row in rows], [self.upcoming.id, self.recent.id])
+
+        response = self.client.get('/api/bookings/export/', {'type': 'ndjson', 'include_archived': 'true'})
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        self.assertEqual(
+            [row['id'] for row in rows],
+            [self.upcoming.id, self.cancelled.id, self.recent.id, self.old.id]
+        )
+
+
+class BookingRowsTests(TestCase):
+    """The .values() read path renders exactly what BookingSerializer does"""
+
+    def setUp(self):
+        self.admin = User.objects.create_user(
+            'admin', 'admin@example.com', 'pass', role='admin', first_name='Zoë', phone_number='+15550100'
+        )
+        self.user = User.objects.create_user('user', 'user@example.com', 'pass')
+        self.today = date.today()
+        for day, hour, status, notes in (
+            (0, 9, 'confirmed', ''), (1, 10, 'pending', 'Bring the "Q3" deck'),
+            (2, 11, 'cancelled', ''), (-3, 12, 'confirmed', 'Past'),
+        ):
+            Booking.objects.bulk_create([Booking(
+                user=self.user, admin=self.admin, date=self.today + timedelta(days=day),
+                start_time=time(hour, 15), end_time=time(hour, 45), meeting_purpose='Sync — 同步',
+                meeting_link='https://meet.example.com/abc', status=status, notes=notes
+            )])
+        self.client = APIClient()
+
+    def _render(self, data):
+        return JSONRenderer().render(data)
+
+    def test_rows_render_byte_identical(self):
+        queryset = Booking.objects.order_by('id')
+        expected = self._render(BookingSerializer(queryset, many=True).data)
+        self.assertEqual(self._render(booking_rows.render(booking_rows.values(queryset))), expected)
+
+        with override_settings(TIME_ZONE='Asia/Kolkata'):
+            expected = self._render(BookingSerializer(queryset, many=True).data)
+            self.assertEqual(self._render(booking_rows.render(booking_rows.values(queryset))), expected)
+
+    def test_list_and_dashboards_match_serializer(self):
+        self.client.force_authenticate(self.admin)
+        response = self.client.get('/api/bookings/')
+        expected = BookingSerializer(
+            Booking.objects.order_by('-date', '-start_time', 'id'), many=True
+        ).data
+        self.assertEqual(self._render(response.data['results']), self._render(expected))
+        self.assertIsNotNone(self.client.get('/api/bookings/?page_size=2').data['next'])
+
+        data = self.client.get('/api/bookings/dashboard/admin/').data
+        upcoming = Booking.objects.filter(
+            date__gte=self.today, status__in=['confirmed', 'pending']
+        ).order_by('date', 'start_time')
+        self.assertEqual(
+            self._render(data['upcoming_bookings']),
+            self._render(BookingSerializer(upcoming, many=True).data)
+        )
+        self.assertEqual(len(data['today_bookings']), 1)
+
+        self.client.force_authenticate(self.user)
+        data = self.client.get('/api/bookings/dashboard/user/').data
+        past = Booking.objects.filter(date__lt=self.today)
+        self.assertEqual(
+            self._render(data['past_bookings']),
+            self._render(BookingSerializer(past, many=True).data)
+        )
+
+    def test_list_reads_one_query_per_page(self):
+        self.client.force_authenticate(self.admin)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get('/api/bookings/')
+        # The page, after the conditional GET validator
+        self.assertEqual(len(queries), 2)
+
+    def test_rejects_fields_needing_instances(self):
+        with self.assertRaises(ImproperlyConfigured):
+            RowPlan(BookingHistorySerializer).plan
+
+
+class BookingConditionalGetTests(TestCase):
+    """Unchanged booking polls are answered with 304 after one aggregate query"""
+
+    def setUp(self):
+        self.admin = User.objects.create_user('admin', 'admin@example.com', 'pass', role='admin')
+        self.user = User.objects.create_user('user', 'user@example.com', 'pass')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.booking_id = self.client.post('/api/bookings/', {
+            'admin': self.admin.id, 'date': (date.today() + timedelta(days=2)).isoformat(),
+            'start_time': '09:00', 'end_time': '09:30', 'meeting_purpose': 'Sync'
+        }, format='json').json()['id']
+
+    def _revalidate(self, url, response):
+        return self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+
+    def test_unchanged_endpoints_answer_304(self):
+        for url in (
+            '/api/bookings/', '/api/bookings/?status=confirmed', '/api/bookings/history/',
+            f'/api/bookings/{self.booking_id}/', '/api/bookings/dashboard/user/',
+        ):
+            first = self.client.get(url)
+            self.assertEqual(first.status_code, 200)
+            with CaptureQueriesContext(connection) as queries:
+                response = self._revalidate(url, first)
+            self.assertEqual(response.status_code, 304, url)
+            self.assertLessEqual(len(queries), 2, url)
+
+        self.client.force_authenticate(self.admin)
+        first = self.client.get('/api/bookings/dashboard/admin/')
+        self.assertEqual(self._revalidate('/api/bookings/dashboard/admin/', first).status_code, 304)
+
+    def test_writes_change_the_etag(self):
+        listing = self.client.get('/api/bookings/')
+        dashboard = self.client.get('/api/bookings/dashboard/user/')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f'/api/bookings/{self.booking_id}/cancel/', {}, format='json')
+
+        response = self._revalidate('/api/bookings/', listing)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results'][0]['status'], 'cancelled')
+        self.assertEqual(self._revalidate('/api/bookings/dashboard/user/', dashboard).status_code, 200)
+
+    def test_uncounted_changes_change_the_dashboard_etag(self):
+        url = '/api/bookings/dashboard/user/'
+        first = self.client.get(url)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f'/api/bookings/{self.booking_id}/reschedule/', {
+                'start_time': '10:00', 'end_time': '10:30'
+            }, format='json')
+        second = self._revalidate(url, first)
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(second.json()['upcoming_bookings'][0]['start_time'], '10:00:00')
+
+        # The outbox writes the meeting link without touching the counts
+        booking = Booking.objects.get()
+        booking.meeting_link = 'https://meet.example.com/sync'
+        with self.captureOnCommitCallbacks(execute=True):
+            booking.save(update_fields=['meeting_link', 'updated_at'])
+        self.assertEqual(self._revalidate(url, second).status_code, 200)
+
+    def test_archiving_changes_the_history_etag(self):
+        Booking.objects.filter(id=self.booking_id).update(
+            status='cancelled', updated_at=timezone.now() - timedelta(days=120)
+        )
+        OutboxMessage.objects.update(status='done')
+        history = self.client.get('/api/bookings/history/')
+        dashboard = self.client.get('/api/bookings/dashboard/user/')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(archive_bookings(), 1)
+        response = self._revalidate('/api/bookings/history/', history)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()['results'][0]['archived'])
+        self.assertEqual(self._revalidate('/api/bookings/dashboard/user/', dashboard).status_code, 200)
+
+    def test_deletes_change_the_etag_and_if_modified_since_is_ignored(self):
+        # A delete leaves the latest updated_at alone, so only the ETag sees it
+        first = self.client.get('/api/bookings/')
+        self.assertFalse(first.has_header('Last-Modified'))
+        Booking.objects.filter(id=self.booking_id).delete()
+        self.assertEqual(self._revalidate('/api/bookings/', first).status_code, 200)
+        response = self.client.get('/api/bookings/', HTTP_IF_MODIFIED_SINCE='Sat, 01 Jan 2100 00:00:00 GMT')
+        self.assertEqual(response.status_code, 200)
+
+    def test_rejected_requests_are_not_validated(self):
+        response = self.client.get('/api/bookings/dashboard/admin/')
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(response.has_header('ETag'))
+
+
+class BookingQueryPlanTests(QueryPlanMixin, TestCase):
+    """Hot booking queries are served by indexes"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admins = [
+            User.objects.create_user(f'admin{i}', f'admin{i}@example.com', 'pass', role='admin')
+            for i in range(5)
+        ]
+        cls.users = [
+            User.objects.create_user(f'user{i}', f'user{i}@example.com', 'pass')
+            for i in range(20)
+        ]
+        cls.superadmin = User.objects.create_user('root', 'root@example.com', 'pass', role='superadmin')
+        cls.today = date.today()
+        statuses = ['confirmed', 'pending', 'cancelled']
+        Booking.objects.bulk_create([
+            Booking(
+                user=cls.users[index % 20],
+                admin=cls.admins[index % 5],
+                date=cls.today + timedelta(days=index // 50 - 20),
+                start_time=time(9 + index // 5 % 10),
+                end_time=time(9 + index // 5 % 10, 30),
+                meeting_purpose='Seed',
+                status=statuses[index % 3]
+            )
+            for index in range(3000)
+        ])
+        cls.analyze()
+
+    def _list_queryset(self, user, **params):
+        """The booking list query as BookingListCreateView builds it, first page"""
+        view = BookingListCreateView()
+        view.request = view.initialize_request(APIRequestFactory().get('/api/bookings/', params))
+        view.request.user = user
+        return view.get_queryset().order_by('-date', '-start_time', 'id')[:21]
+
+    def test_list_queries(self):
+        window = {'start_date': self.today.isoformat(), 'end_date': (self.today + timedelta(days=30)).isoformat()}
+        for user in (self.superadmin, self.admins[0], self.users[0]):
+            for params in ({}, {'status': 'pending'}, window):
+                self.assertNoFullScan(self._list_queryset(user, **params), f'{user.role} list {params}')
+
+    def test_detail_scoping_query(self):
+        # BookingDetailView looks the row up by pk within the scope
+        admin = self.admins[0]
+        self.assertNoFullScan(
+            Booking.objects.filter(Q(admin=admin) | Q(user=admin)).filter(pk=1),
+            'admin detail scope'
+        )
+
+    def test_overlap_and_slot_queries(self):
+        admin = self.admins[0]
+        week = (self.today, self.today + timedelta(days=6))
+        querysets = {
+            'overlap check': Booking.objects.active_overlapping(
+                admin.id, self.today, time(9), time(10)
+            ).exclude(pk=1).only('start_time', 'end_time')[:1],
+            'busy day': Booking.objects.filter(
+                admin_id=admin.id, date=self.today, status__in=['confirmed', 'pending']
+            ).only('start_time', 'end_time'),
+            'busy range': Booking.objects.filter(
+                admin_id__in=[admin.id, self.admins[1].id],
+                date__range=week,
+                status__in=['confirmed', 'pending']
+            ).only('id', 'admin_id', 'date', 'start_time', 'end_time'),
+        }
+        for label, queryset in querysets.items():
+            self.assertNoFullScan(queryset, label)
+
+    def test_dashboard_queries(self):
+        user, admin = self.users[0], self.admins[0]
+        active = ['confirmed', 'pending']
+        querysets = {
+            'user upcoming': Booking.objects.filter(
+                user=user, date__gte=self.today, status__in=active
+            ).order_by('date', 'start_time')[:10],
+            'user past': Booking.objects.filter(user=user, date__lt=self.today).order_by('-date', '-start_time')[:5],
+            'user cancelled': Booking.objects.filter(user=user, status='cancelled'),
+            'admin today': Booking.objects.filter(admin=admin, date=self.today, status__in=active).order_by('start_time'),
+            'admin week': Booking.objects.filter(
+                admin=admin, date__range=[self.today, self.today + timedelta(days=7)], status__in=active
+            ).order_by('date', 'start_time'),
+            'admin pending': Booking.objects.filter(admin=admin, status='pending'),
+        }
+        for label, queryset in querysets.items():
+            self.assertNoFullScan(queryset, label)
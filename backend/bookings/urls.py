@@ -1,8 +1,10 @@
 from django.urls import path
 from .views import (
-    BookingListCreateView, BookingDetailView,
+    BookingListCreateView, BookingDetailView, BulkBookingCreateView, BookingExportView,
+    BookingHistoryView,
     CancelBookingView, RescheduleBookingView,
-    UserDashboardView, AdminDashboardView
+    UserDashboardView, AdminDashboardView, OutboxMetricsView,
+    CalendarFeedURLsView, CalendarFeedView
 )
 
 app_name = 'bookings'
@@ -10,6 +12,9 @@ app_name = 'bookings'
 urlpatterns = [
     # Booking CRUD
     path('', BookingListCreateView.as_view(), name='booking-list'),
+    path('history/', BookingHistoryView.as_view(), name='booking-history'),
+    path('export/', BookingExportView.as_view(), name='booking-export'),
+    path('bulk/', BulkBookingCreateView.as_view(), name='booking-bulk-create'),
     path('<int:pk>/', BookingDetailView.as_view(), name='booking-detail'),
     path('<int:pk>/cancel/', CancelBookingView.as_view(), name='booking-cancel'),
     path('<int:pk>/reschedule/', RescheduleBookingView.as_view(), name='booking-reschedule'),
@@ -17,4 +22,11 @@ urlpatterns = [
     # Dashboards
     path('dashboard/user/', UserDashboardView.as_view(), name='user-dashboard'),
     path('dashboard/admin/', AdminDashboardView.as_view(), name='admin-dashboard'),
+    
+    # iCalendar feeds
+    path('feeds/', CalendarFeedURLsView.as_view(), name='calendar-feed-urls'),
+    path('feeds/<str:token>/<str:perspective>.ics', CalendarFeedView.as_view(), name='calendar-feed'),
+    
+    # Side effect outbox
+    path('outbox/metrics/', OutboxMetricsView.as_view(), name='outbox-metrics'),
 ]
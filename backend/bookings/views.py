@@ -2,28 +2,41 @@ from rest_framework import generics, status, permissions
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.decorators import api_view, permission_classes
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import transaction
 from django.db.models import Q
+from django.http import StreamingHttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
 from datetime import datetime, timedelta
-from .models import Booking
+from .models import ArchivedBooking, Booking
 from .serializers import (
     BookingSerializer, BookingCreateSerializer,
-    BookingUpdateSerializer, CancelBookingSerializer
+    BookingUpdateSerializer, CancelBookingSerializer,
+    BulkBookingSerializer, BulkBookingItemSerializer, BookingHistorySerializer
 )
-from calendar_scheduler.integrations.email_service import EmailService
+from .reservations import reserve_booking, reserve_bookings, SlotUnavailable
+from .counters import get_counts
+from .export import EXPORTERS, EXPORT_FORMATS
+from .feeds import FEED_PERSPECTIVES, feed_validators, iter_ics
+from .idempotency import idempotent
+from .rows import booking_rows
+from users.models import User
+from availability.holds import HoldUnavailable, check_slot_hold, check_slot_holds, consume_hold
+from calendar_scheduler.conditional import conditional, queryset_state
+from calendar_scheduler.pagination import KeysetPagination, MergedKeysetPagination
+from .tasks import enqueue_outbox_drain
+from . import outbox
 
 
-class BookingListCreateView(generics.ListCreateAPIView):
-    """List and create bookings"""
-    permission_classes = [permissions.IsAuthenticated]
-    
-    def get_serializer_class(self):
-        if self.request.method == 'POST':
-            return BookingCreateSerializer
-        return BookingSerializer
+class BookingFilterMixin:
+    """Role-scoped booking queryset with status and date range filters"""
     
     def get_queryset(self):
+        return self.filter_bookings(Booking.objects.all())
+    
+    def filter_bookings(self, queryset):
+        """Apply the request's filters and role scoping to live or archived bookings"""
         user = self.request.user
-        queryset = Booking.objects.all()
         
         # Filter by status
         status_filter = self.request.query_params.get('status')
@@ -49,44 +62,219 @@ class BookingListCreateView(generics.ListCreateAPIView):
             return queryset.filter(user=user)
         
         return queryset
+
+
+class BookingListCreateView(BookingFilterMixin, generics.ListCreateAPIView):
+    """List and create bookings"""
+    permission_classes = [permissions.IsAuthenticated]
+    pagination_class = KeysetPagination
+    
+    def get_serializer_class(self):
+        if self.request.method == 'POST':
+            return BookingCreateSerializer
+        return BookingSerializer
+    
+    def list_validators(self, request, *args, **kwargs):
+        return queryset_state(self.filter_queryset(self.get_queryset()))
     
+    @conditional(list_validators)
+    def list(self, request, *args, **kwargs):
+        """List bookings rendered from .values() rows instead of instances"""
+        queryset = booking_rows.values(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(booking_rows.render(page))
+        return Response(booking_rows.render(queryset))
+    
+    @idempotent
     def create(self, request, *args, **kwargs):
         """Override create to return full booking data"""
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        booking = serializer.save(user=request.user)
         
-        # Create Google Calendar event if admin has connected calendar
-        try:
-            from calendar_scheduler.integrations.google_calendar import GoogleCalendarService
-            
-            if booking.admin.google_calendar_token:
-                print(f"Creating Google Calendar event for booking {booking.id}")
-                event_data = GoogleCalendarService.create_event(booking.admin, booking)
-                
-                if event_data:
-                    booking.meeting_link = event_data.get('meet_link', '') or event_data.get('html_link', '')
-                    booking.calendar_event_id = event_data.get('event_id', '')
-                    booking.save()
-                    print(f"Event created: {booking.meeting_link}")
-                else:
-                    print("Failed to create event (service returned None)")
-        except Exception as e:
-            print(f"Error in calendar integration: {str(e)}")
-            # Don't fail the booking if calendar fails
-        
-        # Send confirmation emails
+        booking = Booking(user=request.user, **serializer.validated_data)
+        # Only admins with a connected calendar get an event
+        booking.calendar_status = 'pending' if booking.admin.google_calendar_token else 'skipped'
+        
+        def after_save(saved):
+            # Under the admin day's lock, which placing a hold also takes
+            check_slot_hold(saved.user_id, saved.admin_id, saved.date, saved.start_time, saved.end_time)
+            outbox.enqueue('booking_created', saved)
+        
         try:
-            EmailService.send_booking_confirmation_email(booking)
-        except Exception as e:
-            print(f"Error sending confirmation email: {str(e)}")
-            # Don't fail the booking if email fails
+            booking = reserve_booking(booking, after_save=after_save)
+        except (SlotUnavailable, HoldUnavailable) as e:
+            return Response({
+                'error': str(e)
+            }, status=status.HTTP_409_CONFLICT)
+        except DjangoValidationError as e:
+            return Response({
+                'error': e.messages
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        # Calendar event and confirmation emails run on a worker once committed
+        transaction.on_commit(enqueue_outbox_drain)
+        transaction.on_commit(lambda: consume_hold(
+            booking.user_id, booking.admin_id, booking.date, booking.start_time
+        ))
         
         # Return full booking data using BookingSerializer
         response_serializer = BookingSerializer(booking)
         return Response(response_serializer.data, status=status.HTTP_201_CREATED)
 
 
+class BookingExportView(BookingFilterMixin, generics.GenericAPIView):
+    """
+    Stream every booking visible to the user as CSV or NDJSON
+    
+    Takes the same filters as the booking list, plus type=csv|ndjson and
+    include_archived=true to add archived bookings.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def get(self, request):
+        export_type = request.query_params.get('type', 'csv')
+        if export_type not in EXPORTERS:
+            return Response({
+                'error': f"type must be one of: {', '.join(EXPORTERS)}"
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        # The queryset only runs once streaming has started, too late for a 400
+        for param in ('start_date', 'end_date'):
+            if request.query_params.get(param):
+                try:
+                    datetime.strptime(request.query_params[param], '%Y-%m-%d')
+                except ValueError:
+                    return Response({
+                        'error': 'Invalid date format. Use YYYY-MM-DD'
+                    }, status=status.HTTP_400_BAD_REQUEST)
+        
+        queryset = self.get_queryset()
+        if request.query_params.get('include_archived') == 'true':
+            queryset = [queryset, self.filter_bookings(ArchivedBooking.objects.all())]
+
+        response = StreamingHttpResponse(
+            EXPORTERS[export_type](queryset),
+            content_type=EXPORT_FORMATS[export_type]
+        )
+        response['Content-Disposition'] = f'attachment; filename="bookings.{export_type}"'
+        return response
+
+
+class BookingHistoryView(BookingFilterMixin, generics.ListAPIView):
+    """
+    List live and archived bookings as one history
+    
+    Takes the same filters as the booking list and pages by cursor; each
+    result says whether it comes from the archive.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    serializer_class = BookingHistorySerializer
+    pagination_class = MergedKeysetPagination
+    
+    def get_queryset(self):
+        return [
+            self.filter_bookings(Booking.objects.select_related('user', 'admin')),
+            self.filter_bookings(ArchivedBooking.objects.select_related('user', 'admin')),
+        ]
+    
+    def list_validators(self, request, *args, **kwargs):
+        # Per table, so that archiving a booking changes the ETag
+        return tuple(queryset_state(queryset) for queryset in self.get_queryset())
+    
+    @conditional(list_validators)
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+
+class BulkBookingCreateView(APIView):
+    """
+    Create many bookings in one request
+    
+    Super admins may book on behalf of other users by giving a user per
+    item; everyone else books for themselves.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def post(self, request):
+        serializer = BulkBookingSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        items = serializer.validated_data['bookings']
+        partial = serializer.validated_data['partial']
+        
+        errors = [None] * len(items)
+        validated = []
+        for index, item in enumerate(items):
+            item_serializer = BulkBookingItemSerializer(data=item)
+            if item_serializer.is_valid():
+                validated.append((index, item_serializer.validated_data))
+            else:
+                errors[index] = item_serializer.errors
+        
+        # Resolve every referenced user and admin with one query
+        user_ids = {request.user.id}
+        for index, data in validated:
+            user_ids.update((data['admin'], data.get('user', request.user.id)))
+        users = User.objects.in_bulk(user_ids)
+        
+        bookings = {}
+        for index, data in validated:
+            data = dict(data)
+            admin = users.get(data.pop('admin'))
+            user = users.get(data.pop('user', request.user.id))
+            if admin is None or not admin.is_admin_role():
+                errors[index] = {'admin': ['Selected user is not an admin']}
+            elif user is None:
+                errors[index] = {'user': ['User not found']}
+            elif user != request.user and not request.user.is_super_admin():
+                errors[index] = {'user': ['Only super admins can book for other users']}
+            else:
+                booking = Booking(user=user, admin=admin, **data)
+                booking.calendar_status = 'pending' if admin.google_calendar_token else 'skipped'
+                bookings[index] = booking
+        
+        if partial or not any(errors):
+            booking_errors = reserve_bookings(
+                list(bookings.values()),
+                partial=partial,
+                # Under the days' booking locks, which placing a hold also takes
+                check=check_slot_holds,
+                after_create=lambda created: outbox.enqueue_many('booking_created', created)
+            )
+            for index, booking_error in zip(bookings, booking_errors):
+                errors[index] = booking_error
+        
+        results = []
+        for index in range(len(items)):
+            booking = bookings.get(index)
+            if booking is not None and booking.pk is not None:
+                results.append({'index': index, 'status': 'created', 'id': booking.pk})
+            elif errors[index] is not None:
+                results.append({'index': index, 'status': 'rejected', 'errors': errors[index]})
+            else:
+                results.append({
+                    'index': index,
+                    'status': 'rejected',
+                    'errors': ['Not created because other bookings in the batch were rejected']
+                })
+        
+        created = sum(1 for result in results if result['status'] == 'created')
+        if not created:
+            return Response({
+                'error': 'No bookings were created',
+                'results': results
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        # One drain picks up the whole batch's side effects
+        transaction.on_commit(enqueue_outbox_drain)
+        
+        return Response({
+            'created': created,
+            'rejected': len(results) - created,
+            'results': results
+        }, status=status.HTTP_201_CREATED)
+
+
 class BookingDetailView(generics.RetrieveUpdateDestroyAPIView):
     """Retrieve, update, or delete booking"""
     permission_classes = [permissions.IsAuthenticated]
@@ -104,12 +292,20 @@ class BookingDetailView(generics.RetrieveUpdateDestroyAPIView):
             return Booking.objects.filter(Q(admin=user) | Q(user=user))
         else:
             return Booking.objects.filter(user=user)
+    
+    def retrieve_validators(self, request, *args, **kwargs):
+        return queryset_state(self.get_queryset().filter(pk=kwargs['pk']))
+    
+    @conditional(retrieve_validators)
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
 
 
 class CancelBookingView(APIView):
     """Cancel a booking"""
     permission_classes = [permissions.IsAuthenticated]
     
+    @idempotent
     def post(self, request, pk):
         try:
             booking = Booking.objects.get(pk=pk)
@@ -133,19 +329,15 @@ class CancelBookingView(APIView):
                 'error': 'Booking is already cancelled'
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        # Cancel the booking
-        booking.status = 'cancelled'
-        booking.save()
+        # Cancel the booking; cancellation emails go through the outbox
+        with transaction.atomic():
+            booking.status = 'cancelled'
+            booking.save()
+            outbox.enqueue('booking_cancelled', booking)
+        transaction.on_commit(enqueue_outbox_drain)
         
         # TODO: Delete Google Calendar event
         
-        # Send cancellation emails
-        try:
-            EmailService.send_booking_cancellation_email(booking)
-        except Exception as e:
-            print(f"Error sending cancellation email: {str(e)}")
-            # Don't fail the cancellation if email fails
-        
         return Response({
             'message': 'Booking cancelled successfully',
             'booking': BookingSerializer(booking).data
@@ -156,6 +348,7 @@ class RescheduleBookingView(APIView):
     """Reschedule a booking"""
     permission_classes = [permissions.IsAuthenticated]
     
+    @idempotent
     def post(self, request, pk):
         try:
             booking = Booking.objects.get(pk=pk)
@@ -179,21 +372,39 @@ class RescheduleBookingView(APIView):
         # Update booking
         serializer = BookingUpdateSerializer(booking, data=request.data, partial=True)
         serializer.is_valid(raise_exception=True)
-        updated_booking = serializer.save()
         
-        # TODO: Update Google Calendar event
+        for field, value in serializer.validated_data.items():
+            setattr(booking, field, value)
+        
+        # Reschedule emails quote the old time, so capture it with the change
+        old_times = {
+            'old_date': old_date.isoformat(),
+            'old_start_time': old_start_time.isoformat(),
+            'old_end_time': old_end_time.isoformat(),
+        }
+        
+        def after_save(saved):
+            # Under the admin day's lock, which placing a hold also takes
+            check_slot_hold(saved.user_id, saved.admin_id, saved.date, saved.start_time, saved.end_time)
+            outbox.enqueue('booking_rescheduled', saved, old_times)
         
-        # Send reschedule notification emails
         try:
-            EmailService.send_booking_reschedule_email(
-                updated_booking, 
-                old_date, 
-                old_start_time, 
-                old_end_time
-            )
-        except Exception as e:
-            print(f"Error sending reschedule email: {str(e)}")
-            # Don't fail the reschedule if email fails
+            updated_booking = reserve_booking(booking, after_save=after_save)
+        except (SlotUnavailable, HoldUnavailable) as e:
+            return Response({
+                'error': str(e)
+            }, status=status.HTTP_409_CONFLICT)
+        except DjangoValidationError as e:
+            return Response({
+                'error': e.messages
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        transaction.on_commit(enqueue_outbox_drain)
+        transaction.on_commit(lambda: consume_hold(
+            booking.user_id, booking.admin_id, booking.date, booking.start_time
+        ))
+        
+        # TODO: Update Google Calendar event
         
         return Response({
             'message': 'Booking rescheduled successfully',
@@ -201,38 +412,118 @@ class RescheduleBookingView(APIView):
         })
 
 
+class CalendarFeedURLsView(APIView):
+    """Get the current user's iCalendar feed URLs, or rotate their token (POST)"""
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def get(self, request):
+        user = request.user
+        if not user.calendar_feed_token:
+            user.rotate_calendar_feed_token()
+        return Response(self._urls(request, user))
+    
+    def post(self, request):
+        """Issue a new token; URLs built from the old one stop working"""
+        request.user.rotate_calendar_feed_token()
+        return Response(self._urls(request, request.user))
+    
+    def _urls(self, request, user):
+        perspectives = FEED_PERSPECTIVES if user.is_admin_role() else ('user',)
+        return {
+            perspective: request.build_absolute_uri(
+                f'/api/bookings/feeds/{user.calendar_feed_token}/{perspective}.ics'
+            )
+            for perspective in perspectives
+        }
+
+
+class CalendarFeedView(APIView):
+    """
+    iCalendar feed of a user's bookings, authenticated by the token in its URL
+    
+    Polls with a matching If-None-Match get a 304 after a single aggregate
+    query.
+    """
+    authentication_classes = []
+    permission_classes = [permissions.AllowAny]
+    
+    def get(self, request, token, perspective):
+        user = User.objects.filter(calendar_feed_token=token, is_active=True).first()
+        if user is None or perspective not in FEED_PERSPECTIVES or (
+            perspective == 'admin' and not user.is_admin_role()
+        ):
+            return Response({
+                'error': 'Feed not found'
+            }, status=status.HTTP_404_NOT_FOUND)
+        
+        etag = f'"{feed_validators(user, perspective)}"'
+        
+        response = get_conditional_response(request._request, etag=etag)
+        if response is None:
+            response = StreamingHttpResponse(
+                iter_ics(user, perspective),
+                content_type='text/calendar; charset=utf-8'
+            )
+            response['Content-Disposition'] = f'inline; filename="{perspective}-bookings.ics"'
+        
+        response['ETag'] = etag
+        # Feeds are per-user secrets; clients must revalidate every poll
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+
+class OutboxMetricsView(APIView):
+    """Get booking outbox queue depth, lag and last drain throughput (Super Admin only)"""
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def get(self, request):
+        if not request.user.is_super_admin():
+            return Response({
+                'error': 'Super admin access required'
+            }, status=status.HTTP_403_FORBIDDEN)
+        
+        return Response(outbox.get_outbox_metrics())
+
+
 class UserDashboardView(APIView):
     """Get user dashboard data"""
     permission_classes = [permissions.IsAuthenticated]
     
+    def get_validators(self, request):
+        # The counter row changes with every booking of the user; the
+        # handler reuses it for the statistics
+        self.counts = get_counts(request.user.id, 'user')
+        # Upcoming and past split on today, so the dashboard changes at midnight too
+        return (datetime.now().date(), *self.counts.values())
+    
+    @conditional(get_validators)
     def get(self, request):
         user = request.user
         today = datetime.now().date()
         
         # Upcoming bookings
-        upcoming_bookings = Booking.objects.filter(
+        upcoming_bookings = booking_rows.values(Booking.objects.filter(
             user=user,
             date__gte=today,
             status__in=['confirmed', 'pending']
-        ).order_by('date', 'start_time')[:10]
+        ).order_by('date', 'start_time')[:10])
         
         # Past bookings
-        past_bookings = Booking.objects.filter(
+        past_bookings = list(booking_rows.values(Booking.objects.filter(
             user=user,
             date__lt=today
-        ).order_by('-date', '-start_time')[:5]
+        ).order_by('-date', '-start_time')[:5]))
         
-        # Statistics
-        total_bookings = Booking.objects.filter(user=user).count()
-        cancelled_bookings = Booking.objects.filter(user=user, status='cancelled').count()
+        # Statistics, from the counters kept by booking writes
+        counts = self.counts
         
         return Response({
-            'upcoming_bookings': BookingSerializer(upcoming_bookings, many=True).data,
-            'past_bookings': BookingSerializer(past_bookings, many=True).data,
+            'upcoming_bookings': booking_rows.render(upcoming_bookings),
+            'past_bookings': booking_rows.render(past_bookings),
             'statistics': {
-                'total': total_bookings,
-                'cancelled': cancelled_bookings,
-                'completed': past_bookings.count()
+                'total': counts['total'],
+                'cancelled': counts['cancelled'],
+                'completed': len(past_bookings)
             }
         })
 
@@ -241,6 +532,13 @@ class AdminDashboardView(APIView):
     """Get admin dashboard data"""
     permission_classes = [permissions.IsAuthenticated]
     
+    def get_validators(self, request):
+        if not request.user.is_admin_role():
+            return None
+        self.counts = get_counts(request.user.id, 'admin')
+        return (datetime.now().date(), *self.counts.values())
+    
+    @conditional(get_validators)
     def get(self, request):
         user = request.user
         
@@ -251,31 +549,26 @@ class AdminDashboardView(APIView):
         
         today = datetime.now().date()
         
-        # Today's bookings
-        today_bookings = Booking.objects.filter(
-            admin=user,
-            date=today,
-            status__in=['confirmed', 'pending']
-        ).order_by('start_time')
-        
         # Upcoming bookings (next 7 days)
         week_later = today + timedelta(days=7)
-        upcoming_bookings = Booking.objects.filter(
+        upcoming_bookings = list(booking_rows.values(Booking.objects.filter(
             admin=user,
             date__range=[today, week_later],
             status__in=['confirmed', 'pending']
-        ).order_by('date', 'start_time')
+        ).order_by('date', 'start_time')))
+        
+        # Today's bookings are the head of the upcoming list
+        today_bookings = [booking for booking in upcoming_bookings if booking['date'] == today]
         
-        # Statistics
-        total_bookings = Booking.objects.filter(admin=user).count()
-        pending_bookings = Booking.objects.filter(admin=user, status='pending').count()
+        # Statistics, from the counters kept by booking writes
+        counts = self.counts
         
         return Response({
-            'today_bookings': BookingSerializer(today_bookings, many=True).data,
-            'upcoming_bookings': BookingSerializer(upcoming_bookings, many=True).data,
+            'today_bookings': booking_rows.render(today_bookings),
+            'upcoming_bookings': booking_rows.render(upcoming_bookings),
             'statistics': {
-                'total': total_bookings,
-                'pending': pending_bookings,
-                'today': today_bookings.count()
+                'total': counts['total'],
+                'pending': counts['pending'],
+                'today': len(today_bookings)
             }
         })
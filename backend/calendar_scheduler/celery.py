@@ -0,0 +1,19 @@
+"""
+Celery application for background jobs.
+
+Start a worker with:
+    celery -A calendar_scheduler worker -l info
+"""
+import os
+
+from celery import Celery
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'calendar_scheduler.settings')
+
+app = Celery('calendar_scheduler')
+
+# Read CELERY_* settings from Django settings
+app.config_from_object('django.conf:settings', namespace='CELERY')
+
+# Load tasks.py modules from all installed apps
+app.autodiscover_tasks()
@@ -0,0 +1,88 @@
+"""
+Conditional GET for polled read endpoints.
+
+Clients poll bookings, availability and slots, and most polls find nothing
+changed. A view decorated with conditional() first computes cheap
+validators, typically the row count and latest updated_at of the queryset
+it is about to serialize (queryset_state), or the slot cache version. It
+answers 304 when they match the request's If-None-Match, before any row is
+read or serialized.
+
+The ETag hashes the validators together with the user, the full path and
+the negotiated format, so every scoping, filter and page gets its own
+ETag. A delete changes the count and a write changes the latest updated_at
+at full precision, so either changes the ETag. No Last-Modified is sent and
+If-Modified-Since is not honoured: the latest updated_at does not move when
+a row is deleted, and HTTP dates cannot tell writes within one second apart.
+"""
+import hashlib
+from functools import wraps
+
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response, patch_cache_control
+
+
+def queryset_state(queryset, field='updated_at'):
+    """
+    Return (count, latest value of field) of a queryset in one aggregate query
+
+    latest is None for an empty queryset.
+    """
+    state = queryset.order_by().aggregate(count=Count('pk'), latest=Max(field))
+    return state['count'], state['latest']
+
+
+def make_etag(request, parts):
+    """Strong ETag for a request's response given its validator parts"""
+    key = ':'.join(str(part) for part in (
+        request.user.pk, request.accepted_renderer.format, request.get_full_path(), *parts
+    ))
+    return f'"{hashlib.sha256(key.encode()).hexdigest()[:32]}"'
+
+
+def conditional_response(request, parts, respond):
+    """
+    Answer 304 if the client's copy is current, else call respond()
+
+    Successful responses get the ETag header.
+
+    Args:
+        parts: Tuple of values the response depends on
+        respond: Builds the full response
+    """
+    etag = make_etag(request, parts)
+
+    response = get_conditional_response(request._request, etag=etag)
+    if response is None:
+        response = respond()
+        if response.status_code != 200:
+            return response
+
+    response['ETag'] = etag
+    # Responses are per user; clients must revalidate every poll
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def conditional(validators):
+    """
+    Make a GET handler answer 304 when the client's copy is current
+
+    Args:
+        validators: Called with the handler's arguments; returns the
+            parts for conditional_response, or None to skip validation
+            (e.g. for a request the handler will reject)
+    """
+    def decorator(handler):
+        @wraps(handler)
+        def wrapper(self, request, *args, **kwargs):
+            parts = validators(self, request, *args, **kwargs)
+            if parts is None:
+                return handler(self, request, *args, **kwargs)
+            return conditional_response(
+                request, parts, lambda: handler(self, request, *args, **kwargs)
+            )
+
+        return wrapper
+
+    return decorator
@@ -5,6 +5,9 @@ import logging
 
 logger = logging.getLogger(__name__)
 
+# Each booking email goes to the booking's user and its admin
+RECIPIENTS = ('user', 'admin')
+
 
 class EmailService:
     """
@@ -12,12 +15,14 @@ class EmailService:
     """
     
     @staticmethod
-    def send_booking_confirmation_email(booking):
+    def send_booking_confirmation_email(booking, fail_silently=True, recipients=RECIPIENTS):
         """
         Send confirmation email when a booking is created
         
         Args:
             booking: Booking instance
+            fail_silently: Log errors instead of raising them
+            recipients: Which of 'user' and 'admin' to email
         """
         try:
             # Format date and time
@@ -49,13 +54,14 @@ Best regards,
 Calendar Scheduler Team
             """
             
-            send_mail(
-                subject=user_subject,
-                message=user_message,
-                from_email=settings.DEFAULT_FROM_EMAIL,
-                recipient_list=[booking.user.email],
-                fail_silently=True,
-            )
+            if 'user' in recipients:
+                send_mail(
+                    subject=user_subject,
+                    message=user_message,
+                    from_email=settings.DEFAULT_FROM_EMAIL,
+                    recipient_list=[booking.user.email],
+                    fail_silently=fail_silently,
+                )
             
             # Email to admin
             admin_subject = f'New Booking: Meeting with {booking.user.get_full_name() or booking.user.username}'
@@ -79,26 +85,31 @@ Best regards,
 Calendar Scheduler Team
             """
             
-            send_mail(
-                subject=admin_subject,
-                message=admin_message,
-                from_email=settings.DEFAULT_FROM_EMAIL,
-                recipient_list=[booking.admin.email],
-                fail_silently=True,
-            )
+            if 'admin' in recipients:
+                send_mail(
+                    subject=admin_subject,
+                    message=admin_message,
+                    from_email=settings.DEFAULT_FROM_EMAIL,
+                    recipient_list=[booking.admin.email],
+                    fail_silently=fail_silently,
+                )
             
             logger.info(f"Booking confirmation emails sent for booking {booking.id}")
             
         except Exception as e:
             logger.error(f"Failed to send booking confirmation email: {str(e)}")
+            if not fail_silently:
+                raise
     
     @staticmethod
-    def send_booking_cancellation_email(booking):
+    def send_booking_cancellation_email(booking, fail_silently=True, recipients=RECIPIENTS):
         """
         Send notification email when a booking is cancelled
         
         Args:
             booking: Booking instance
+            fail_silently: Log errors instead of raising them
+            recipients: Which of 'user' and 'admin' to email
         """
         try:
             # Format date and time
@@ -126,13 +137,14 @@ Best regards,
 Calendar Scheduler Team
             """
             
-            send_mail(
-                subject=user_subject,
-                message=user_message,
-                from_email=settings.DEFAULT_FROM_EMAIL,
-                recipient_list=[booking.user.email],
-                fail_silently=True,
-            )
+            if 'user' in recipients:
+                send_mail(
+                    subject=user_subject,
+                    message=user_message,
+                    from_email=settings.DEFAULT_FROM_EMAIL,
+                    recipient_list=[booking.user.email],
+                    fail_silently=fail_silently,
+                )
             
             # Email to admin
             admin_subject = f'Booking Cancelled: Meeting with {booking.user.get_full_name() or booking.user.username}'
@@ -152,21 +164,25 @@ Best regards,
 Calendar Scheduler Team
             """
             
-            send_mail(
-                subject=admin_subject,
-                message=admin_message,
-                from_email=settings.DEFAULT_FROM_EMAIL,
-                recipient_list=[booking.admin.email],
-                fail_silently=True,
-            )
+            if 'admin' in recipients:
+                send_mail(
+                    subject=admin_subject,
+                    message=admin_message,
+                    from_email=settings.DEFAULT_FROM_EMAIL,
+                    recipient_list=[booking.admin.email],
+                    fail_silently=fail_silently,
+                )
             
             logger.info(f"Booking cancellation emails sent for booking {booking.id}")
             
         except Exception as e:
             logger.error(f"Failed to send booking cancellation email: {str(e)}")
+            if not fail_silently:
+                raise
     
     @staticmethod
-    def send_booking_reschedule_email(booking, old_date, old_start_time, old_end_time):
+    def send_booking_reschedule_email(booking, old_date, old_start_time, old_end_time, fail_silently=True,
+                                      recipients=RECIPIENTS):
         """
         Send notification email when a booking is rescheduled
         
@@ -175,6 +191,8 @@ Calendar Scheduler Team
             old_date: Previous date
             old_start_time: Previous start time
             old_end_time: Previous end time
+            fail_silently: Log errors instead of raising them
+            recipients: Which of 'user' and 'admin' to email
         """
         try:
             # Format old date and time
@@ -214,13 +232,14 @@ Best regards,
 Calendar Scheduler Team
             """
             
-            send_mail(
-                subject=user_subject,
-                message=user_message,
-                from_email=settings.DEFAULT_FROM_EMAIL,
-                recipient_list=[booking.user.email],
-                fail_silently=True,
-            )
+            if 'user' in recipients:
+                send_mail(
+                    subject=user_subject,
+                    message=user_message,
+                    from_email=settings.DEFAULT_FROM_EMAIL,
+                    recipient_list=[booking.user.email],
+                    fail_silently=fail_silently,
+                )
             
             # Email to admin
             admin_subject = f'Booking Rescheduled: Meeting with {booking.user.get_full_name() or booking.user.username}'
@@ -249,15 +268,18 @@ Best regards,
 Calendar Scheduler Team
             """
             
-            send_mail(
-                subject=admin_subject,
-                message=admin_message,
-                from_email=settings.DEFAULT_FROM_EMAIL,
-                recipient_list=[booking.admin.email],
-                fail_silently=True,
-            )
+            if 'admin' in recipients:
+                send_mail(
+                    subject=admin_subject,
+                    message=admin_message,
+                    from_email=settings.DEFAULT_FROM_EMAIL,
+                    recipient_list=[booking.admin.email],
+                    fail_silently=fail_silently,
+                )
             
             logger.info(f"Booking reschedule emails sent for booking {booking.id}")
             
         except Exception as e:
             logger.error(f"Failed to send booking reschedule email: {str(e)}")
+            if not fail_silently:
+                raise
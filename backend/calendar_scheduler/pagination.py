@@ -0,0 +1,211 @@
+"""
+Keyset pagination for large, date-ordered lists.
+
+Page-number pagination runs a COUNT(*) per page and skips rows with OFFSET,
+so late pages cost as much as reading everything before them. Keyset
+pagination instead remembers the ordering key of the last row served and
+asks for rows strictly after it, which an index on the same key answers
+directly however deep the page is.
+"""
+import base64
+import json
+from collections import OrderedDict
+from operator import attrgetter
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination over a composite, unique ordering key
+
+    The ordering must end in a unique field (id) so that every row has a
+    distinct position. Responses look like page-number responses without
+    `count`: {"next": url, "previous": url, "results": [...]}.
+
+    Requests with a `page` parameter fall back to PageNumberPagination, so
+    existing clients keep their numbered pages and counts.
+    """
+    ordering = ('-date', '-start_time', 'id')
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    legacy_query_param = 'page'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.legacy = None
+        if self.legacy_query_param in request.query_params:
+            self.legacy = PageNumberPagination()
+            self.legacy.page_size = self.page_size
+            return self.legacy.paginate_queryset(queryset.order_by(*self.ordering), request, view)
+
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        position, reverse = self.decode_cursor(request, queryset.model)
+
+        ordering = self.ordering
+        if reverse:
+            ordering = tuple(self._flip(field) for field in ordering)
+        rows = self.fetch(queryset, ordering, position)
+        return self.paginate_rows(rows, position, reverse)
+
+    def fetch(self, queryset, ordering, position):
+        """Read up to page_size + 1 rows after position under ordering"""
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            queryset = queryset.filter(self._after(ordering, position))
+        return list(queryset[:self.page_size + 1])
+
+    def paginate_rows(self, rows, position, reverse):
+        """Trim fetched rows to a page and work out its links"""
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+
+        self.page = rows
+        if reverse:
+            self.has_previous, self.has_next = has_more, True
+        else:
+            self.has_previous, self.has_next = position is not None, has_more
+        return rows
+
+    def get_paginated_response(self, data):
+        if self.legacy is not None:
+            return self.legacy.get_paginated_response(data)
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def encode_cursor(self, row, reverse):
+        """Build the URL of the page after (or before, if reverse) a row"""
+        position = [self._key_value(row, field) for field in self.ordering]
+        token = json.dumps({'p': position, 'r': int(reverse)}, separators=(',', ':'))
+        cursor = base64.urlsafe_b64encode(token.encode()).decode().rstrip('=')
+        return replace_query_param(
+            remove_query_param(self.base_url, self.cursor_query_param),
+            self.cursor_query_param, cursor
+        )
+
+    def decode_cursor(self, request, model):
+        """
+        Return (position, reverse) for the request's cursor
+
+        Position is a tuple of Python values, one per ordering field, or
+        None on the first page.
+        """
+        cursor = request.query_params.get(self.cursor_query_param)
+        if not cursor:
+            return None, False
+
+        try:
+            token = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+            values = token['p']
+            if len(values) != len(self.ordering):
+                raise ValueError(cursor)
+            position = tuple(
+                model._meta.get_field(field.lstrip('-')).to_python(value)
+                for field, value in zip(self.ordering, values)
+            )
+            return position, bool(token.get('r'))
+        except Exception:
+            raise NotFound(self.invalid_cursor_message)
+
+    @staticmethod
+    def _flip(field):
+        return field[1:] if field.startswith('-') else f'-{field}'
+
+    @staticmethod
+    def _key_value(row, field):
+        name = field.lstrip('-')
+        # Rows are model instances or, for .values() querysets, dicts
+        value = row[name] if isinstance(row, dict) else getattr(row, name)
+        return value.isoformat() if hasattr(value, 'isoformat') else value
+
+    @staticmethod
+    def _after(ordering, position):
+        """
+        Rows that sort strictly after `position` under `ordering`
+
+        (a, b, c) > (x, y, z) expands to a > x, or a = x and b > y, or
+        a = x and b = y and c > z, with > meaning < for descending fields.
+        """
+        condition = Q()
+        equal = {}
+        for field, value in zip(ordering, position):
+            name = field.lstrip('-')
+            lookup = f'{name}__lt' if field.startswith('-') else f'{name}__gt'
+            condition |= Q(**equal, **{lookup: value})
+            equal[name] = value
+        return condition
+
+
+class AvailabilityKeysetPagination(KeysetPagination):
+    """Keyset pagination matching Availability's -date, start_time ordering"""
+    ordering = ('-date', 'start_time', 'id')
+
+
+class MergedKeysetPagination(KeysetPagination):
+    """
+    Keyset pagination over several querysets read as one list
+
+    get_queryset returns a list of querysets of models sharing the ordering
+    fields, with ids unique across all of them. Each is read from the
+    cursor with its own index, then the rows are merged in Python, so a
+    page costs one query per queryset. There is no page-number fallback.
+    """
+
+    def paginate_queryset(self, querysets, request, view=None):
+        self.request = request
+        self.legacy = None
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        position, reverse = self.decode_cursor(request, querysets[0].model)
+
+        ordering = self.ordering
+        if reverse:
+            ordering = tuple(self._flip(field) for field in ordering)
+        rows = []
+        for queryset in querysets:
+            rows.extend(self.fetch(queryset, ordering, position))
+        # Stable sorts from the last ordering field to the first
+        for field in reversed(ordering):
+            rows.sort(key=attrgetter(field.lstrip('-')), reverse=field.startswith('-'))
+        return self.paginate_rows(rows, position, reverse)
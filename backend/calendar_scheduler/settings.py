@@ -94,6 +94,46 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.0/topics/cache/
+# Local memory by default; set REDIS_CACHE_URL so every process shares slot
+# responses and their version counters
+
+REDIS_CACHE_URL = config('REDIS_CACHE_URL', default='')
+
+if REDIS_CACHE_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_CACHE_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'calendar-scheduler',
+        }
+    }
+
+# Seconds a computed slot list stays cached (entries are also invalidated
+# on every availability or booking write for that admin and date)
+SLOT_CACHE_TIMEOUT = config('SLOT_CACHE_TIMEOUT', default=300, cast=int)
+
+# Bookings older than this many days, and cancelled bookings unchanged for
+# this many days, are moved to the archive table (python manage.py
+# archive_bookings)
+BOOKING_ARCHIVE_AFTER_DAYS = config('BOOKING_ARCHIVE_AFTER_DAYS', default=365, cast=int)
+CANCELLED_BOOKING_RETENTION_DAYS = config('CANCELLED_BOOKING_RETENTION_DAYS', default=90, cast=int)
+
+# Seconds a slot hold keeps a slot for the user filling in the booking form
+SLOT_HOLD_SECONDS = config('SLOT_HOLD_SECONDS', default=300, cast=int)
+
+# Seconds a booking write's response is kept for replay to retries that
+# send the same Idempotency-Key
+IDEMPOTENCY_KEY_TTL = config('IDEMPOTENCY_KEY_TTL', default=86400, cast=int)
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
 
@@ -188,6 +228,8 @@ CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = 'UTC'
+# Run tasks inline instead of sending them to the broker (useful without Redis)
+CELERY_TASK_ALWAYS_EAGER = config('CELERY_TASK_ALWAYS_EAGER', default=False, cast=bool)
 
 # Twilio WhatsApp Configuration (Optional)
 TWILIO_ACCOUNT_SID = config('TWILIO_ACCOUNT_SID', default='')
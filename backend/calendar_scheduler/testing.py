@@ -0,0 +1,46 @@
+"""
+Test helpers shared by the apps' test suites.
+"""
+import re
+
+from django.db import connection
+
+
+class QueryPlanMixin:
+    """Checks that querysets are answered from an index rather than a table scan"""
+
+    # SQLite reports a table scan as "SCAN <table>", optionally walking an
+    # index for ORDER BY; SEARCH means the index narrowed the rows
+    SQLITE_SCAN = re.compile(r'\bSCAN (\w+)( USING (COVERING )?INDEX \w+)?\s*$')
+
+    @classmethod
+    def analyze(cls):
+        """Collect planner statistics for the seeded data"""
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def assertNoFullScan(self, queryset, label=''):
+        """
+        Fail if the plan reads a whole table
+
+        An ordered index walk counts as a full scan unless the queryset is
+        sliced, since only then does the LIMIT stop it early.
+        """
+        if connection.vendor == 'sqlite':
+            plan = queryset.explain()
+            limited = queryset.query.high_mark is not None
+            scans = []
+            for line in plan.splitlines():
+                match = self.SQLITE_SCAN.search(line.strip())
+                if match and not (match.group(2) and limited):
+                    scans.append(line)
+        elif connection.vendor == 'postgresql':
+            # Small test tables make sequential scans cheap; forbid them so the
+            # plan shows whether an index can answer the query at all
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+            plan = queryset.explain()
+            scans = [line for line in plan.splitlines() if 'Seq Scan' in line]
+        else:
+            self.skipTest(f'No query plan checks for {connection.vendor}')
+        self.assertEqual(scans, [], f'{label} falls back to a full scan:\n{plan}')
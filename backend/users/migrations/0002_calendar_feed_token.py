@@ -0,0 +1,18 @@
+# Generated by Django 5.0.1 on 2026-10-18 03:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='calendar_feed_token',
+            field=models.CharField(blank=True, help_text="Secret token in the URLs of the user's iCalendar feeds", max_length=64, null=True, unique=True),
+        ),
+    ]
@@ -1,3 +1,5 @@
+import secrets
+
 from django.contrib.auth.models import AbstractUser
 from django.db import models
 
@@ -34,6 +36,13 @@ class User(AbstractUser):
         null=True,
         help_text='Phone number for WhatsApp notifications'
     )
+    calendar_feed_token = models.CharField(
+        max_length=64,
+        unique=True,
+        null=True,
+        blank=True,
+        help_text='Secret token in the URLs of the user\'s iCalendar feeds'
+    )
     
     class Meta:
         db_table = 'users'
@@ -49,3 +58,9 @@ class User(AbstractUser):
     def is_super_admin(self):
         """Check if user is super admin"""
         return self.role == 'superadmin'
+    
+    def rotate_calendar_feed_token(self):
+        """Issue a new feed token, invalidating URLs built from the old one"""
+        self.calendar_feed_token = secrets.token_urlsafe(32)
+        self.save(update_fields=['calendar_feed_token'])
+        return self.calendar_feed_token